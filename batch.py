@@ -0,0 +1,263 @@
+import argparse
+import json
+import mmap
+import os
+import sys
+import tempfile
+from multiprocessing import Pool
+
+from oblig2 import _bfs_tree, _dijkstra_tree, _tree_path
+from snapshot import load_graph
+
+# The section header every kind of path gets in an oblig2.txt style report
+HEADERS = {"shortest": "Oppgave 2", "chillest": "Oppgave 3", "women": "Oppgave 5"}
+
+
+def read_pairs(filename):
+    """Reads a file with one "actor_id1 actor_id2" pair per line. Empty lines and lines
+    starting with # are skipped, and so are lines with only one actor id, which are
+    reported on stderr.
+
+    Args:
+        filename (str): Name of the file with the pairs
+
+    Returns:
+        list: A list of ("actor_id1", "actor_id2") tuples
+    """
+    pairs = []
+    with open(filename) as f:
+        for number, line in enumerate(f, 1):
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            if len(fields) < 2:
+                print(f"{filename}:{number}: expected two actor ids, skipped {line.strip()!r}", file=sys.stderr)
+                continue
+            pairs.append((fields[0], fields[1]))
+    return pairs
+
+
+def group_by_source(pairs):
+    """Groups the pairs by their first actor, in the order the sources first appear.
+
+    Args:
+        pairs (list): A list of ("actor_id1", "actor_id2") tuples
+
+    Returns:
+        dict: A dictionary with "actor_id1" as key and [(i, "actor_id2"), ...] as value,
+            where i is the position of the pair in pairs
+    """
+    groups = {}
+    for i, (source, target) in enumerate(pairs):
+        groups.setdefault(source, []).append((i, target))
+    return groups
+
+
+def batch_paths(G, pairs, kind, w_w=None):
+    """Finds the path for every pair, running one single-source search per distinct source
+    and answering all of its targets from the same search tree.
+
+    Args:
+        G (CSRGraph): The graph
+        pairs (list): A list of ("actor_id1", "actor_id2") tuples
+        kind (str): "shortest" (BFS), "chillest" (Dijkstra on G.weights) or "women" (Dijkstra on w_w)
+        w_w (array): The ratio weights made by oblig2.women_edge_weights(), needed for "women"
+
+    Yields:
+        tuple: (i, "actor_id1", "actor_id2", path, weight) for every pair, grouped by source.
+            path is empty and weight is inf if there is no path.
+    """
+    weights = {"shortest": None, "chillest": G.weights, "women": w_w}[kind]
+    for source, targets in group_by_source(pairs).items():
+        yield from _source_paths(G, kind, weights, source, targets)
+
+
+def _source_paths(G, kind, weights, source, targets):
+    """Runs one search from source and returns the path to every target, see batch_paths()."""
+    if source not in G:
+        return [(i, source, target, [], float('inf')) for i, target in targets]
+
+    root = G.index[source]
+    if kind == "shortest":
+        parents, _ = _bfs_tree(G, root)
+    else:
+        parents, dist, _ = _dijkstra_tree(G, weights, root)
+
+    results = []
+    for i, target in targets:
+        v = G.index.get(target, -1)
+        if v < 0 or parents[v] < 0:
+            results.append((i, source, target, [], float('inf')))
+            continue
+        path = _tree_path(G, parents, v)
+        weight = len(path) - 1 if kind == "shortest" else dist[v]
+        results.append((i, source, target, path, weight))
+    return results
+
+
+# The graph and the women weights of a worker process, set by _init_worker()
+_worker_G = None
+_worker_w_w = None
+# Why the worker has no graph, raised for every task, since an initializer that raises
+# makes the pool start new workers forever
+_worker_error = None
+
+
+def _init_worker(snapshot_filename, w_w_filename, sources, version):
+    global _worker_G, _worker_w_w, _worker_error
+    _worker_G = load_graph(snapshot_filename, sources)
+    if _worker_G is None:
+        _worker_error = ValueError(f"{snapshot_filename} is missing or older than the .tsv files")
+        return
+    if version is not None and _worker_G.version != version:
+        _worker_error = ValueError(f"{snapshot_filename} has version {_worker_G.version}, "
+                                   f"but the graph of the parent process has version {version}")
+        return
+    if w_w_filename is not None:
+        with open(w_w_filename, "rb") as f:
+            _worker_w_w = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)).cast("f")
+
+
+def _worker_source_paths(task):
+    if _worker_error is not None:
+        raise _worker_error
+    kind, source, targets = task
+    weights = {"shortest": None, "chillest": _worker_G.weights, "women": _worker_w_w}[kind]
+    return _source_paths(_worker_G, kind, weights, source, targets)
+
+
+def parallel_batch_paths(snapshot_filename, pairs, kind, w_w=None, processes=None, sources=None, version=None):
+    """Like batch_paths(), but the sources are spread over a pool of worker processes.
+
+    Every worker maps the graph snapshot (and a temporary file with w_w) read-only, so the
+    operating system shares the same pages between all of them and nothing but the pairs
+    and the finished paths is pickled. A worker refuses to answer from a snapshot that
+    is older than the .tsv files, or from another version of the graph than the caller has.
+
+    Args:
+        snapshot_filename (str): The snapshot file the graph was loaded from, see snapshot.py
+        pairs (list): A list of ("actor_id1", "actor_id2") tuples
+        kind (str): "shortest", "chillest" or "women", see batch_paths()
+        w_w (array): The ratio weights made by oblig2.women_edge_weights(), needed for "women"
+        processes (int): How many worker processes to use, all the cores if None
+        sources (list): The .tsv files the graph was built from, see snapshot.load_graph()
+        version (int): G.version of the caller's graph, not checked if None
+
+    Yields:
+        tuple: (i, "actor_id1", "actor_id2", path, weight) for every pair, like batch_paths()
+
+    Raises:
+        ValueError: If the snapshot is missing, out of date or of another version of the graph
+    """
+    tasks = [(kind, source, targets) for source, targets in group_by_source(pairs).items()]
+    processes = processes or os.cpu_count()
+    chunksize = max(1, len(tasks) // (processes * 8))
+
+    w_w_filename = None
+    try:
+        if kind == "women":
+            fd, w_w_filename = tempfile.mkstemp(suffix=".w_w", dir=os.path.dirname(os.path.abspath(snapshot_filename)))
+            with os.fdopen(fd, "wb") as f:
+                f.write(memoryview(w_w).cast("B"))
+
+        initargs = (snapshot_filename, w_w_filename, sources, version)
+        with Pool(processes, initializer=_init_worker, initargs=initargs) as pool:
+            for results in pool.imap(_worker_source_paths, tasks, chunksize):
+                yield from results
+    finally:
+        if w_w_filename is not None:
+            os.remove(w_w_filename)
+
+
+def _paths(G, pairs, kind, w_w, processes, snapshot_filename, sources):
+    if processes != 1 and snapshot_filename is not None:
+        return parallel_batch_paths(snapshot_filename, pairs, kind, w_w, processes, sources, G.version)
+    return batch_paths(G, pairs, kind, w_w)
+
+
+def write_report(G, pairs, outfile, kinds=("shortest", "chillest"), w_w=None, women_movie=None,
+                 processes=1, snapshot_filename=None, sources=None):
+    """Writes the paths for all the pairs to a text file formatted like oblig2.txt,
+    one section for every kind of path.
+
+    Args:
+        G (CSRGraph): The graph
+        pairs (list): A list of ("actor_id1", "actor_id2") tuples
+        outfile (str): Name of the text file created
+        kinds (tuple): Which kinds of paths to find, see batch_paths()
+        w_w (array): The ratio weights made by oblig2.women_edge_weights(), needed for "women"
+        women_movie (array): The linking movies made by oblig2.women_edge_weights(), needed for "women"
+        processes (int): How many worker processes to use, all the cores if None
+        snapshot_filename (str): The snapshot file G was loaded from, needed for more than one process
+        sources (list): The .tsv files G was built from, so the workers can check the snapshot
+    """
+    with open(outfile, "w") as f:
+        for kind in kinds:
+            f.write(f"{HEADERS[kind]}\n\n")
+            edge_movie = women_movie if kind == "women" else G.edge_movie
+
+            for _, source, target, path, weight in _paths(G, pairs, kind, w_w, processes, snapshot_filename, sources):
+                if not path:
+                    f.write(f"No path between {source} and {target}\n\n")
+                    continue
+
+                f.write(f"{G.name(path[0])}\n")
+                for movie, actor in zip(G.path_movies(path, edge_movie), path[1:]):
+                    label = G.movie_names[movie] if kind == "women" else f"{G.movie_names[movie]} {G.ratings[movie]}"
+                    f.write(f"===[ {label} ] ===> {G.name(actor)}\n")
+                if kind != "shortest":
+                    f.write(f"Total weight: {weight:.1f}\n")
+                f.write("\n")
+
+
+def write_jsonl(G, pairs, outfile, kinds=("shortest", "chillest"), w_w=None, women_movie=None,
+                processes=1, snapshot_filename=None, sources=None):
+    """Writes the paths for all the pairs to a JSON lines file, one object per pair and kind:
+    {"pair": i, "kind": ..., "source": ..., "target": ..., "path": [...], "movies": [...], "weight": ...}
+
+    The arguments are the same as for write_report().
+    """
+    with open(outfile, "w") as f:
+        for kind in kinds:
+            edge_movie = women_movie if kind == "women" else G.edge_movie
+
+            for i, source, target, path, weight in _paths(G, pairs, kind, w_w, processes, snapshot_filename, sources):
+                movies = [G.movie_ids[movie] for movie in G.path_movies(path, edge_movie)] if path else []
+                record = {
+                    "pair": i,
+                    "kind": kind,
+                    "source": source,
+                    "target": target,
+                    "path": path,
+                    "movies": movies,
+                    "weight": weight if path else None,
+                }
+                f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    from oblig2 import loadgraph, women_edge_weights
+
+    parser = argparse.ArgumentParser(description="Finds the paths between many pairs of actors.")
+    parser.add_argument("pairs", help="file with one 'actor_id1 actor_id2' pair per line")
+    parser.add_argument("outfile", help="the report or JSON lines file to write")
+    parser.add_argument("--jsonl", action="store_true", help="write JSON lines instead of a text report")
+    parser.add_argument("--kinds", default="shortest,chillest",
+                        help="comma separated list of shortest, chillest and women")
+    parser.add_argument("--movies", default="movies.tsv")
+    parser.add_argument("--actors", default="actors.tsv")
+    parser.add_argument("--data", default="data.tsv", help="the actress data file, used for women")
+    parser.add_argument("--snapshot", default="graph.snapshot")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes, 0 for one per core")
+    args = parser.parse_args()
+
+    kinds = tuple(args.kinds.split(","))
+    G = loadgraph(args.movies, args.actors, args.snapshot)
+
+    w_w = women_movie = None
+    if "women" in kinds:
+        w_w, women_movie = women_edge_weights(G, args.movies, args.actors, args.data)
+
+    write = write_jsonl if args.jsonl else write_report
+    write(G, read_pairs(args.pairs), args.outfile, kinds, w_w, women_movie, args.processes or None, args.snapshot,
+          [args.movies, args.actors])
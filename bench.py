@@ -0,0 +1,238 @@
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+from multiprocessing import get_context
+
+from synthetic import generate
+from tsv_loader import peak_memory_mb
+
+# The stages every scale is timed on, in the order they run
+STAGES = ("readfile", "buildgraph", "bfs", "dijkstra", "components", "create_actress_dict",
+          "women_weights", "Graph._create_graph")
+
+# The peak memory of a process only grows, so these stages run in a process of their own,
+# where their peak memory is not hidden by the stages before them
+ISOLATED = ("Graph._create_graph",)
+
+# Bumped when a stage starts measuring something else, a baseline with another version of
+# the stage is not compared. components was components(G), which only counts G.component
+# since the components are found when the graph is built, and is now cast_components().
+STAGE_VERSIONS = {"components": 2}
+
+
+def _dataset(data_dir, actors, seed):
+    directory = os.path.join(data_dir, f"{actors}-{seed}")
+    if not os.path.exists(os.path.join(directory, "data.tsv")):
+        generate(directory, actors, seed=seed)
+    return [os.path.join(directory, name) for name in ("movies.tsv", "actors.tsv", "data.tsv")]
+
+
+def _percentile(sorted_times, p):
+    return sorted_times[min(len(sorted_times) - 1, int(p / 100 * len(sorted_times)))]
+
+
+def _result(times, items, unit):
+    """Summarises the times of one stage.
+
+    Args:
+        times (list): The seconds of every run or query
+        items (int): How many items one run handles, for the throughput
+        unit (str): What the items are, for example "actors" or "queries"
+
+    Returns:
+        dict: The best and percentile times in seconds, the throughput over all the runs
+            and the peak memory of the whole process so far
+    """
+    times = sorted(times)
+    total = sum(times)
+    return {
+        "runs": len(times),
+        "best_s": times[0],
+        "p50_s": _percentile(times, 50),
+        "p90_s": _percentile(times, 90),
+        "p99_s": _percentile(times, 99),
+        "throughput": items * len(times) / total if total else float("inf"),
+        "unit": f"{unit}/s",
+        "peak_rss_mb": peak_memory_mb(),
+    }
+
+
+def _timed(fn, repeat):
+    """Calls fn repeat times, with its prints hidden, and returns its last value and every time."""
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            value = fn()
+            times.append(time.perf_counter() - start)
+    return value, times
+
+
+def run_scale(actors, seed=2010, queries=100, repeat=1, data_dir="bench_data", stages=STAGES):
+    """Times the given stages on one dataset. Run it in a fresh process, so the peak memory
+    belongs to this scale and these stages only.
+
+    Args:
+        actors (int): How many actors the dataset has
+        seed (int): The seed of the dataset and of the query pairs
+        queries (int): How many BFS and Dijkstra queries to time
+        repeat (int): How many times to run every other stage
+        data_dir (str): Where the datasets are written and kept
+        stages (tuple): Which of STAGES to run
+
+    Returns:
+        dict: The result of every stage, see _result()
+    """
+    from oblig2 import (buildgraph, bfs_shortest_path_between, create_actress_dict, dijkstra, readfile,
+                        women_movie_cost)
+    from oppgave1 import Graph
+    from tsv_loader import _read_into_builder
+    from union_find import cast_components
+
+    movies_file, actors_file, data_file = _dataset(data_dir, actors, seed)
+    results = {}
+
+    if any(stage in stages for stage in ("readfile", "buildgraph", "bfs", "dijkstra")):
+        (_, actors_in_movie, actor_names, movies_and_rating, actor_and_movies), times = _timed(
+            lambda: readfile(movies_file, actors_file), repeat)
+        results["readfile"] = _result(times, actors, "actors")
+
+        G, times = _timed(lambda: buildgraph(actors_in_movie, movies_and_rating, actor_and_movies, actor_names),
+                          repeat)
+        results["buildgraph"] = _result(times, actors, "actors")
+
+        r = random.Random(seed)
+        pairs = [(r.choice(G.ids), r.choice(G.ids)) for _ in range(queries)]
+        if "bfs" in stages:
+            times = [_timed(lambda: bfs_shortest_path_between(G, s, e), 1)[1][0] for s, e in pairs]
+            results["bfs"] = _result(times, 1, "queries")
+        if "dijkstra" in stages:
+            times = [_timed(lambda: dijkstra(G, s), 1)[1][0] for s, _ in pairs]
+            results["dijkstra"] = _result(times, 1, "queries")
+
+    # The casts and the actors' movies are read outside the timing
+    builder = None
+    if "components" in stages or "women_weights" in stages:
+        builder = _read_into_builder(movies_file, actors_file)
+    if "components" in stages:
+        _, times = _timed(lambda: cast_components(len(builder.ids), builder.casts), repeat)
+        results["components"] = _result(times, actors, "actors")
+
+    if "create_actress_dict" in stages or "women_weights" in stages:
+        (actresses_in_movie, total_dict), times = _timed(lambda: create_actress_dict(data_file), repeat)
+        results["create_actress_dict"] = _result(times, actors, "actors")
+    if "women_weights" in stages:
+        # The weights are worked out per movie and spread over the edges like the graph is built,
+        # see oblig2.women_edge_weights()
+        _, times = _timed(lambda: builder.edge_weights(women_movie_cost(builder, actresses_in_movie, total_dict)),
+                          repeat)
+        results["women_weights"] = _result(times, actors, "actors")
+
+    if "Graph._create_graph" in stages:
+        _, times = _timed(lambda: Graph(movies_file, actors_file), repeat)
+        results["Graph._create_graph"] = _result(times, actors, "actors")
+
+    return {stage: results[stage] for stage in STAGES if stage in results and stage in stages}
+
+
+def run(scales, stages=STAGES, **options):
+    """Runs run_scale() for every scale in a fresh process, and every stage in ISOLATED in
+    a fresh process of its own.
+
+    Returns:
+        dict: {"meta": ..., "scales": {"actors": {stage: result}}}
+    """
+    meta = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "stage_versions": STAGE_VERSIONS,
+        **options,
+    }
+    groups = [tuple(stage for stage in stages if stage not in ISOLATED)]
+    groups += [(stage,) for stage in stages if stage in ISOLATED]
+    results = {}
+    context = get_context("spawn")
+    for actors in scales:
+        scale = {}
+        for group in groups:
+            if group:
+                with context.Pool(1) as pool:
+                    scale.update(pool.apply(run_scale, (actors,), dict(options, stages=group)))
+        results[str(actors)] = {stage: scale[stage] for stage in STAGES if stage in scale}
+    return {"meta": meta, "scales": results}
+
+
+def print_results(results, baseline=None, tolerance=0.2):
+    """Prints a table of the results, and compares them to a baseline if given. The peak
+    RSS is the peak of the whole process when the stage was done, which includes the
+    stages run before it in the same process, see ISOLATED.
+
+    Args:
+        results (dict): Made by run()
+        baseline (dict): Earlier results made by run(), or None
+        tolerance (float): How much slower than the baseline a stage can be before it counts as a regression
+
+    Returns:
+        list: (actors, stage, ratio) for every stage that is slower than the baseline by more than tolerance
+    """
+    regressions = []
+    versions = (baseline or {}).get("meta", {}).get("stage_versions", {})
+    for actors, stages in results["scales"].items():
+        print(f"\n{int(actors):,} actors\n")
+        print(f"{'stage':22} {'best':>10} {'p50':>10} {'p99':>10} {'throughput':>22} {'peak RSS so far':>16}")
+        for stage, result in stages.items():
+            line = (f"{stage:22} {1000 * result['best_s']:8.1f}ms {1000 * result['p50_s']:8.1f}ms "
+                    f"{1000 * result['p99_s']:8.1f}ms {result['throughput']:12.0f} {result['unit']:9} "
+                    f"{result['peak_rss_mb']:14.0f}MB")
+            old = (baseline or {}).get("scales", {}).get(actors, {}).get(stage)
+            if old is not None and versions.get(stage, 1) != STAGE_VERSIONS.get(stage, 1):
+                line += "  not comparable to the baseline"
+            elif old is not None:
+                ratio = result["p50_s"] / old["p50_s"] if old["p50_s"] else 1.0
+                line += f"  {ratio:5.2f}x baseline"
+                if ratio > 1 + tolerance:
+                    line += "  REGRESSION"
+                    regressions.append((actors, stage, ratio))
+            print(line)
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Times the ingest, build and query stages on synthetic datasets.")
+    parser.add_argument("--scales", default="10000,100000", help="comma separated numbers of actors, up to 1000000")
+    parser.add_argument("--seed", type=int, default=2010)
+    parser.add_argument("--queries", type=int, default=100, help="how many BFS and Dijkstra queries to time")
+    parser.add_argument("--repeat", type=int, default=1, help="how many times to run every other stage")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma separated stages to run")
+    parser.add_argument("--data-dir", default="bench_data", help="where the datasets are kept")
+    parser.add_argument("--save", default=None, help="write the results to this JSON baseline")
+    parser.add_argument("--compare", default=None, help="compare the results to this JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    stages = tuple(args.stages.split(","))
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages {', '.join(sorted(unknown))}")
+
+    results = run([int(actors) for actors in args.scales.split(",")], seed=args.seed, queries=args.queries,
+                  repeat=args.repeat, data_dir=args.data_dir, stages=stages)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    regressions = print_results(results, baseline, args.tolerance)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if regressions:
+        sys.exit(1)
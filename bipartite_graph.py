@@ -0,0 +1,101 @@
+from array import array
+from collections import deque
+
+from search import tree_path
+
+
+class BipartiteGraph:
+    """The actor-movie graph, without expanding every movie into edges between all its actors.
+
+    Actors and movies are both numbered with dense integers. The movies of actor v are
+    films[film_offsets[v]:film_offsets[v+1]] and the actors of movie m are
+    casts[cast_offsets[m]:cast_offsets[m+1]]. A path between two actors goes
+    actor -> movie -> actor, and the weight of a step is the weight of the movie, so a
+    cast of k actors costs k entries instead of k² edges.
+
+    Attributes:
+        ids (list): The actor id for every integer actor
+        index (dict): A dictionary with "actor_id" as key and integer actor as value
+        names (list): The actor name for every integer actor
+        film_offsets (array): Start of every actor's row in films
+        films (array): The integer movies of all the actors, row by row
+        cast_offsets (array): Start of every movie's row in casts
+        casts (array): The integer actors of all the movies, row by row
+        movie_ids (list): The movie id for every integer movie
+        movie_names (list): The movie name for every integer movie
+        ratings (array): The rating of every integer movie
+        component (array): The connected component id of every integer actor
+    """
+
+    __slots__ = ("ids", "index", "names", "film_offsets", "films", "cast_offsets", "casts",
+                 "movie_ids", "movie_names", "ratings", "component")
+
+    def __init__(self, ids, names, film_offsets, films, cast_offsets, casts, movie_ids, movie_names,
+                 ratings, component, index=None):
+        self.ids = ids
+        self.index = index if index is not None else {actor: v for v, actor in enumerate(ids)}
+        self.names = names
+        self.film_offsets = film_offsets
+        self.films = films
+        self.cast_offsets = cast_offsets
+        self.casts = casts
+        self.movie_ids = movie_ids
+        self.movie_names = movie_names
+        self.ratings = ratings
+        self.component = component
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, actor):
+        return actor in self.index
+
+    def name(self, actor):
+        """Returns the name of the actor with the given actor id."""
+        return self.names[self.index[actor]]
+
+    def connected(self, s, t):
+        """Returns True if there is a path between the actors s and t."""
+        return self.component[self.index[s]] == self.component[self.index[t]]
+
+
+def bfs_shortest_path_between(B, s, t):
+    """Finds the path with the fewest movies between two actors with BFS over the
+    actor-movie graph. Every movie is expanded at most once, the first time one of
+    its actors is reached, and the search stops when t is found.
+
+    Args:
+        B (BipartiteGraph): The graph
+        s (str): The actor id of the root
+        t (str): The actor id of the end
+
+    Returns:
+        path (list): A list containing the shortest path, empty if there is no path
+        movies (list): The movie id linking path[i] and path[i+1], for every i
+    """
+    if s not in B or t not in B or not B.connected(s, t):
+        return [], []
+    film_offsets, films, cast_offsets, casts = B.film_offsets, B.films, B.cast_offsets, B.casts
+    root, end = B.index[s], B.index[t]
+
+    parents = array("i", [-1]) * len(B)
+    parent_movie = array("i", [-1]) * len(B)
+    expanded = bytearray(len(B.movie_ids))
+    parents[root] = root
+    queue = deque([root])
+
+    while queue and parents[end] < 0:
+        v = deque.popleft(queue)
+        for m in films[film_offsets[v]:film_offsets[v + 1]]:
+            if expanded[m]:
+                continue
+            expanded[m] = 1
+            for u in casts[cast_offsets[m]:cast_offsets[m + 1]]:
+                if parents[u] < 0:
+                    parents[u] = v
+                    parent_movie[u] = m
+                    queue.append(u)
+
+    path, movies = tree_path(parents, parent_movie, end)
+    return [B.ids[v] for v in path], [B.movie_ids[m] for m in movies]
+
@@ -4,7 +4,6 @@ from heapq import heappush, heappop
 from os import kill
 import time
 
-import cProfile, pstats, io
 import requests
 from bs4 import BeautifulSoup
 import re
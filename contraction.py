@@ -0,0 +1,448 @@
+import time
+from array import array
+from bisect import bisect_left
+from heapq import heapify, heappush, heappop
+
+from oblig2 import _path_weight
+from search import tie_keys
+from snapshot import read_sections, stamp_matches, weights_stamp, write_sections
+
+MAGIC = b"IMDBCH\0\0"
+VERSION = 2
+
+# The (weight, tie) of a node not reached yet
+_UNREACHED = (float('inf'), 0)
+
+
+class ContractionHierarchy:
+    """A contraction hierarchy over one set of edge weights of a CSRGraph.
+
+    The hierarchy is built on the graph between actors and movies, where the integer
+    node of movie m is len(G) + m, and going from an actor to a movie and on to a
+    co-star costs half the weight of the movie each way. A movie with k actors is then
+    k arcs instead of k * k edges, and contracting an actor only links the movies it
+    played in.
+
+    Every node gets a rank, the order it was contracted in. When a node is contracted,
+    shortcuts are added between its neighbours wherever the path through it is the
+    lightest one, so a lightest path can always be found by only going up in rank from
+    both ends. The arcs weigh the same both ways, so every arc is only stored once, in
+    the row of its lower ranked end. Every arc remembers its weight, its tie (see
+    search.tie_keys()) and the node it skips (its middle), -1 for an actor in a movie.
+
+    The nodes contracted last are left as a core, with rank core and up, where every
+    node keeps its arcs to all the other core nodes.
+
+    Attributes:
+        rank (array): The contraction order of every integer node and movie
+        offsets, targets, weights, ties, middle (array): The arcs v - u with
+            rank[u] > rank[v], or both in the core, as CSR rows sorted by u
+        core (int): The rank of the first node in the core
+    """
+
+    __slots__ = ("rank", "offsets", "targets", "weights", "ties", "middle", "core")
+
+    def __init__(self, rank, offsets, targets, weights, ties, middle, core):
+        self.rank = rank
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.ties = ties
+        self.middle = middle
+        self.core = core
+
+    def _arc(self, u, v):
+        """Returns the middle node of the arc between u and v."""
+        if self.rank[u] > self.rank[v]:
+            u, v = v, u
+        i = bisect_left(self.targets, v, self.offsets[u], self.offsets[u + 1])
+        return self.middle[i]
+
+    def unpack(self, u, v):
+        """Expands the arc u - v into the original edges it stands for.
+
+        Returns:
+            list: The integer nodes after u on the path from u to v
+        """
+        path = []
+        stack = [(u, v)]
+        while stack:
+            a, b = stack.pop()
+            middle = self._arc(a, b)
+            if middle < 0:
+                path.append(b)
+            else:
+                stack.append((middle, b))
+                stack.append((a, middle))
+        return path
+
+
+def _witness_search(arcs, source, skip, shortcuts, max_scanned):
+    """Dijkstra on (weight, tie) from source over the uncontracted graph, without going
+    through skip. It stops when the end of every shortcut is settled, when the
+    heaviest shortcut is lighter than the smallest key, or after scanning max_scanned
+    arcs, so a hub costs about as much to contract as any other node.
+
+    Args:
+        arcs (list): The {node: (weight, tie, middle)} arcs of every uncontracted node
+        source (int): The node the shortcuts start at
+        skip (int): The node being contracted
+        shortcuts (list): (end, weight, tie) of every shortcut through skip that may be needed
+        max_scanned (int): How many arcs the search may scan
+
+    Returns:
+        dict: The (upper bound on the) (weight, tie) to every node reached
+    """
+    limit = max((w, t) for _, w, t in shortcuts)
+    left = {v for v, _, _ in shortcuts}
+    dist = {source: (0, 0)}
+    settled = set()
+    Q = [(0, 0, source)]
+    scanned = 0
+    while Q and left and scanned < max_scanned:
+        cost, tie, v = heappop(Q)
+        if v in settled:
+            continue
+        if (cost, tie) > limit:
+            break
+        settled.add(v)
+        left.discard(v)
+        row = arcs[v]
+        scanned += len(row)
+        for u, (w, t, _) in row.items():
+            if u == skip:
+                continue
+            c = (cost + w, tie + t)
+            if c < dist.get(u, _UNREACHED):
+                dist[u] = c
+                heappush(Q, (c[0], c[1], u))
+    return dist
+
+
+def _shortcuts(arcs, x, max_scanned):
+    """Finds the shortcuts needed if x is contracted now: a shortcut u - v through x is
+    not needed if u and v already have an arc at most as light, and otherwise only if a
+    witness search from u finds no other path at most as light.
+
+    Returns:
+        list: (u, v, weight, tie) of every shortcut
+    """
+    ngbrs = list(arcs[x].items())
+    shortcuts = []
+    for j, (u, (w1, t1, _)) in enumerate(ngbrs):
+        arcs_u = arcs[u]
+        candidates = []
+        for v, (w2, t2, _) in ngbrs[j + 1:]:
+            w, t = w1 + w2, t1 + t2
+            existing = arcs_u.get(v)
+            if existing is None or (w, t) < (existing[0], existing[1]):
+                candidates.append((v, w, t))
+        if candidates:
+            dist = _witness_search(arcs, u, x, candidates, max_scanned)
+            shortcuts.extend((u, v, w, t) for v, w, t in candidates if dist.get(v, _UNREACHED) > (w, t))
+    return shortcuts
+
+
+def build_hierarchy(G, weights, edge_movie, max_scanned=1000, max_shortcuts=16, verbose=False):
+    """Contracts the actors and movies one at a time and builds the hierarchy.
+
+    The movies come from edge_movie, the movie linking the two actors of every edge
+    whose weight it is, so an actor is in the movies of its edges. Nodes are contracted
+    in order of the edge difference (the shortcuts _shortcuts() finds minus the arcs
+    removed), plus how many of the neighbours are already contracted and how deep in
+    the hierarchy the node is, which is updated lazily when a node comes up in the
+    queue. Paths are compared on (weight, tie), like oblig2._bidirectional_dijkstra()
+    does.
+
+    The last nodes, the prolific actors and big movies, are all linked to each other,
+    and contracting them would add shortcuts between most pairs. When the next node
+    needs more than max_shortcuts shortcuts, the nodes left become the core, which is
+    not contracted and keeps all its arcs, so the build time grows about linearly.
+
+    Args:
+        G (CSRGraph): The graph
+        weights (array): The weight of every edge in G.targets, G.weights or the women weights
+        edge_movie (array): The movie of every edge in G.targets, G.edge_movie or the women movies
+        max_scanned (int): How many arcs each witness search may scan
+        max_shortcuts (int): The most shortcuts a node may need to be contracted
+        verbose (bool): Print progress
+
+    Returns:
+        ContractionHierarchy: The hierarchy
+    """
+    n = len(G)
+    keys = tie_keys(n)
+    offsets = G.offsets
+    arcs = [dict() for _ in range(n + len(G.movie_ids))]
+    for v in range(n):
+        row, key = arcs[v], keys[v]
+        for i in range(offsets[v], offsets[v + 1]):
+            m = n + edge_movie[i]
+            if m not in row:
+                row[m] = arcs[m][v] = (weights[i] / 2, key, -1)
+
+    contracted_ngbrs = array("i", [0]) * len(arcs)
+    level = array("i", [0]) * len(arcs)
+
+    def priority(x, shortcuts):
+        return len(shortcuts) - len(arcs[x]) + contracted_ngbrs[x] + level[x]
+
+    rank = array("i", [-1]) * len(arcs)
+    up = [None] * len(arcs)
+    Q = [(priority(v, _shortcuts(arcs, v, max_scanned)), v) for v in range(len(arcs))]
+    heapify(Q)
+    order = 0
+    start = time.time()
+    while Q:
+        _, x = heappop(Q)
+        shortcuts = _shortcuts(arcs, x, max_scanned)
+        p = priority(x, shortcuts)
+        if Q and p > Q[0][0]:
+            heappush(Q, (p, x))
+            continue
+        if len(shortcuts) > max_shortcuts:
+            heappush(Q, (p, x))
+            break
+
+        for u, v, w, t in shortcuts:
+            existing = arcs[u].get(v)
+            if existing is None or (w, t) < (existing[0], existing[1]):
+                arcs[u][v] = arcs[v][u] = (w, t, x)
+
+        row = arcs[x]
+        for u in row:
+            del arcs[u][x]
+            contracted_ngbrs[u] += 1
+            level[u] = max(level[u], level[x] + 1)
+
+        rank[x] = order
+        order += 1
+        up[x] = row
+        arcs[x] = None
+        if verbose and order % 10000 == 0:
+            print(f"Contracted {order}/{len(arcs)} nodes in {time.time() - start:.0f}s")
+
+    # The core: every node left keeps all its arcs, so the searches can go both ways between them
+    core = order
+    for _, x in sorted(Q):
+        rank[x] = order
+        order += 1
+        up[x] = arcs[x]
+    if verbose:
+        print(f"Left {len(Q)} nodes in the core after {time.time() - start:.0f}s")
+
+    return ContractionHierarchy(rank, *_rows(up), core)
+
+
+def _rows(arcs):
+    """Packs a list of {node: (weight, tie, middle)} dictionaries into sorted CSR rows."""
+    offsets = array("q", [0])
+    nodes = array("i")
+    weights = array("d")
+    ties = array("q")
+    middle = array("i")
+    for row in arcs:
+        for u in sorted(row):
+            w, t, m = row[u]
+            nodes.append(u)
+            weights.append(w)
+            ties.append(t)
+            middle.append(m)
+        offsets.append(len(nodes))
+    return offsets, nodes, weights, ties, middle
+
+
+def ch_path_between(G, H, weights, s, e):
+    """Finds the lightest path between two actors with a contraction hierarchy. A search
+    from each end only follows arcs going up in rank until it reaches the core, and a
+    bidirectional Dijkstra in the core starts from the core nodes the two searches
+    reached. The shortcuts on the path are then unpacked, and the movies on it dropped.
+    Paths of the same weight are compared by their tie, so the path is the same as the
+    one from oblig2.chillest_path_between() or least_sexistic_path().
+
+    Args:
+        G (CSRGraph): The graph
+        H (ContractionHierarchy): A hierarchy built with weights
+        weights (array): The weight of every edge in G.targets
+        s (str): The actor id of the root
+        e (str): The actor id of the end
+
+    Returns:
+        path (list): A list containing the lightest path, empty if there is no path
+        weight (float): The total weight of the path, added up along the path like chillest_path_between() does
+    """
+    if s not in G or e not in G:
+        return [], float('inf')
+    source, target = G.index[s], G.index[e]
+    if source == target:
+        return [s], 0
+    if G.component[source] != G.component[target]:
+        return [], float('inf')
+
+    offsets, nodes, arc_weights, arc_ties, rank = H.offsets, H.targets, H.weights, H.ties, H.rank
+    dist = ({source: (0, 0)}, {target: (0, 0)})
+    parents = ({source: source}, {target: target})
+
+    # Up from both ends, stopping at the core
+    entries = ([], [])
+    for side, root in ((0, source), (1, target)):
+        D, P = dist[side], parents[side]
+        Q = [(0, 0, root)]
+        while Q:
+            cost, tie, v = heappop(Q)
+            if (cost, tie) > D[v]:
+                continue
+            if rank[v] >= H.core:
+                entries[side].append((cost, tie, v))
+                continue
+            for i in range(offsets[v], offsets[v + 1]):
+                u = nodes[i]
+                c = (cost + arc_weights[i], tie + arc_ties[i])
+                if c < D.get(u, _UNREACHED):
+                    D[u] = c
+                    P[u] = v
+                    heappush(Q, (c[0], c[1], u))
+
+    best, meet = _UNREACHED, None
+    for v, (cost, tie) in dist[0].items():
+        other = dist[1].get(v)
+        if other is not None and (cost + other[0], tie + other[1]) < best:
+            best, meet = (cost + other[0], tie + other[1]), v
+
+    # Bidirectional Dijkstra in the core, from where the two searches entered it
+    Q = entries
+    heapify(Q[0])
+    heapify(Q[1])
+    settled = (set(), set())
+    while Q[0] and Q[1] and (Q[0][0][0] + Q[1][0][0], Q[0][0][1] + Q[1][0][1]) < best:
+        side = 0 if Q[0][0] <= Q[1][0] else 1
+        cost, tie, v = heappop(Q[side])
+        if v in settled[side]:
+            continue
+        settled[side].add(v)
+        D, P, other_D = dist[side], parents[side], dist[1 - side]
+        for i in range(offsets[v], offsets[v + 1]):
+            u = nodes[i]
+            c = (cost + arc_weights[i], tie + arc_ties[i])
+            if c < D.get(u, _UNREACHED):
+                D[u] = c
+                P[u] = v
+                heappush(Q[side], (c[0], c[1], u))
+                other = other_D.get(u)
+                if other is not None and (c[0] + other[0], c[1] + other[1]) < best:
+                    best, meet = (c[0] + other[0], c[1] + other[1]), u
+
+    if meet is None:
+        return [], float('inf')
+
+    up_path = [meet]
+    while up_path[-1] != source:
+        up_path.append(parents[0][up_path[-1]])
+    up_path.reverse()
+    down_path = [meet]
+    while down_path[-1] != target:
+        down_path.append(parents[1][down_path[-1]])
+
+    path = [source]
+    for a, b in zip(up_path, up_path[1:]):
+        path.extend(H.unpack(a, b))
+    for a, b in zip(down_path, down_path[1:]):
+        path.extend(H.unpack(a, b))
+    n = len(G)
+    path = [v for v in path if v < n]
+    return [G.ids[v] for v in path], _path_weight(G, weights, path)
+
+
+_SECTIONS = [("rank", "i"), ("offsets", "q"), ("targets", "i"), ("weights", "d"), ("ties", "q"), ("middle", "i")]
+
+
+def save_hierarchy(G, H, filename, weights, kind, sources=()):
+    """Writes a contraction hierarchy to a binary file, see snapshot.write_sections(). The
+    file remembers the graph and the weights it was built for, see snapshot.weights_stamp().
+
+    Args:
+        G (CSRGraph): The graph the hierarchy was built for
+        H (ContractionHierarchy): The hierarchy
+        filename (str): Name of the hierarchy file
+        weights (array): The weights the hierarchy was built with
+        kind (str): Which weights they are, "chill" or "women"
+        sources (list): The .tsv files the graph was built from
+    """
+    sections = [(name, typecode, getattr(H, name)) for name, typecode in _SECTIONS]
+    meta = dict(weights_stamp(G, weights, kind, sources), core=H.core)
+    write_sections(filename, MAGIC, VERSION, meta, sections)
+
+
+def load_hierarchy(G, filename, weights, kind, sources=None):
+    """Maps a contraction hierarchy written by save_hierarchy() into memory. A hierarchy
+    made for another graph, before a rating changed, or for the other kind of weights
+    would give wrong paths, so it is not used.
+
+    Args:
+        G (CSRGraph): The graph the hierarchy should belong to
+        filename (str): Name of the hierarchy file
+        weights (array): The weights the hierarchy should be built with
+        kind (str): Which weights they are, "chill" or "women"
+        sources (list): The .tsv files the graph was built from, not checked if None
+
+    Returns:
+        ContractionHierarchy: The hierarchy, or None if the file is missing or was made for another graph or other weights
+    """
+    toc, values = read_sections(filename, MAGIC, VERSION)
+    if toc is None or not stamp_matches(toc, G, weights, kind, sources):
+        return None
+    return ContractionHierarchy(core=toc["core"], **values)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from oblig2 import loadgraph, women_edge_weights
+
+    parser = argparse.ArgumentParser(description="Builds contraction hierarchies for the chillest and least sexistic "
+                                                 "paths, and finds the path between two actors with them.")
+    parser.add_argument("actor_ids", nargs="*", metavar="actor_id", help="two actor ids to find the path between")
+    parser.add_argument("--movies", default="movies.tsv")
+    parser.add_argument("--actors", default="actors.tsv")
+    parser.add_argument("--data", default="data.tsv", help="the actress data file, for the women hierarchy")
+    parser.add_argument("--snapshot", default="graph.snapshot")
+    parser.add_argument("--women", action="store_true",
+                        help="also build the hierarchy over the women weights, and use it for the path")
+    args = parser.parse_args()
+    if len(args.actor_ids) not in (0, 2):
+        parser.error("give two actor ids, or none to only build the hierarchies")
+
+    sources = [args.movies, args.actors]
+    G = loadgraph(args.movies, args.actors, args.snapshot)
+    kinds = {"chill": (G.weights, G.edge_movie)}
+    if args.women:
+        kinds["women"] = women_edge_weights(G, args.movies, args.actors, args.data)
+
+    hierarchies = {}
+    for kind, (weights, edge_movie) in kinds.items():
+        filename = f"{args.snapshot}.ch-{kind}"
+        H = load_hierarchy(G, filename, weights, kind, sources)
+        if H is None:
+            start = time.time()
+            H = build_hierarchy(G, weights, edge_movie, verbose=True)
+            save_hierarchy(G, H, filename, weights, kind, sources)
+            print(f"Built the {kind} hierarchy in {time.time() - start:.0f}s")
+        hierarchies[kind] = H
+
+    if args.actor_ids:
+        s, e = args.actor_ids
+        kind = "women" if args.women else "chill"
+        weights, edge_movie = kinds[kind]
+        start = time.perf_counter()
+        path, weight = ch_path_between(G, hierarchies[kind], weights, s, e)
+        elapsed = time.perf_counter() - start
+
+        if not path:
+            print(f"No path between {s} and {e}")
+        else:
+            print(G.name(path[0]))
+            for movie, actor in zip(G.path_movies(path, edge_movie), path[1:]):
+                label = G.movie_names[movie] if kind == "women" else f"{G.movie_names[movie]} {G.ratings[movie]}"
+                print(f"===[ {label} ] ===> {G.name(actor)}")
+            print(f"Total weight: {weight:.1f}")
+        print(f"Found in {1000 * elapsed:.2f} ms")
@@ -0,0 +1,322 @@
+from array import array
+from bisect import bisect_left
+from collections import deque
+from itertools import accumulate, chain, compress, islice, repeat
+
+from bipartite_graph import BipartiteGraph
+from instrument import timed
+from union_find import cast_components, row_components
+
+
+class CSRGraph:
+    """Compact actor graph stored in compressed sparse row (CSR) form.
+
+    Every actor id ("nm...") is mapped to a dense integer. The neighbours of
+    actor v are targets[offsets[v]:offsets[v+1]], sorted, and the weight and
+    the linking movie of each of those edges are stored at the same position
+    in weights and edge_movie. Both directions of an edge have the same weight,
+    the smallest one over all the movies the two actors share.
+
+    Attributes:
+        ids (list): The actor id for every integer node
+        index (dict): A dictionary with "actor_id" as key and integer node as value
+        names (list): The actor name for every integer node
+        offsets (array): Start of every node's row in targets, length |V| + 1
+        targets (array): The integer neighbours of all the nodes, row by row
+        weights (array): The weight (10 - rating of edge_movie) of every edge in targets, as float32
+        edge_movie (array): The highest rated movie linking the two actors of every edge in targets
+        movie_ids (list): The movie id for every integer movie
+        movie_names (list): The movie name for every integer movie
+        ratings (array): The rating of every integer movie
+        component (array): The connected component id of every integer node
+        edges (int): How many pairs of actors have an edge between them
+        version (int): Goes up every time graph_updates.py changes the graph
+
+    The arrays may also be memoryviews into a memory-mapped snapshot (see snapshot.py).
+    """
+
+    __slots__ = ("ids", "index", "names", "offsets", "targets", "weights", "edge_movie",
+                 "movie_ids", "movie_names", "ratings", "component", "edges", "version")
+
+    def __init__(self, ids, names, offsets, targets, weights, edge_movie, movie_ids, movie_names,
+                 ratings, edges, component=None, index=None):
+        self.ids = ids
+        self.index = index if index is not None else {actor: v for v, actor in enumerate(ids)}
+        self.names = names
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.edge_movie = edge_movie
+        self.movie_ids = movie_ids
+        self.movie_names = movie_names
+        self.ratings = ratings
+        self.component = component if component is not None else row_components(offsets, targets)
+        self.edges = edges
+        self.version = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, actor):
+        return actor in self.index
+
+    def name(self, actor):
+        """Returns the name of the actor with the given actor id."""
+        return self.names[self.index[actor]]
+
+    def connected(self, s, t):
+        """Returns True if there is a path between the actors s and t."""
+        return self.component[self.index[s]] == self.component[self.index[t]]
+
+    def neighbours(self, v):
+        """Returns the integer neighbours of the integer node v."""
+        return self.targets[self.offsets[v]:self.offsets[v + 1]]
+
+    def edge_slot(self, v, u):
+        """Returns the position of the edge v -> u in targets, or -1 if there is no such edge."""
+        lo, hi = self.offsets[v], self.offsets[v + 1]
+        i = bisect_left(self.targets, u, lo, hi)
+        if i < hi and self.targets[i] == u:
+            return i
+        return -1
+
+    def path_movies(self, path, edge_movie=None):
+        """Finds the movie linking every pair of consecutive actors in path.
+
+        Args:
+            path (list): A list of actor ids
+            edge_movie (array): Which movie to use for every edge, G.edge_movie if not given
+
+        Returns:
+            list: The integer movie linking path[i] and path[i+1], for every i
+        """
+        if edge_movie is None:
+            edge_movie = self.edge_movie
+        index = self.index
+        return [edge_movie[self.edge_slot(index[a], index[b])] for a, b in zip(path, path[1:])]
+
+    def parents_to_ids(self, parents, reached):
+        """Translates an integer parent array back to actor ids.
+
+        Args:
+            parents (array): The integer parent of every node, the root is its own parent
+            reached (iterable): The integer nodes to translate
+
+        Returns:
+            dict: A dictionary with "actor_id" as key and "parent actor" (None for the root) as value
+        """
+        ids = self.ids
+        return {ids[v]: (ids[parents[v]] if parents[v] != v else None) for v in reached}
+
+
+def skip_missing(found, counts):
+    """Drops the movies that were not found (None) from the movies of all the actors.
+
+    Args:
+        found (list): The movies of all the actors, actor by actor, None for a movie that is not known
+        counts (list): How many of the movies belong to every actor
+
+    Returns:
+        found (list): The known movies
+        counts (list): How many of the known movies belong to every actor
+    """
+    if None not in found:
+        return found, counts
+    known = [movie is not None for movie in found]
+    offsets = list(accumulate(counts, initial=0))
+    return list(compress(found, known)), [sum(known[i:j]) for i, j in zip(offsets, offsets[1:])]
+
+
+class GraphBuilder:
+    """Collects movies and actors, one record at a time or many at once, and builds a CSRGraph from them.
+    Movies have to be added before the actors playing in them.
+    """
+
+    def __init__(self):
+        self.movie_ids = []
+        self.movie_index = {}
+        self.movie_names = []
+        self.ratings = array("d")
+        self.casts = []
+
+        self.ids = []
+        self.names = []
+        self.film_offsets = array("q", [0])
+        self.films = array("i")
+
+    def add_movie(self, movie_id, movie_name, rating):
+        self.movie_index[movie_id] = len(self.movie_ids)
+        self.movie_ids.append(movie_id)
+        self.movie_names.append(movie_name)
+        self.ratings.append(rating)
+        self.casts.append(array("i"))
+
+    def add_actor(self, actor_id, actor_name, movies):
+        """Adds an actor and the movies the actor plays in. Movies that have not been added are skipped."""
+        v = len(self.ids)
+        self.ids.append(actor_id)
+        self.names.append(actor_name)
+        movie_index, casts, films = self.movie_index, self.casts, self.films
+        for movie in movies:
+            m = movie_index.get(movie)
+            if m is not None:
+                casts[m].append(v)
+                films.append(m)
+        self.film_offsets.append(len(films))
+
+    def add_movies(self, movie_ids, movie_names, ratings):
+        """Adds many movies at once, like add_movie() for every one of them."""
+        first = len(self.movie_ids)
+        self.movie_index.update(zip(movie_ids, range(first, first + len(movie_ids))))
+        self.movie_ids.extend(movie_ids)
+        self.movie_names.extend(movie_names)
+        self.ratings.extend(ratings)
+        self.casts.extend(array("i") for _ in movie_ids)
+
+    def add_actors(self, actor_ids, actor_names, movies, counts):
+        """Adds many actors at once, like add_actor() for every one of them. The movies of
+        all the actors come in one flat list, so every movie id is looked up and every
+        role is added to its cast without a Python loop per actor.
+
+        Args:
+            actor_ids (list): The actor id of every actor
+            actor_names (list): The actor name of every actor
+            movies (list): The movie ids of all the actors, actor by actor
+            counts (list): How many of the movie ids belong to every actor
+        """
+        first = len(self.ids)
+        self.ids.extend(actor_ids)
+        self.names.extend(actor_names)
+        found, counts = skip_missing(list(map(self.movie_index.get, movies)), counts)
+        owners = chain.from_iterable(map(repeat, range(first, first + len(actor_ids)), counts))
+        self.film_offsets.extend(islice(accumulate(counts, initial=len(self.films)), 1, None))
+        self.films.extend(found)
+        # array.append called from map() adds every role to its cast in C
+        deque(map(array.append, map(self.casts.__getitem__, found), owners), maxlen=0)
+
+    def _rows(self, movie_cost):
+        """Expands every movie into edges between its actors, and keeps the cheapest movie
+        linking every pair of actors (the lowest integer movie if several are as cheap, so
+        both directions of an edge get the same movie).
+
+        The movies of an actor are visited from the most to the least expensive, and each
+        cast overwrites the linking movie of all its actors at once with dict.fromkeys(),
+        so the cheapest movie is left for every co-star without a Python loop over them.
+
+        The rows are handed out in blocks of actors, as flat lists, so the callers fill their
+        arrays with one conversion per block instead of one array.extend() per actor.
+
+        Args:
+            movie_cost (array): The cost of every integer movie
+
+        Yields:
+            targets (list): The sorted neighbours of every actor in the block, row by row
+            movies (list): The cheapest movie linking to each of them
+            lengths (list): The length of every row in the block
+        """
+        casts, film_offsets, films = self.casts, self.film_offsets, self.films
+        cost = movie_cost.__getitem__
+        targets, row_movies, lengths = [], [], []
+        for v in range(len(self.ids)):
+            movies = films[film_offsets[v]:film_offsets[v + 1]]
+            if len(movies) == 1:
+                best = dict.fromkeys(casts[movies[0]], movies[0])
+            else:
+                best = {}
+                # reverse=True keeps the order of equally cheap movies, so visit them from the highest integer movie to let the lowest one win
+                for m in sorted(sorted(movies, reverse=True), key=cost, reverse=True):
+                    best.update(dict.fromkeys(casts[m], m))
+            best.pop(v, None)
+            row = sorted(best)
+            targets += row
+            row_movies += map(best.__getitem__, row)
+            lengths.append(len(row))
+            if len(targets) >= 1 << 16:
+                yield targets, row_movies, lengths
+                targets, row_movies, lengths = [], [], []
+        yield targets, row_movies, lengths
+
+    @timed("build:csr")
+    def build(self):
+        """Expands every movie into edges between its actors.
+
+        Returns:
+            CSRGraph: The graph
+        """
+        ratings = self.ratings
+        offsets = array("q", [0])
+        targets = array("i")
+        weights = array("f")
+        edge_movie = array("i")
+
+        # The highest rated movie is the one with the smallest weight
+        movie_weight = array("d", (10 - rating for rating in ratings))
+        weight = movie_weight.__getitem__
+        for row, movies, lengths in self._rows(movie_weight):
+            offsets.extend(islice(accumulate(lengths, initial=len(targets)), 1, None))
+            targets.extend(array("i", row))
+            weights.extend(array("f", map(weight, movies)))
+            edge_movie.extend(array("i", movies))
+
+        component = cast_components(len(self.ids), self.casts)
+
+        # Every pair of actors is stored once in the row of each of them.
+        return CSRGraph(self.ids, self.names, offsets, targets, weights, edge_movie, self.movie_ids,
+                        self.movie_names, ratings, len(targets) // 2, component)
+
+    @timed("weights:edges")
+    def edge_weights(self, movie_cost):
+        """Makes the weights of another kind of path for the graph made by build(): the
+        weight of every edge is the cost of the cheapest movie the two actors share.
+
+        Args:
+            movie_cost (array): The cost of every integer movie, see oblig2.women_movie_cost()
+
+        Returns:
+            weights (array): The weight of every edge, in the same order as G.targets, as float32
+            edge_movie (array): The cheapest movie linking the two actors of every edge
+        """
+        weights = array("f")
+        edge_movie = array("i")
+        cost = movie_cost.__getitem__
+        for _, movies, _ in self._rows(movie_cost):
+            weights.extend(array("f", map(cost, movies)))
+            edge_movie.extend(array("i", movies))
+        return weights, edge_movie
+
+    @timed("build:bipartite")
+    def build_bipartite(self):
+        """Keeps the actor-movie graph as it is, without expanding the movies into edges.
+
+        Returns:
+            BipartiteGraph: The graph
+        """
+        cast_offsets = array("q", [0])
+        casts = array("i")
+        for cast in self.casts:
+            casts.extend(cast)
+            cast_offsets.append(len(casts))
+        component = cast_components(len(self.ids), self.casts)
+
+        return BipartiteGraph(self.ids, self.names, self.film_offsets, self.films, cast_offsets, casts,
+                              self.movie_ids, self.movie_names, self.ratings, component)
+
+
+def build_csr(actors_in_movie, movies_and_rating, actor_and_movies, actor_names=None):
+    """Builds a CSRGraph from the dictionaries made by readfile().
+
+    Args:
+        actors_in_movie (dict): A dictionary with "movie_id"(as key): ["actor_id", ...](as values)
+        movies_and_rating (dict): A dictionary with "movie_id"(as key): ["movie_name", movie_rating](as values)
+        actor_and_movies (dict): A dictionary with "actor_id"(as key): ["movie_id", ...](as values)
+        actor_names (dict): A dictionary with "actor_id"(as key): "actor_name"(as value), the ids are used as names if not given
+
+    Returns:
+        CSRGraph: The graph
+    """
+    builder = GraphBuilder()
+    for movie, (movie_name, rating) in movies_and_rating.items():
+        builder.add_movie(movie, movie_name, rating)
+    for actor, movies in actor_and_movies.items():
+        builder.add_actor(actor, actor_names[actor] if actor_names is not None else actor, movies)
+    return builder.build()
@@ -0,0 +1,262 @@
+from array import array
+
+from tsv_loader import _read_into_builder
+from union_find import DisjointSet, cast_components
+
+
+def _copy(dst, src, lo, hi):
+    """Appends src[lo:hi] to the array dst, where src may be an array or a memoryview."""
+    if hi > lo:
+        dst.frombytes(memoryview(src)[lo:hi].cast("B"))
+
+
+class GraphUpdater:
+    """Changes a CSRGraph in place when movies, credits or ratings change, without
+    building it again from the .tsv files.
+
+    The updater keeps the cast of every movie and the movies of every actor. A change
+    only marks the actors whose rows are affected, and commit() recomputes those rows
+    from their movies and copies every other row from the old arrays as it is.
+
+    Attributes:
+        G (CSRGraph): The graph that is updated
+        casts (list): The integer actors of every integer movie
+        films (list): The integer movies of every integer actor
+        movie_index (dict): A dictionary with "movie_id" as key and integer movie as value
+    """
+
+    def __init__(self, G, casts, films):
+        self.G = G
+        self.casts = [list(cast) for cast in casts]
+        self.films = [list(movies) for movies in films]
+        self.movie_index = {movie: m for m, movie in enumerate(G.movie_ids)}
+        self._dirty = set()
+        self._merged = []
+        self._split = False
+
+        # The snapshot tables are read-only, and the lists are shared with nothing else.
+        G.ids = list(G.ids)
+        G.names = list(G.names)
+        G.movie_ids = list(G.movie_ids)
+        G.movie_names = list(G.movie_names)
+        G.ratings = array("d", G.ratings)
+        G.component = array("i", G.component)
+        self._next_component = max(G.component, default=-1) + 1
+
+    def add_actor(self, actor_id, actor_name):
+        """Adds an actor without any movies, and returns the integer node of the actor."""
+        G = self.G
+        if actor_id in G.index:
+            return G.index[actor_id]
+        v = len(G.ids)
+        G.ids.append(actor_id)
+        G.names.append(actor_name)
+        G.index[actor_id] = v
+        G.component.append(self._next_component)
+        self._next_component += 1
+        self.films.append([])
+        return v
+
+    def add_movie(self, movie_id, movie_name, rating, cast=()):
+        """Adds a movie, and credits every actor id in cast for it."""
+        if movie_id in self.movie_index:
+            raise ValueError(f"{movie_id} is already in the graph")
+        G = self.G
+        self.movie_index[movie_id] = len(G.movie_ids)
+        G.movie_ids.append(movie_id)
+        G.movie_names.append(movie_name)
+        G.ratings.append(rating)
+        self.casts.append([])
+        for actor in cast:
+            self.add_credit(actor, movie_id)
+
+    def remove_movie(self, movie_id):
+        """Removes every credit for a movie. The movie keeps its integer id, so the
+        integer movies in G.edge_movie stay valid."""
+        m = self.movie_index[movie_id]
+        cast = self.casts[m]
+        for v in cast:
+            self.films[v].remove(m)
+        self._dirty.update(cast)
+        self._split = self._split or len(cast) > 1
+        self.casts[m] = []
+
+    def add_credit(self, actor_id, movie_id):
+        """Adds an actor to the cast of a movie. The actor has to be added first."""
+        v = self.G.index[actor_id]
+        m = self.movie_index[movie_id]
+        if m in self.films[v]:
+            return
+        cast = self.casts[m]
+        if cast:
+            self._merged.append((cast[0], v))
+        self._dirty.update(cast)
+        self._dirty.add(v)
+        cast.append(v)
+        self.films[v].append(m)
+
+    def set_rating(self, movie_id, rating):
+        """Changes the rating of a movie, which changes the weight of the edges it links."""
+        m = self.movie_index[movie_id]
+        self.G.ratings[m] = rating
+        self._dirty.update(self.casts[m])
+
+    def _row(self, v):
+        """Computes the sorted neighbours of v, and the best movie linking v to each of them
+        (the lowest integer movie among equally rated ones, like GraphBuilder)."""
+        casts, ratings = self.casts, self.G.ratings
+        best = {}
+        for m in self.films[v]:
+            rating = ratings[m]
+            for u in casts[m]:
+                if u != v and (u not in best or rating > ratings[best[u]]
+                               or rating == ratings[best[u]] and m < best[u]):
+                    best[u] = m
+        row = sorted(best)
+        return row, [best[u] for u in row]
+
+    def commit(self):
+        """Writes the pending changes into the graph. The weight of every changed edge is
+        10 - rating of the highest rated movie the two actors share, which is the
+        smallest weight over all the movies linking them.
+
+        Returns:
+            int: How many rows were recomputed
+        """
+        G = self.G
+        n = len(G.ids)
+        old_n = len(G.offsets) - 1
+        dirty = sorted(self._dirty | set(range(old_n, n)))
+
+        offsets = array("q", [0])
+        targets = array("i")
+        weights = array("f")
+        edge_movie = array("i")
+        ratings = G.ratings
+
+        previous = 0
+        for v in dirty + [n]:
+            # Copy the untouched rows previous..v-1 as they are, shifting their offsets.
+            end = min(v, old_n)
+            if end > previous:
+                lo, hi = G.offsets[previous], G.offsets[end]
+                shift = len(targets) - lo
+                offsets.extend(G.offsets[w] + shift for w in range(previous + 1, end + 1))
+                _copy(targets, G.targets, lo, hi)
+                _copy(weights, G.weights, lo, hi)
+                _copy(edge_movie, G.edge_movie, lo, hi)
+            if v == n:
+                break
+            row, movies = self._row(v)
+            targets.extend(row)
+            weights.extend(10 - ratings[m] for m in movies)
+            edge_movie.extend(movies)
+            offsets.append(len(targets))
+            previous = v + 1
+
+        G.offsets, G.targets, G.weights, G.edge_movie = offsets, targets, weights, edge_movie
+        G.edges = len(targets) // 2
+        self._update_components()
+        G.version += 1
+
+        self._dirty = set()
+        return len(dirty)
+
+    def _update_components(self):
+        """Merges the components linked by new credits. A removed movie can split a
+        component, and then the components are found again from all the casts."""
+        G = self.G
+        if self._split:
+            G.component = cast_components(len(G.ids), self.casts)
+            self._next_component = max(G.component, default=-1) + 1
+        elif self._merged:
+            component = G.component
+            sets = DisjointSet(self._next_component)
+            for a, b in self._merged:
+                sets.union(component[a], component[b])
+            for v in range(len(component)):
+                component[v] = sets.find(component[v])
+        self._merged = []
+        self._split = False
+
+
+def updater_for(G, movies_filename, actors_filename):
+    """Reads the casts and filmographies from the .tsv files G was built from, without
+    building the graph again.
+
+    Args:
+        G (CSRGraph): The graph, for example loaded from a snapshot
+        movies_filename (str): The movies.tsv data file.
+        actors_filename (str): The actors.tsv data file.
+
+    Returns:
+        GraphUpdater: An updater for G
+    """
+    builder = _read_into_builder(movies_filename, actors_filename)
+    if builder.ids != list(G.ids):
+        raise ValueError("the graph was not built from these files")
+    offsets, films = builder.film_offsets, builder.films
+    return GraphUpdater(G, builder.casts, (films[offsets[v]:offsets[v + 1]] for v in range(len(builder.ids))))
+
+
+def apply_delta(updater, delta_filename):
+    """Applies a tab separated delta file to the graph and commits it. Every line is one of
+
+        add_actor     actor_id  actor_name
+        add_movie     movie_id  movie_name  rating
+        remove_movie  movie_id
+        add_credit    actor_id  movie_id
+        set_rating    movie_id  rating
+
+    Empty lines and lines starting with # are skipped.
+
+    Args:
+        updater (GraphUpdater): The updater of the graph
+        delta_filename (str): Name of the delta file
+
+    Returns:
+        int: How many rows were recomputed
+    """
+    with open(delta_filename) as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if not fields[0] or fields[0].startswith("#"):
+                continue
+            op, args = fields[0], fields[1:]
+            if op == "add_actor":
+                updater.add_actor(args[0], args[1])
+            elif op == "add_movie":
+                updater.add_movie(args[0], args[1], float(args[2]))
+            elif op == "remove_movie":
+                updater.remove_movie(args[0])
+            elif op == "add_credit":
+                updater.add_credit(args[0], args[1])
+            elif op == "set_rating":
+                updater.set_rating(args[0], float(args[1]))
+            else:
+                raise ValueError(f"unknown operation {op!r} in {delta_filename}")
+    return updater.commit()
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from oblig2 import loadgraph
+    from snapshot import save_graph
+
+    parser = argparse.ArgumentParser(description="Applies delta files to the graph snapshot.")
+    parser.add_argument("deltas", nargs="+", help="tab separated delta files, see apply_delta()")
+    parser.add_argument("--movies", default="movies.tsv")
+    parser.add_argument("--actors", default="actors.tsv")
+    parser.add_argument("--snapshot", default="graph.snapshot")
+    parser.add_argument("--out", default="updated.snapshot", help="the snapshot to write the updated graph to")
+    args = parser.parse_args()
+
+    G = loadgraph(args.movies, args.actors, args.snapshot)
+    updater = updater_for(G, args.movies, args.actors)
+    for delta in args.deltas:
+        start = time.time()
+        rows = apply_delta(updater, delta)
+        print(f"Applied {delta}: {rows} rows in {time.time() - start:.2f}s")
+    save_graph(G, args.out)
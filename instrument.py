@@ -0,0 +1,230 @@
+# Opt-in timing, memory and search counters for the build stages and the queries.
+#
+# Nothing is recorded unless one of these environment variables is set when the
+# program starts, so the functions run exactly as before otherwise:
+#
+#     IMDB_INSTRUMENT=1           record every stage and print a summary to stderr at exit
+#     IMDB_METRICS=metrics.jsonl  also write every record to a JSON lines file at exit
+#     IMDB_PROFILE=query:chillest run cProfile on the first stage matching this pattern
+#                                 (fnmatch, for example "query:*" or "build:*") and print the stats
+#     IMDB_PROFILE_OUT=q.prof     write the profile to this file instead, for pstats or snakeviz
+#
+# To profile one particular query, run this file:
+#
+#     python3 instrument.py chillest nm0000255 nm0095013
+import atexit
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from fnmatch import fnmatch
+
+PROFILE = os.environ.get("IMDB_PROFILE")
+PROFILE_OUT = os.environ.get("IMDB_PROFILE_OUT")
+METRICS_FILE = os.environ.get("IMDB_METRICS")
+ENABLED = os.environ.get("IMDB_INSTRUMENT", "0") != "0" or bool(METRICS_FILE) or bool(PROFILE)
+
+# Every finished stage, as a dictionary, see stage()
+metrics = []
+
+_local = threading.local()
+_profiled = False
+
+
+def _memory_mb():
+    """Returns the resident memory of this process in MB, or the peak where it cannot be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        from tsv_loader import peak_memory_mb
+        return peak_memory_mb()
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+class _Stage:
+    __slots__ = ("record", "_start", "_profiler")
+
+    def __init__(self, name, labels):
+        self.record = {"stage": name, **labels, "counters": {}} if ENABLED else None
+
+    def __enter__(self):
+        global _profiled
+        record = self.record
+        if record is None:
+            return None
+        self._profiler = None
+        if PROFILE and not _profiled and fnmatch(record["stage"], PROFILE):
+            _profiled = True
+            self._profiler = cProfile.Profile()
+        record["memory_before_mb"] = _memory_mb()
+        _stack().append(record)
+        if self._profiler is not None:
+            self._profiler.enable()
+        self._start = time.perf_counter()
+        return record
+
+    def __exit__(self, *exc):
+        record = self.record
+        if record is None:
+            return
+        record["seconds"] = time.perf_counter() - self._start
+        if self._profiler is not None:
+            self._profiler.disable()
+            _print_profile(record["stage"], self._profiler)
+        record["memory_after_mb"] = _memory_mb()
+        _stack().pop()
+        metrics.append(record)
+
+
+def stage(name, **labels):
+    """Context manager that records one stage: its wall time, the resident memory before
+    and after, and the counters added with count() while it runs. Does nothing unless
+    instrumentation is enabled.
+
+        with stage("build:csr", actors=len(ids)):
+            ...
+    """
+    return _Stage(name, labels)
+
+
+def timed(name):
+    """Decorator that runs the function inside stage(name). When instrumentation is off,
+    the function is returned as it is, so it costs nothing."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(**counters):
+    """Adds to the counters of the innermost stage running in this thread, for example
+    count(nodes_popped=popped, heap_pushes=pushes)."""
+    stack = _stack()
+    if stack:
+        totals = stack[-1]["counters"]
+        for key, value in counters.items():
+            totals[key] = totals.get(key, 0) + value
+
+
+def _print_profile(name, profiler):
+    if PROFILE_OUT:
+        profiler.dump_stats(PROFILE_OUT)
+        print(f"Wrote the profile of {name} to {PROFILE_OUT}", file=sys.stderr)
+        return
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(25)
+    print(f"\nProfile of {name}\n{out.getvalue()}", file=sys.stderr)
+
+
+def export(filename):
+    """Writes every recorded stage to a JSON lines file, one object per stage."""
+    with open(filename, "w") as f:
+        for record in metrics:
+            f.write(json.dumps(record) + "\n")
+
+
+def summary():
+    """Groups the records by stage.
+
+    Returns:
+        dict: A dictionary with the stage name as key and the number of calls, the total,
+            median and largest time in seconds, the largest memory and the summed counters as value
+    """
+    groups = {}
+    for record in metrics:
+        groups.setdefault(record["stage"], []).append(record)
+
+    result = {}
+    for name, records in groups.items():
+        times = sorted(record["seconds"] for record in records)
+        totals = {}
+        for record in records:
+            for key, value in record["counters"].items():
+                totals[key] = totals.get(key, 0) + value
+        result[name] = {
+            "calls": len(records),
+            "total_s": sum(times),
+            "p50_s": times[len(times) // 2],
+            "max_s": times[-1],
+            "memory_mb": max(record["memory_after_mb"] for record in records),
+            "counters": totals,
+        }
+    return result
+
+
+def print_summary(file=sys.stderr):
+    """Prints summary() as a table."""
+    print(f"\n{'stage':24} {'calls':>7} {'total':>10} {'p50':>10} {'max':>10} {'memory':>9}  counters", file=file)
+    for name, s in summary().items():
+        counters = " ".join(f"{k}={v}" for k, v in s["counters"].items())
+        print(f"{name:24} {s['calls']:7} {s['total_s']:9.3f}s {1000 * s['p50_s']:8.2f}ms "
+              f"{1000 * s['max_s']:8.2f}ms {s['memory_mb']:7.0f}MB  {counters}", file=file)
+
+
+def _at_exit():
+    if not metrics:
+        return
+    if METRICS_FILE:
+        export(METRICS_FILE)
+    print_summary()
+
+
+if ENABLED:
+    atexit.register(_at_exit)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Runs one query under cProfile and prints its counters.")
+    parser.add_argument("kind", choices=["shortest", "chillest", "women", "dijkstra"])
+    parser.add_argument("source")
+    parser.add_argument("target")
+    parser.add_argument("--movies", default="movies.tsv")
+    parser.add_argument("--actors", default="actors.tsv")
+    parser.add_argument("--snapshot", default="graph.snapshot")
+    parser.add_argument("--data", default="data.tsv", help="the actress data file, used for women")
+    parser.add_argument("--out", default=None, help="write the profile to this file instead of printing it")
+    args = parser.parse_args()
+
+    # The search modules only count when instrumentation is on at import time
+    ENABLED = True
+    PROFILE, PROFILE_OUT = "query:*", args.out
+    sys.modules["instrument"] = sys.modules["__main__"]
+    import oblig2
+
+    G = oblig2.loadgraph(args.movies, args.actors, args.snapshot)
+    if args.kind == "women":
+        w_w, _ = oblig2.women_edge_weights(G, args.movies, args.actors, args.data)
+        metrics.clear()
+
+    if args.kind == "shortest":
+        path = oblig2.bfs_shortest_path_between(G, args.source, args.target)
+    elif args.kind == "chillest":
+        path, _ = oblig2.chillest_path_between(G, args.source, args.target)
+    elif args.kind == "women":
+        path = oblig2.least_sexistic_path(G, w_w, args.source, args.target)
+    else:
+        parents, _ = oblig2.dijkstra(G, args.source, args.target)
+        path = [args.target] if args.target in parents else []
+    record = metrics[-1]
+    print(f"\n{len(path)} actors on the path, {1000 * record['seconds']:.2f}ms")
+    print(" ".join(f"{k}={v}" for k, v in record["counters"].items()))
+    metrics.clear()
@@ -0,0 +1,261 @@
+import random
+import time
+from array import array
+from heapq import heappush, heappop
+
+from oblig2 import _dijkstra_tree, dijkstra, dijkstra_women
+from snapshot import read_sections, stamp_matches, weights_stamp, write_sections
+
+MAGIC = b"IMDBALT\0"
+VERSION = 2
+
+
+class Landmarks:
+    """Distances from a few landmark actors to every actor, used as A* lower bounds.
+
+    By the triangle inequality d(L, t) <= d(L, v) + d(v, t), and the edges weigh the
+    same both ways, so |d(L, t) - d(L, v)| is a lower bound on the distance from v to t
+    for every landmark L.
+
+    Attributes:
+        nodes (array): The integer node of every landmark
+        distances (list): The distance from every landmark to every integer node
+    """
+
+    __slots__ = ("nodes", "distances")
+
+    def __init__(self, nodes, distances):
+        self.nodes = nodes
+        self.distances = distances
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def bounds(self, target):
+        """Returns the landmarks that can reach target, as (distance to target, distances) pairs."""
+        return [(distances[target], distances) for distances in self.distances
+                if distances[target] != float('inf')]
+
+
+def choose_landmarks(G, k):
+    """Chooses k high-degree actors from the largest component, skipping actors that are
+    neighbours of a landmark already chosen so the landmarks are spread out.
+
+    Args:
+        G (CSRGraph): The graph
+        k (int): How many landmarks to choose
+
+    Returns:
+        list: The integer nodes of the landmarks
+    """
+    offsets, targets, component = G.offsets, G.targets, G.component
+
+    sizes = {}
+    for c in component:
+        sizes[c] = sizes.get(c, 0) + 1
+    largest = max(sizes, key=sizes.get)
+
+    by_degree = sorted((v for v in range(len(G)) if component[v] == largest),
+                       key=lambda v: offsets[v + 1] - offsets[v], reverse=True)
+    chosen = []
+    covered = set()
+    for v in by_degree:
+        if len(chosen) == k:
+            break
+        if v in covered:
+            continue
+        chosen.append(v)
+        covered.update(targets[offsets[v]:offsets[v + 1]])
+    return chosen
+
+
+def compute_landmarks(G, weights, k=16):
+    """Runs a full Dijkstra from every landmark.
+
+    Args:
+        G (CSRGraph): The graph
+        weights (array): The weight of every edge in G.targets, G.weights or the women weights
+        k (int): How many landmarks to use
+
+    Returns:
+        Landmarks: The landmarks and their distance arrays
+    """
+    nodes = choose_landmarks(G, k)
+    distances = [_dijkstra_tree(G, weights, v)[1] for v in nodes]
+    return Landmarks(array("i", nodes), distances)
+
+
+def save_landmarks(G, landmarks, filename, weights, kind, sources=()):
+    """Writes the landmark distances to a binary file next to the graph snapshot, see
+    snapshot.write_sections(). The file remembers the graph and the weights the distances
+    were computed with, see snapshot.weights_stamp().
+
+    Args:
+        G (CSRGraph): The graph the landmarks were computed for
+        landmarks (Landmarks): The landmarks
+        filename (str): Name of the landmark file
+        weights (array): The weights the landmarks were computed with
+        kind (str): Which weights they are, "chill" or "women"
+        sources (list): The .tsv files the graph was built from
+    """
+    distances = array("d")
+    for row in landmarks.distances:
+        distances.frombytes(memoryview(row).cast("B"))
+    sections = [("nodes", "i", landmarks.nodes), ("distances", "d", distances)]
+    write_sections(filename, MAGIC, VERSION, weights_stamp(G, weights, kind, sources), sections)
+
+
+def load_landmarks(G, filename, weights, kind, sources=None):
+    """Maps a landmark file written by save_landmarks() into memory.
+
+    The lower bounds are only valid for the weights the distances were computed with, so
+    a file made for another graph, before a rating changed, or for the other kind of
+    weights is not used.
+
+    Args:
+        G (CSRGraph): The graph the landmarks should belong to
+        filename (str): Name of the landmark file
+        weights (array): The weights the landmarks should be computed with
+        kind (str): Which weights they are, "chill" or "women"
+        sources (list): The .tsv files the graph was built from, not checked if None
+
+    Returns:
+        Landmarks: The landmarks, or None if the file is missing or was made for another graph or other weights
+    """
+    toc, values = read_sections(filename, MAGIC, VERSION)
+    if toc is None or not stamp_matches(toc, G, weights, kind, sources):
+        return None
+    n = len(G)
+    distances = values["distances"]
+    return Landmarks(values["nodes"], [distances[i * n:(i + 1) * n] for i in range(len(values["nodes"]))])
+
+
+def astar(G, weights, landmarks, s, e):
+    """A* between two actors, with the landmark lower bounds as heuristic (ALT).
+    Without landmarks it is the same as Dijkstra stopping at e.
+
+    Args:
+        G (CSRGraph): The graph
+        weights (array): The weight of every edge in G.targets, the same weights the landmarks were computed with
+        landmarks (Landmarks): The landmarks, or None
+        s (str): The actor id of the root
+        e (str): The actor id of the end
+
+    Returns:
+        path (list): A list containing the lightest path, empty if there is no path
+        weight (float): The total weight of the path
+        settled (int): How many nodes were taken out of the heap
+    """
+    if s not in G or e not in G:
+        return [], float('inf'), 0
+    offsets, targets = G.offsets, G.targets
+    root, end = G.index[s], G.index[e]
+    if G.component[root] != G.component[end]:
+        return [], float('inf'), 0
+
+    bounds = landmarks.bounds(end) if landmarks is not None else []
+
+    def h(v):
+        best = 0
+        for to_end, distances in bounds:
+            bound = abs(to_end - distances[v])
+            if bound > best:
+                best = bound
+        return best
+
+    dist = {root: 0}
+    parents = {root: root}
+    Q = [(h(root), 0, root)]
+    settled = 0
+    while Q:
+        _, cost, v = heappop(Q)
+        if cost > dist[v]:
+            continue
+        settled += 1
+        if v == end:
+            break
+        for i in range(offsets[v], offsets[v + 1]):
+            u = targets[i]
+            c = cost + weights[i]
+            if c < dist.get(u, float('inf')):
+                dist[u] = c
+                parents[u] = v
+                heappush(Q, (c + h(u), c, u))
+
+    path = [end]
+    while path[-1] != root:
+        path.append(parents[path[-1]])
+    path.reverse()
+    return [G.ids[v] for v in path], dist[end], settled
+
+
+def benchmark(G, weights, landmarks, pairs, w_w=None):
+    """Compares A* with landmarks, A* without (Dijkstra stopping at the end) and the
+    full oblig2.dijkstra() (or dijkstra_women()) on the given pairs, and prints the
+    settled nodes and latency. The full Dijkstra settles every node it reaches.
+
+    Args:
+        G (CSRGraph): The graph
+        weights (array): The weights the landmarks were computed with, G.weights or w_w
+        landmarks (Landmarks): The landmarks
+        pairs (list): A list of ("actor_id1", "actor_id2") tuples
+        w_w (array): The women weights, if weights are the women weights
+    """
+    if weights is G.weights:
+        def full(s):
+            _, D = dijkstra(G, s)
+            return len(D)
+    else:
+        def full(s):
+            return len(dijkstra_women(G, w_w, s))
+
+    results = {"alt": [0, 0.0], "dijkstra (stop at e)": [0, 0.0], "dijkstra (full)": [0, 0.0]}
+    for s, e in pairs:
+        for name, lm in (("alt", landmarks), ("dijkstra (stop at e)", None)):
+            start = time.perf_counter()
+            _, _, settled = astar(G, weights, lm, s, e)
+            results[name][0] += settled
+            results[name][1] += time.perf_counter() - start
+        start = time.perf_counter()
+        results["dijkstra (full)"][0] += full(s)
+        results["dijkstra (full)"][1] += time.perf_counter() - start
+
+    for name, (settled, seconds) in results.items():
+        print(f"{name:22} {settled / len(pairs):10.0f} settled/query {1000 * seconds / len(pairs):10.2f} ms/query")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from oblig2 import loadgraph, women_edge_weights
+
+    parser = argparse.ArgumentParser(description="Precomputes ALT landmarks and benchmarks A* against Dijkstra.")
+    parser.add_argument("--movies", default="movies.tsv")
+    parser.add_argument("--actors", default="actors.tsv")
+    parser.add_argument("--data", default="data.tsv", help="the actress data file, for the women landmarks")
+    parser.add_argument("--snapshot", default="graph.snapshot")
+    parser.add_argument("--landmarks", type=int, default=16, help="how many landmarks to use")
+    parser.add_argument("--queries", type=int, default=100, help="how many random pairs to benchmark")
+    args = parser.parse_args()
+
+    sources = [args.movies, args.actors]
+    G = loadgraph(args.movies, args.actors, args.snapshot)
+    w_w, _ = women_edge_weights(G, args.movies, args.actors, args.data)
+
+    rng = random.Random(2010)
+    pairs = None
+    for kind, weights in (("chill", G.weights), ("women", w_w)):
+        landmark_filename = f"{args.snapshot}.landmarks-{kind}"
+        landmarks = load_landmarks(G, landmark_filename, weights, kind, sources)
+        if landmarks is None or len(landmarks) != args.landmarks:
+            start = time.time()
+            landmarks = compute_landmarks(G, weights, args.landmarks)
+            save_landmarks(G, landmarks, landmark_filename, weights, kind, sources)
+            print(f"\nComputed {len(landmarks)} {kind} landmarks in {time.time() - start:.1f}s")
+
+        if pairs is None:
+            largest = G.component[landmarks.nodes[0]]
+            actors = [G.ids[v] for v in range(len(G)) if G.component[v] == largest]
+            pairs = [(rng.choice(actors), rng.choice(actors)) for _ in range(args.queries)]
+        print(f"\n{kind} weights\n")
+        benchmark(G, weights, landmarks, pairs, w_w)
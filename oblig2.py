@@ -1,12 +1,26 @@
-import csv
-from collections import defaultdict, deque, OrderedDict
-from heapq import heappush, heappop
-import requests
-from bs4 import BeautifulSoup as soup
-
-
+import asyncio
+from array import array
+from collections import Counter, defaultdict, deque, OrderedDict
+from itertools import accumulate, chain, repeat
+import re
+from csr_graph import GraphBuilder, build_csr, skip_missing
+import instrument
+from instrument import stage, timed
+from quotes import QuoteFetcher, print_quote
+from search import EdgeArrayCost, MovieCost, bidirectional_path, lightest_path, lightest_tree
+from snapshot import load_graph, save_graph
+from tsv_loader import _read_into_builder, actor_blocks, load_bipartite, load_csr, movie_blocks, paused_gc
+
+# Every field starting with "tt", and every line where the professions start with "actr", in data.tsv
+_MOVIE_FIELD = re.compile(r"(?<=\t)tt[^\t\n]*")
+_ACTRESS_LINE = re.compile(r"^(?:[^\t\n]*\t){4}actr.*$", re.M)
+
+
+@timed("parse:readfile")
 def readfile(movies_filename, actors_filename):
     """Reads the actors.tsv and the movies.tsv files and creates 4 useful dictionaries.
+    The files are read a block of lines at a time by tsv_loader, and every movie id in
+    actors.tsv is replaced by the same string from movies.tsv, so the dictionaries share them.
 
     Args:
         movies_filename (str): The movies.tsv data file.
@@ -25,241 +39,322 @@ def readfile(movies_filename, actors_filename):
     actor_and_movies = {}
     nodes = 0
 
-    with open(movies_filename) as file:
-        tsv_file = csv.reader(file, delimiter="\t")
-        for line in tsv_file:
-            movie_id = line[0]
-            movie_name = ""
-
-            for word in line[1:-3]:
-                movie_name += word + " "
-            movie_name += line[-3]
-
-            rating = float(line[-2])
-            movies_and_rating[movie_id] = [movie_name, rating]
-
-            actors_in_movie[movie_id] = []
-    
-    with open(actors_filename) as file:
-        tsv_file = csv.reader(file, delimiter="\t")
-        for line in tsv_file:
-            name_id = line[0]
-            nodes += 1
-            
-            movie_id_list = []
+    with paused_gc():
+        for movie_ids, movie_names, ratings in movie_blocks(movies_filename):
+            movies_and_rating.update(zip(movie_ids, map(list, zip(movie_names, ratings))))
+            actors_in_movie.update((movie, []) for movie in movie_ids)
 
-            name = ""
-            i = 1
-            while line[i][:2] != "tt":
-                name += line[i] + " "
-                i += 1
-            for movie in line[i:]:
-                if movie in movies_and_rating:
-                    actors_in_movie[movie].append(name_id)
-                    movie_id_list.append(movie)
+        # Looking a movie id up gives the string from movies.tsv, or None for a movie that is not there
+        movie_key = {movie: movie for movie in movies_and_rating}
+        for actor_ids, names, movies, counts in actor_blocks(actors_filename):
+            nodes += len(actor_ids)
+            actor_names.update(zip(actor_ids, names))
 
-            actor_names[name_id] = name
+            found, counts = skip_missing(list(map(movie_key.get, movies)), counts)
+            owners = chain.from_iterable(map(repeat, actor_ids, counts))
+            # list.append called from map() adds every actor to the casts in C
+            deque(map(list.append, map(actors_in_movie.__getitem__, found), owners), maxlen=0)
 
-            actor_and_movies[name_id] = movie_id_list
+            offsets = list(accumulate(counts, initial=0))
+            actor_and_movies.update(zip(actor_ids, map(found.__getitem__, map(slice, offsets, offsets[1:]))))
 
     return nodes, actors_in_movie, actor_names, movies_and_rating, actor_and_movies
 
-def buildgraph(actors_in_movie, movies_and_rating, actor_and_movies):
-    """Creates a dict for edges in the graph, a set of all the actors and a
-    dict with all the weights.
+def buildgraph(actors_in_movie, movies_and_rating, actor_and_movies, actor_names=None):
+    """Creates the graph with an integer node for every actor, the neighbours of
+    every actor and the weights of all the edges (see csr_graph.CSRGraph).
 
     Args:
         actors_in_movie (dict): A dictionary with "movie_id"(as key): ["actor_id", ...](as values)
         movies_and_rating (dict): A dictionary with "movie_id"(as key): ["movie_name", movie_rating](as values)
         actor_and_movies (dict): A dictionary with "actor_id"(as key): ["movie_id", ...](as values)
+        actor_names (dict): A dictionary with "actor_id"(as key): "actor_name"(as value)
 
     Returns:
-        set: A set of all the actor_ids.
-        dict(set): A dictionary with "actor_id"(as key): {"ngbr_actor_id1", ...}(as values)
-        dict: A dictionary with ("actor_id1", "actor_id2")(as key): weight(as value)
-        int: How many edges the graph contains.
+        CSRGraph: The graph, G.ids holds the actor_ids and G.edges how many edges the graph contains.
     """
-    
-    V = set() # Set with all the actors
-    E = defaultdict(set) # All the actors with the connected actors
-    w = dict()
-   
-    edges = 0
-    for actor, movies in actor_and_movies.items():
-        V.add(actor)
-        for movie in movies:
-            rating = movies_and_rating[movie][1]
-            weight = 10 - rating
+    G = build_csr(actors_in_movie, movies_and_rating, actor_and_movies, actor_names)
 
-            for ngbr_actor in actors_in_movie[movie]:
-                if ngbr_actor == actor:
-                    continue
-                if ngbr_actor not in E:
-                    edges += 1
+    print("Oppgave 1\n")
+    print(f"Nodes: {len(G)}")
+    print(f"Edges: {G.edges}")
 
-                E[actor].add(ngbr_actor)
+    return G
+
+def loadgraph(movies_filename, actors_filename, snapshot_filename):
+    """Loads the graph from a binary snapshot, or reads the .tsv files, builds the graph
+    and writes a new snapshot if there is none or the .tsv files have changed since.
+
+    Args:
+        movies_filename (str): The movies.tsv data file.
+        actors_filename (str): The actors.tsv data file.
+        snapshot_filename (str): The snapshot file, see snapshot.py
+
+    Returns:
+        CSRGraph: The graph
+    """
+    sources = [movies_filename, actors_filename]
+    with stage("load:snapshot"):
+        G = load_graph(snapshot_filename, sources)
+    if G is None:
+        G = load_csr(*sources)
+        save_graph(G, snapshot_filename, sources)
 
-                w[(actor, ngbr_actor)] = weight
-            
-    nodes = len(V)
-    
     print("Oppgave 1\n")
-    print(f"Nodes: {nodes}")
-    print(f"Edges: {edges}")
+    print(f"Nodes: {len(G)}")
+    print(f"Edges: {G.edges}")
 
-    return V, E, w, edges
+    return G
 
-def bfs_shortest_paths_from(G, s):
-    _, E, _, _ = G
-    parents = {s : None}
-    queue = deque([s])
+def _bfs_tree(G, root):
+    """BFS over the integer nodes of G from the integer node root.
+
+    Returns:
+        parents (array): The integer parent of every node, -1 if not reached, root is its own parent
+        result (list): The reached nodes in the order they were visited
+    """
+    offsets, targets = G.offsets, G.targets
+    parents = array("i", [-1]) * len(G)
+    parents[root] = root
+    queue = deque([root])
     result = []
 
     while queue:
         v = deque.popleft(queue)
         result.append(v)
-        for u in E[v]:
-            if u not in parents:
+        for u in targets[offsets[v]:offsets[v + 1]]:
+            if parents[u] < 0:
                 parents[u] = v
                 queue.append(u)
-    return parents
 
+    if instrument.ENABLED:
+        instrument.count(nodes_popped=len(result), queue_pushes=len(result),
+                         edges_scanned=sum(offsets[v + 1] - offsets[v] for v in result))
+    return parents, result
+
+def _tree_path(G, parents, v):
+    """Follows an integer parent array from v back to the root and returns the path as actor ids."""
+    path = [v]
+    while parents[v] != v:
+        v = parents[v]
+        path.append(v)
+    path.reverse()
+    return [G.ids[v] for v in path]
+
+@timed("query:bfs_tree")
+def bfs_shortest_paths_from(G, s):
+    parents, result = _bfs_tree(G, G.index[s])
+    return G.parents_to_ids(parents, result)
+
+def _bfs_expand(G, frontier, seen, other_seen):
+    """Expands one BFS level of a bidirectional search.
+
+    Args:
+        G (CSRGraph): The graph
+        frontier (list): The integer nodes of the current level
+        seen (dict): Integer node as key and the node it was found from as value, for this side
+        other_seen (dict): The same dictionary for the other side of the search
+
+    Returns:
+        list: The next level
+        int: The node where the two searches meet, None if they have not met
+    """
+    offsets, targets = G.offsets, G.targets
+    next_level = []
+    for v in frontier:
+        for u in targets[offsets[v]:offsets[v + 1]]:
+            if u not in seen:
+                seen[u] = v
+                if u in other_seen:
+                    return next_level, u
+                next_level.append(u)
+    return next_level, None
+
+@timed("query:shortest")
 def bfs_shortest_path_between(G, s, t):
-    parents = bfs_shortest_paths_from(G, s)
-    v = t
-    path = []
+    """Finds the shortest path between two actors with a bidirectional BFS. The
+    smallest of the two frontiers is expanded one level at a time, and the search
+    stops as soon as the two searches meet.
 
-    if t not in parents:
-        return path
+    Args:
+        G (CSRGraph): The graph
+        s (str): The actor id of the root
+        t (str): The actor id of the end
 
-    while v:
+    Returns:
+        path (list): A list containing the shortest path, empty if there is no path
+    """
+    if s not in G or t not in G:
+        return []
+    source, target = G.index[s], G.index[t]
+    if source == target:
+        return [s]
+    if G.component[source] != G.component[target]:
+        return []
+
+    parents = {source: source}
+    children = {target: target}
+    front, back = [source], [target]
+    meet = None
+    expanded = 0
+    while front and back and meet is None:
+        expanded += min(len(front), len(back))
+        if len(front) <= len(back):
+            front, meet = _bfs_expand(G, front, parents, children)
+        else:
+            back, meet = _bfs_expand(G, back, children, parents)
+
+    if instrument.ENABLED:
+        # The last level may stop early, so nodes_popped is an upper bound
+        instrument.count(nodes_popped=expanded, queue_pushes=len(parents) + len(children) - 2)
+
+    if meet is None:
+        return []
+
+    path = []
+    v = meet
+    while v != source:
         path.append(v)
         v = parents[v]
+    path.append(source)
     path.reverse()
-    return path
+    v = meet
+    while v != target:
+        v = children[v]
+        path.append(v)
+    return [G.ids[v] for v in path]
 
-def print_shortest_path(shortest_path):
+def print_shortest_path(G, shortest_path):
     print("\nOppgave 2\n")
-    print(actor_names[shortest_path[0]])
+    print(G.name(shortest_path[0]))
 
-    for i in range(1, len(shortest_path)):
-        actor1, actor2 = shortest_path[i-1], shortest_path[i]
-        for (movie, actors) in actors_in_movie.items():
-            if actor1 in actors and actor2 in actors:
-                movie_name = movies_and_rating[movie][0]
-                movie_rating = float(movies_and_rating[movie][1])
-        print(f"===[ {movie_name} {movie_rating} ] ===> {actor_names[shortest_path[i]]}")
+    for movie, actor in zip(G.path_movies(shortest_path), shortest_path[1:]):
+        print(f"===[ {G.movie_names[movie]} {G.ratings[movie]} ] ===> {G.name(actor)}")
 
-def dijkstra(G, s):
+def _dijkstra_tree(G, weights, root, end=-1):
+    """Dijkstra over the integer nodes of G, with the weight of every edge in weights,
+    see search.lightest_tree(). The search stops as soon as end is settled.
+
+    Returns:
+        parents (array): The integer parent of every node, -1 if not reached, root is its own parent
+        dist (array): The total weight from root to every node
+        reached (list): The reached nodes
+    """
+    parents, _, dist = lightest_tree(EdgeArrayCost(G, weights), root, end)
+    reached = [v for v in range(len(G)) if parents[v] >= 0]
+    return parents, dist, reached
+
+def _dijkstra(G, weights, s, e=None):
+    """Dijkstra from the actor s, see _dijkstra_tree(). If e is given the search stops as soon as e is settled.
+
+    Returns:
+        parents (dict): A dictionary with "actor_id" as key and "parent actor" as value
+        D (dict): A dictionary with "actor_id" as key and "total weight" as value
+    """
+    end = G.index[e] if e is not None else -1
+    parents, dist, reached = _dijkstra_tree(G, weights, G.index[s], end)
+
+    D = defaultdict(lambda: float('inf'))
+    for v in reached:
+        D[G.ids[v]] = dist[v]
+    return G.parents_to_ids(parents, reached), D
+
+def _bidirectional_dijkstra(G, weights, s, e):
+    """Bidirectional Dijkstra between two actors, see search.bidirectional_path(). Paths
+    of the same weight are compared by their tie, so the path found is the same as the
+    one from contraction.ch_path_between().
+
+    Args:
+        G (CSRGraph): The graph
+        weights (array): The weight of every edge in G.targets
+        s (str): The actor id of the root
+        e (str): The actor id of the end
+
+    Returns:
+        path (list): A list containing the lightest path, empty if there is no path
+        weight (float): The total weight of the path
+    """
+    path, _, weight = bidirectional_path(G, EdgeArrayCost(G, weights), s, e)
+    return path, weight
+
+def _path_weight(G, weights, path):
+    """Adds up the weights along a path of integer nodes, from the start. Summing in
+    path order makes every search that finds the same path report the same weight."""
+    weight = 0
+    for v, u in zip(path, path[1:]):
+        weight += weights[G.edge_slot(v, u)]
+    return weight
+
+@timed("query:dijkstra")
+def dijkstra(G, s, e=None):
     """Implements the Dijkstra-algorithm to calculate the chillest path in the graph.
 
     Args:
-        G (tuple): A tuple containing the graph
+        G (CSRGraph): The graph
         s (str): The actor id of the root
+        e (str): The actor id of the end, if given the search stops when e is settled
 
     Returns:
         parents (dict): A dictionary with "actor_id" as key and "parent actor" as value
         D (dict): A dictionary with "actor_id" as key and "total weight" as value
     """
-    _, E, w, _ = G
-    Q = [(0, s)]
-    
-    D = defaultdict(lambda: float('inf'))
-    parents = {s : None}
-    D[s] = 0
-    while Q:
-        cost, v = heappop(Q)
-        for u in E[v]:
-            c = cost + w[(v, u)]
-            if c < D[u]:
-                D[u] = c
-                heappush(Q, (c, u))
-                parents[u] = v
-                
-    return parents, D
+    return _dijkstra(G, G.weights, s, e)
 
+@timed("query:chillest")
 def chillest_path_between(G, s, e):
-    """Uses Dijkstra to calculate the chillest path between two actors.
+    """Uses bidirectional Dijkstra to calculate the chillest path between two actors.
 
     Args:
-        G (tuple): A tuple containing the graph
+        G (CSRGraph): The graph
         s (str): The actor id of the root
         e (str): The actor id of the end
 
     Returns:
-        chillest_path (list): A list containing the chillest path
+        chillest_path (list): A list containing the chillest path, empty if there is no path
         weight (float): The total weight from the root to the end of the chillest path
     """
-    parents, D = dijkstra(G, s)
-
-    weight = D[e]
-    chillest_path = [e]
-    while parents[e]:
-        e = parents[e]
-        chillest_path.append(e)
-    chillest_path.reverse()
-
-    return chillest_path, weight
+    return _bidirectional_dijkstra(G, G.weights, s, e)
 
-def print_chillest_path(chillest_path, weight):
+def print_chillest_path(G, chillest_path, weight):
     """Prints the chillest path calculated by chillest_path_between().
 
     Args:
+        G (CSRGraph): The graph
         chillest_path (list): A list containing the path
         weight (float): The total weight from the root to the end of the chillest path
     """
     print("\nOppgave 3\n")
-    print(actor_names[chillest_path[0]])
-    for i in range(1, len(chillest_path)):
-        actor1, actor2 = chillest_path[i-1], chillest_path[i]
-        max_movie_rating = 0
-        for (movie, actors) in actors_in_movie.items():
-            if actor1 in actors and actor2 in actors:
-                movie_name = movies_and_rating[movie][0]
-                movie_rating = float(movies_and_rating[movie][1])
-
-                if movie_rating > max_movie_rating:
-                    max_movie_name = movie_name
-                    max_movie_rating = movie_rating
-
-        print(f"===[ {max_movie_name} {max_movie_rating} ] ===> {actor_names[chillest_path[i]]}")
+    print(G.name(chillest_path[0]))
+    for movie, actor in zip(G.path_movies(chillest_path), chillest_path[1:]):
+        print(f"===[ {G.movie_names[movie]} {G.ratings[movie]} ] ===> {G.name(actor)}")
     print(f"Total weight: {weight:.1f}")
 
+@timed("query:components")
 def components(G):
-    """Calculates the number of connected components of different sizes.
+    """Calculates the number of connected components of different sizes. The components
+    are found with union-find over the movie casts when the graph is built, and
+    G.component holds the component id of every actor.
 
     Args:
-        G (tuple): A tuple containing the graph
+        G (CSRGraph): The graph
 
     Returns:
         o_size (dict): A dictionary with "size" as key and "numbers of components with size" as value 
     """
-    V, E, _, _ = G
-    sizes = dict()
-    visited = set()
+    component_sizes = dict()
+    for c in G.component:
+        if c in component_sizes:
+            component_sizes[c] += 1
+        else:
+            component_sizes[c] = 1
 
-    for actor in V:
-        if actor in visited:
-            continue
-        
+    sizes = dict()
+    for size in component_sizes.values():
+        if size in sizes:
+            sizes[size] += 1
         else:
-            queue = deque([actor])
-            parents = {actor : None}
-
-            while queue:
-                v = deque.popleft(queue)
-                for u in E[v]:
-                    if u not in parents:
-                        visited.add(u)
-                        parents[u] = v
-                        queue.append(u)
-            
-            size = len(parents)
-            if size in sizes:
-                sizes[size] += 1
-            else:
-                sizes[size] = 1
-    
+            sizes[size] = 1
+
     o_sizes = OrderedDict(sorted(sizes.items(), reverse=True))
     return o_sizes
     
@@ -277,7 +372,7 @@ def create_txt(G, outfile):
     """Creates a .txt file with the examples from the assignment
 
     Args:
-        G (tuple): A tuple containing the graph
+        G (CSRGraph): The graph
         outfile (str): Name of the text file created
     """     
 
@@ -286,22 +381,16 @@ def create_txt(G, outfile):
 
     with open(outfile, "w") as f:
         f.write("Oppgave 1\n\n")
-        V, E, w, edges = G
-        f.write(f"Nodes: {len(V)}\n")
-        f.write(f"Edges: {edges}\n\n")
+        f.write(f"Nodes: {len(G)}\n")
+        f.write(f"Edges: {G.edges}\n\n")
 
         f.write("Oppgave 2\n\n")
         for nm_id1, nm_id2 in zip(nm_id1_list, nm_id2_list):
             shortest_path = bfs_shortest_path_between(G, nm_id1, nm_id2)
-            f.write(f"{actor_names[shortest_path[0]]}\n")
+            f.write(f"{G.name(shortest_path[0])}\n")
 
-            for i in range(1, len(shortest_path)):
-                actor1, actor2 = shortest_path[i-1], shortest_path[i]
-                for (movie, actors) in actors_in_movie.items():
-                    if actor1 in actors and actor2 in actors:
-                        movie_name = movies_and_rating[movie][0]
-                        movie_rating = float(movies_and_rating[movie][1])
-                f.write(f"===[ {movie_name} {movie_rating} ] ===> {actor_names[shortest_path[i]]}\n")
+            for movie, actor in zip(G.path_movies(shortest_path), shortest_path[1:]):
+                f.write(f"===[ {G.movie_names[movie]} {G.ratings[movie]} ] ===> {G.name(actor)}\n")
 
             f.write("\n")
 
@@ -309,21 +398,10 @@ def create_txt(G, outfile):
         for nm_id1, nm_id2 in zip(nm_id1_list, nm_id2_list):
             chillest_path, weight = chillest_path_between(G, nm_id1, nm_id2)
             
-            f.write(f"{actor_names[chillest_path[0]]}\n")
+            f.write(f"{G.name(chillest_path[0])}\n")
 
-            for i in range(1, len(chillest_path)):
-                actor1, actor2 = chillest_path[i-1], chillest_path[i]
-                max_movie_rating = 0
-                for (movie, actors) in actors_in_movie.items():
-                    if actor1 in actors and actor2 in actors:
-                        movie_name = movies_and_rating[movie][0]
-                        movie_rating = float(movies_and_rating[movie][1])
-
-                        if movie_rating > max_movie_rating:
-                            max_movie_name = movie_name
-                            max_movie_rating = movie_rating
-
-                f.write(f"===[ {max_movie_name} {max_movie_rating} ] ===> {actor_names[chillest_path[i]]}\n")
+            for movie, actor in zip(G.path_movies(chillest_path), chillest_path[1:]):
+                f.write(f"===[ {G.movie_names[movie]} {G.ratings[movie]} ] ===> {G.name(actor)}\n")
             f.write(f"Total weight: {weight:.1f}\n\n")
 
         f.write("Oppgave 4\n\n")
@@ -331,210 +409,187 @@ def create_txt(G, outfile):
         for (size, n) in sizes.items():
             f.write(f"There are {n} components of size {size}\n")
 
-def getMovieQuote(movie_id):
+def getMovieQuote(movie_id, movie_name, cache=None):
     """Scrapes imdb.com for a movie quote from the given movie if it exists
     on the imdb page. If it exists it prints the quote to the terminal. 
+    See quotes.py for fetching the quotes of many movies at the same time.
 
     Args:
         movie_id (str): The imdb movie id for the movie given in movies.tsv
         movie_name (str): The name of the movie, for printing
+        cache (QuoteCache): Where the quote is stored, or None
     """
-    movie_name = movies_and_rating[movie_id][0]
-
-    url = 'https://www.imdb.com/title/' + movie_id
-    result = requests.get(url)
-
-    assert result.status_code == 200
-
-    src = result.content
-    document = soup(src, 'lxml')
-    classy="ipc-html-content ipc-html-content--base Quotes__StyledHTMLContent-ff1m6h-1 dAalVs"
-
-    kuk = document.find('div', class_=classy)
-    try:
-        cocks = kuk.find_all('p')
-    except AttributeError:
-        print(f"{movie_name} has no quote 🙁 ")
-        return 
-
-    quote = []
-    for i in cocks:
-        quote.append(list(i.stripped_strings))
-
-    print(f"Quote from {movie_name}:")
-    underline = '='*(len(movie_name) + 12)
-    print(underline)
-    for line in quote:
-        if len(line) == 1: 
-            print(f"{line[0][1:-1]}")
-        elif len(line) == 2:
-            character = line[0]
-            saying = line[1]
-            print(f"{character}: {saying[2:]}")
-        else:
-            print(f"{line[0]}: ", end='')
-            for elem in line[1:]:
-                if elem == ':':
-                    pass
-                elif elem[0] == '[':
-                    print(f"{elem} ", end='')
-                else:
-                    print(f"{elem}", end='')
-            print('')
-    print(underline)
-
-def women_weights(actor_and_movies, actors_in_movie, actresses_in_movie, total_dict):
-    """Creates the weights used in dijkstra_women(). The weights represents the ratio between
-    the number of actresses and the total numbers of actors acting in the movie. 
+    with QuoteFetcher(cache=cache) as fetcher:
+        quote = asyncio.run(fetcher.fetch(movie_id))
+    print_quote(movie_name, quote)
+
+@timed("weights:women")
+def women_weights(G, actor_and_movies, actors_in_movie, actresses_in_movie, total_dict):
+    """Creates the weights used in dijkstra_women() from the readfile() dictionaries. The weights
+    represents the ratio between the number of actresses and the total numbers of actors acting
+    in the movie, see women_movie_cost(). The weight is worked out once per movie, and
+    GraphBuilder.edge_weights() picks the cheapest movie for every edge, like the graph was built.
+    women_edge_weights() does the same straight from the .tsv files.
 
     Args:
-        actors_in_movie (dict): A dictionary with "movie_id"(as key): ["actor_id", ...](as values)
+        G (CSRGraph): The graph, the weights are stored in the same order as G.targets
+        actor_and_movies (dict): A dictionary with "actor_id"(as key): ["movie_id", ...](as values)
+        actors_in_movie (dict): Not needed any more, the casts are found from actor_and_movies
         actresses_in_movie (dict): A dictionary with "movie_id" as key and "the number of actresses in the movie" as the value
         total_dict (dict): A dictionary with "movie_id" as key and "the total number of actors" as value
 
     Returns:
-        w_w (dict): A dictionary with "("actor", "ngbr_actor")" as key and "ratio" as value
+        w_w (array): The ratio weight of every edge in G.targets, the smallest over the movies linking the two actors
+        women_movie (array): The movie with the highest ratio of actresses linking the two actors of every edge in G.targets
     """
-    w_w = dict()
-   
+    builder = GraphBuilder()
+    for movie_id, movie_name, rating in zip(G.movie_ids, G.movie_names, G.ratings):
+        builder.add_movie(movie_id, movie_name, rating)
     for actor, movies in actor_and_movies.items():
-        for movie in movies:
-            women = int(actresses_in_movie[movie])
-            total_actors = total_dict[movie]
-            if total_actors == 0: total_actors = 1
-            for ngbr_actor in actors_in_movie[movie]:
+        builder.add_actor(actor, actor, movies)
+    return builder.edge_weights(women_movie_cost(G, actresses_in_movie, total_dict))
 
-                w_w[(actor, ngbr_actor)] = 1 - (women / total_actors)
-    return w_w
+def women_edge_weights(G, movies_filename, actors_filename, data_filename):
+    """Creates the weights used in dijkstra_women() straight from the data files, without
+    the readfile() dictionaries, see women_weights().
 
-def create_actress_dict(in_file):
-    """Create the dictionaries that count the number of actresses and the total numbers of actor in the movies.     
+    Args:
+        G (CSRGraph): The graph, built from movies_filename and actors_filename
+        movies_filename (str): The movies.tsv data file.
+        actors_filename (str): The actors.tsv data file.
+        data_filename (str): The actress data file (data.tsv)
+
+    Returns:
+        w_w (array): The ratio weight of every edge in G.targets
+        women_movie (array): The movie with the highest ratio of actresses linking the two actors of every edge in G.targets
+
+    Raises:
+        ValueError: If G was not built from the .tsv files
+    """
+    builder = _read_into_builder(movies_filename, actors_filename)
+    if builder.ids != list(G.ids) or builder.movie_ids != list(G.movie_ids):
+        raise ValueError("the graph was not built from these files")
+    actresses_in_movie, total_dict = create_actress_dict(data_filename)
+    return builder.edge_weights(women_movie_cost(builder, actresses_in_movie, total_dict))
+
+@timed("parse:data.tsv")
+def create_actress_dict(in_file, chunk_size=1 << 22):
+    """Create the dictionaries that count the number of actresses and the total numbers of actor in the movies.
+    The file is read in chunks of whole lines, and all the movie ids in a chunk are found
+    with one regular expression and counted at once.
 
     Args:
         in_file (str): Name of the file containing the values
+        chunk_size (int): Roughly how many characters to read at a time
 
     Returns:
         actresses_in_movie (dict): A dictionary with "movie_id" as key and "the number of actresses in the movie" as the value
         total_dict (dict): A dictionary with "movie_id" as key and "the total number of actors" as value
     """
-    actresses_in_movie = defaultdict(lambda: 0)
-    total_dict = defaultdict(lambda: 0)
+    actresses_in_movie = Counter()
+    total_dict = Counter()
 
     with open(in_file) as file:
-        tsv_file = csv.reader(file, delimiter="\t")
-        for line in tsv_file:
-            
-            sex = line[4]
-            if sex[:4] == "actr":
-                for movie in line:
-                    if movie[:2] == "tt":
-                        actresses_in_movie[movie] += 1
-            for movie in line:
-                if movie[:2] == "tt":
-                    total_dict[movie] += 1
-    
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            chunk += file.readline()
+            total_dict.update(_MOVIE_FIELD.findall(chunk))
+            actresses_in_movie.update(_MOVIE_FIELD.findall("\n".join(_ACTRESS_LINE.findall(chunk))))
+
     return actresses_in_movie, total_dict
 
-def dijkstra_women(G, w_w, s):
+@timed("weights:women_movie_cost")
+def women_movie_cost(graph, actresses_in_movie, total_dict):
+    """Calculates the ratio weight of every movie, 1 - actresses / total actors, so the
+    movies with the most women are the cheapest.
+
+    Args:
+        graph (CSRGraph, BipartiteGraph or GraphBuilder): The graph, for the movie table
+        actresses_in_movie (dict): A dictionary with "movie_id" as key and "the number of actresses in the movie" as the value
+        total_dict (dict): A dictionary with "movie_id" as key and "the total number of actors" as value
+
+    Returns:
+        array: The ratio weight of every integer movie
+    """
+    cost = array("d")
+    for movie in graph.movie_ids:
+        total_actors = total_dict[movie] or 1
+        cost.append(1 - int(actresses_in_movie[movie]) / total_actors)
+    return cost
+
+@timed("query:dijkstra_women")
+def dijkstra_women(G, w_w, s, e=None):
     """Perform dijkstra to make the least sexistic path.
 
     Args:
-        G (tuple): A tuple of the components of the graph
-        w_w (dict): A dictionary with ("actor_id1", "actor_id2") as key and "weight" as value
+        G (CSRGraph): The graph
+        w_w (array): The ratio weight of every edge in G.targets, made by women_weights() or women_edge_weights()
         s (str): A string containing the actor_id
+        e (str): The actor id of the end, if given the search stops when e is settled
 
     Returns:
         parents (dict): A dictionary with "actor_id" as key and "parent actor" as value
     """
-    _, E, _, _ = G
-    Q = [(0, s)]
-    
-    D = defaultdict(lambda: float('inf'))
-    parents = {s : None}
-    D[s] = 0
-    while Q:
-        cost, v = heappop(Q)
-        for u in E[v]:
-            c = cost + w_w[(v, u)]
-            if c < D[u]:
-                D[u] = c
-                heappush(Q, (c, u))
-                parents[u] = v
-                
+    parents, _ = _dijkstra(G, w_w, s, e)
     return parents
 
+@timed("query:women")
 def least_sexistic_path(G, w_w, s, e):
     """Create the least sexistic path, which is the path between two actors with the highest
-    ratio of women acting in the movies
+    ratio of women acting in the movies. Uses bidirectional Dijkstra.
 
     Args:
-        G (tuple): A tuple of the components of the graph.
-        w_w (dict): A dictionary with ("actor_id1", "actor_id2") as key and "weight" as value
+        G (CSRGraph): The graph
+        w_w (array): The ratio weight of every edge in G.targets, made by women_weights() or women_edge_weights()
         s (str): The root actor id
         e (str): The end actor id 
 
     Returns:
-        least_sexistic_path (list): A list containing the least sexistic path
+        least_sexistic_path (list): A list containing the least sexistic path, empty if there is no path
     """
-    parents = dijkstra_women(G, w_w, s)
-
-    least_sexistic_path = [e]
-    while parents[e]:
-        e = parents[e]
-        least_sexistic_path.append(e)
-    least_sexistic_path.reverse()
-
+    least_sexistic_path, _ = _bidirectional_dijkstra(G, w_w, s, e)
     return least_sexistic_path
 
-def print_least_sexistic_path(least_sexistic_path):
+def print_least_sexistic_path(G, least_sexistic_path, movies):
     """Prints the path generated by least_sexistic_path() that contains 
     the path between two actors with the largest amount of women in comparison to men. 
 
     Args:
+        G (CSRGraph or BipartiteGraph): The graph
         least_sexistic_path (list): A list of actor id's representing a least sexistic path
+        movies (list): The movie id linking every pair of actors on the path, for example
+            [G.movie_ids[m] for m in G.path_movies(path, women_movie)]
     """
+    movie_names = dict(zip(G.movie_ids, G.movie_names))
     print("\nOppgave 5\n")
-    print(actor_names[least_sexistic_path[0]])
+    print(G.name(least_sexistic_path[0]))
     total_chicks = 0
-    for i in range(1, len(least_sexistic_path)):
-        actor1, actor2 = least_sexistic_path[i-1], least_sexistic_path[i]
-        max_ratio = 1
-        for (movie, actors) in actors_in_movie.items():
-            if actor1 in actors and actor2 in actors:
-                movie_name = movies_and_rating[movie][0]
-                actresses = actresses_in_movie[movie]
-                total_actors = total_dict[movie]
-                ratio = 1 - (actresses / total_actors)
-
-                if ratio < max_ratio:
-                    max_movie_name = movie_name
-                    max_movie_actresses = actresses
-                    max_ratio = ratio
-                    max_movie_id = movie
-
-        print(f"===[ {max_movie_name} women: {max_movie_actresses} ] ===> {actor_names[least_sexistic_path[i]]}")
-        total_chicks += actresses_in_movie[max_movie_id]
+    for movie, actor in zip(movies, least_sexistic_path[1:]):
+        actresses = actresses_in_movie[movie]
+
+        print(f"===[ {movie_names[movie]} women: {actresses} ] ===> {G.name(actor)}")
+        total_chicks += actresses
     print(f"Total women: {2*total_chicks}")
 
 if __name__ == "__main__":
     movies_filename, actors_filename = "movies.tsv", "actors.tsv"
-    nodes, actors_in_movie, actor_names, movies_and_rating, actor_and_movies = readfile(movies_filename, actors_filename)
-    
 
     # Oppgave 1
-    G = buildgraph(actors_in_movie, movies_and_rating, actor_and_movies)
+    G = loadgraph(movies_filename, actors_filename, "graph.snapshot")
 
     # Oppgave 2
     # path = bfs_shortest_path_between(G, "nm0000255", "nm0095013")
-    # print_shortest_path(path)
+    # print_shortest_path(G, path)
 
     # Oppgave 3
 
     # chillest_path, weight = chillest_path_between(G, "nm0377336", "nm2640105")
-    # print_chillest_path(chillest_path, weight)
+    # print_chillest_path(G, chillest_path, weight)
 
     # chillest_path, weight = chillest_path_between(G, "nm0031483", "nm2640105")
-    # print_chillest_path(chillest_path, weight)
+    # print_chillest_path(G, chillest_path, weight)
 
     # Oppgave 4
     # sizes = components(G)
@@ -543,15 +598,18 @@ if __name__ == "__main__":
     # create_txt(G, "oblig2.txt")
 
     # Oppgave 5 Quote
+    # movie_names = dict(zip(G.movie_ids, G.movie_names))
     # movie_ids = ["tt0443453", "tt0058150", "tt0468569", "tt0118715"] 
     # for movie_id in movie_ids:
-    #     getMovieQuote(movie_id)
+    #     getMovieQuote(movie_id, movie_names[movie_id])
 
     # Oppgave 5 Least sexistic movies
+    # The ratio is evaluated per movie over the actor-movie graph, so no weight is made for every edge
     actresses_in_movie, total_dict = create_actress_dict("data.tsv")
-    w_w = women_weights(actor_and_movies, actors_in_movie, actresses_in_movie, total_dict)
-    path = least_sexistic_path(G, w_w, "nm0031483", "nm0000138")
-    print_least_sexistic_path(path)
+    B = load_bipartite(movies_filename, actors_filename)
+    cost = MovieCost(B, women_movie_cost(B, actresses_in_movie, total_dict))
+    path, movies, _ = lightest_path(B, cost, "nm0031483", "nm0000138")
+    print_least_sexistic_path(B, path, movies)
 
 
     
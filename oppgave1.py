@@ -1,116 +1,141 @@
 import time
 
-
-class Node:
-    def __init__(self, name):
-        self.name = name
-        self.neighbours = []
-        self.edges = 0
-
-    def add(self, neighbours):
-        for neighbour in neighbours:
-            self.neighbours.append(neighbour)
-        
-    
-            
-    
-    
+from bipartite_graph import bfs_shortest_path_between
+from oblig2 import create_actress_dict, women_movie_cost
+from search import MovieCost, lightest_path, movie_cost
+from tsv_loader import load_bipartite, peak_memory_mb
 
 
 class Graph:
-    def __init__(self, movies_filename, actors_filename):
-        self._create_graph(movies_filename, actors_filename)
-        #self._create_graph()
-
-    # def _create_graph(self):
-    #     self._graph = {}
-    #     self.nodes = len(self._actors)
-    #     self.edges = 0
-    #     for _, (actor, movies) in enumerate(self._actors.items()):
-    #         self._graph[actor] = []
-    #         for movie in movies:
-    #             for ngbr_actor in self._movies_and_actors[movie]:
-    #                 if ngbr_actor not in self._graph:
-    #                     self.edges += 1
-    #                 self._graph[actor].append(ngbr_actor)
-
-    def _create_graph(self, movies_filename, actors_filename):
-        graph = {}
-
-        movies = {}
-        movies_and_actors = {}
-        actors = {}
-
-        edges = 0
-        nodes = 0
-
-        with open(movies_filename, "r") as f:
-            for line in f:
-                word_list = line.split()
-
-                movie_id = word_list[0]
-                movie_name = ""
-
-                for word in word_list[1:-3]:
-                    movie_name += word + " "
-                movie_name += word_list[-3]
-
-                rating = word_list[-2]
-                movies[movie_id] = [movie_name, rating]
-                movies_and_actors[movie_id] = []
-
-        
-    
-        
-
-        with open(actors_filename, "r") as f:
-            for line in f:
-                word_list = line.split()
-
-                movie_id_list = []
-                name_id = word_list[0]
-                nodes += 1
-
-                for movie in word_list[1:]:
-                    if movie[:2] == "tt":
-                        if movie in movies:
-                            movie_id_list.append(movie)
-                            movies_and_actors[movie].append(name_id)
-
-                actors[name_id] = movie_id_list
-                graph[name_id] = Node(name_id)
-
-        with open(actors_filename, "r") as f:
-            for line in f:
-                word_list = line.split()
-
-                name_id = word_list[0]
-                kuk = 0
-                for movie in word_list[1:]:
-                    if movie[:2] == "tt":
-                        if movie in movies:
-                            neighbours = movies_and_actors[movie]
-                            neighbours.remove(name_id)
-                            edges += len(neighbours)
-                                    
-                            graph[name_id].add(neighbours)
-        
-        
-        
-                                
-        self._edges = edges
-        self._nodes = nodes
-
-        self._movies = movies
-        self._actors = actors
-        self._graph = graph
-        
+    """The actor graph, with one method for every kind of path.
+
+    The graph is stored in a BipartiteGraph (see bipartite_graph.py): every actor and
+    every movie is an integer, and the movies of every actor and the cast of every movie
+    are packed in a few arrays, so there is no Python object per actor. The movies are
+    not expanded into edges between all their actors, so a cast of k actors costs k
+    entries instead of k² edges, and the searches weigh every movie on the fly. The .tsv
+    files are streamed straight into it, without making the readfile() dictionaries.
+
+    Attributes:
+        bipartite (BipartiteGraph): The graph, for the functions in the other modules
+        chill_cost (array): The weight 10 - rating of every integer movie
+        women_cost (array): The ratio weight of every integer movie, None if no data file was given
+    """
+
+    __slots__ = ("bipartite", "chill_cost", "women_cost")
+
+    def __init__(self, movies_filename, actors_filename, data_filename=None):
+        """Reads the .tsv files and builds the graph.
+
+        Args:
+            movies_filename (str): The movies.tsv data file.
+            actors_filename (str): The actors.tsv data file.
+            data_filename (str): The actress data file (data.tsv), needed for women_path()
+        """
+        self._create_graph(movies_filename, actors_filename, data_filename)
+
+    def _create_graph(self, movies_filename, actors_filename, data_filename=None):
+        self.bipartite = load_bipartite(movies_filename, actors_filename)
+        self.chill_cost = movie_cost(self.bipartite, lambda m: 10 - self.bipartite.ratings[m])
+        self.women_cost = None
+        if data_filename is not None:
+            actresses_in_movie, total_dict = create_actress_dict(data_filename)
+            self.women_cost = women_movie_cost(self.bipartite, actresses_in_movie, total_dict)
+
+    @property
+    def nodes(self):
+        """How many actors the graph contains."""
+        return len(self.bipartite)
+
+    @property
+    def edges(self):
+        """How many pairs of actors have an edge between them. The edges are not stored,
+        so they are counted from the casts every time."""
+        return sum(len(self._costars(v)) for v in range(len(self.bipartite))) // 2
+
+    def __len__(self):
+        return len(self.bipartite)
+
+    def __contains__(self, actor):
+        return actor in self.bipartite
+
+    def name(self, actor):
+        """Returns the name of the actor with the given actor id."""
+        return self.bipartite.name(actor)
+
+    def _costars(self, v):
+        B = self.bipartite
+        costars = set()
+        for m in B.films[B.film_offsets[v]:B.film_offsets[v + 1]]:
+            costars.update(B.casts[B.cast_offsets[m]:B.cast_offsets[m + 1]])
+        costars.discard(v)
+        return costars
+
+    def neighbours(self, actor):
+        """Returns the actor ids of everyone the actor has played with."""
+        B = self.bipartite
+        return [B.ids[u] for u in sorted(self._costars(B.index[actor]))]
+
+    def connected(self, from_actor, to_actor):
+        """Returns True if there is a path between the two actors."""
+        return self.bipartite.connected(from_actor, to_actor)
 
     def shortest_path(self, from_actor, to_actor):
-        pass
+        """Finds a path with the fewest movies between two actors, with a BFS over the
+        actor-movie graph.
+
+        Returns:
+            list: The actor ids on the path, empty if there is no path
+        """
+        path, _ = bfs_shortest_path_between(self.bipartite, from_actor, to_actor)
+        return path
 
     def chillest_path(self, from_actor, to_actor):
-        pass
+        """Finds the path between two actors where the movies have the highest ratings,
+        with Dijkstra on the weights 10 - rating.
+
+        Returns:
+            path (list): The actor ids on the path, empty if there is no path
+            weight (float): The total weight of the path, inf if there is no path
+        """
+        path, _, weight = lightest_path(self.bipartite, MovieCost(self.bipartite, self.chill_cost), from_actor, to_actor)
+        return path, weight
+
+    def women_path(self, from_actor, to_actor):
+        """Finds the path between two actors where the movies have the highest ratio of
+        actresses, with Dijkstra on the weights 1 - actresses/actors.
+
+        Returns:
+            path (list): The actor ids on the path, empty if there is no path
+            weight (float): The total weight of the path, inf if there is no path
+        """
+        if self.women_cost is None:
+            raise ValueError("the graph was built without a data file, so it has no women weights")
+        path, _, weight = lightest_path(self.bipartite, MovieCost(self.bipartite, self.women_cost), from_actor, to_actor)
+        return path, weight
+
+    def path_movies(self, path, women=False):
+        """Finds the movie linking every pair of consecutive actors in a path: the
+        cheapest movie they share, the lowest integer movie if several are as cheap,
+        like the edges of a CSRGraph.
+
+        Args:
+            path (list): A list of actor ids, made by one of the path methods
+            women (bool): True for a path made by women_path(), which may use other movies
+
+        Returns:
+            list: ("movie_id", "movie_name", rating) for every pair of consecutive actors
+        """
+        B = self.bipartite
+        cost = (self.women_cost if women else self.chill_cost).__getitem__
+        films, film_offsets, index = B.films, B.film_offsets, B.index
+        movies = []
+        for a, b in zip(path, path[1:]):
+            v, u = index[a], index[b]
+            shared = set(films[film_offsets[u]:film_offsets[u + 1]])
+            movies.append(min((m for m in films[film_offsets[v]:film_offsets[v + 1]] if m in shared),
+                              key=lambda m: (cost(m), m)))
+        return [(B.movie_ids[m], B.movie_names[m], B.ratings[m]) for m in movies]
 
 
 if __name__ == "__main__":
@@ -125,4 +150,5 @@ if __name__ == "__main__":
 
     print(f"{runtime = :.4f}s")
 
-    print(f"{graph._edges = } {graph._nodes = }")
+    print(f"{graph.edges = } {graph.nodes = }")
+    print(f"peak memory = {peak_memory_mb():.0f} MB")
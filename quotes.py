@@ -0,0 +1,364 @@
+import asyncio
+import json
+import re
+import sqlite3
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from bs4 import BeautifulSoup as soup, SoupStrainer
+
+IMDB_URL = "https://www.imdb.com/title/"
+
+# The div holding a quote on a movie page on imdb.com has a generated class name like
+# "Quotes__StyledHTMLContent-ff1m6h-1", where only the prefix stays the same between builds
+QUOTE_CLASS_PREFIX = "Quotes__StyledHTMLContent"
+
+# Only the quote divs are turned into a tree, the rest of the page is skipped by the parser
+_QUOTE_DIVS = SoupStrainer("div", class_=re.compile(r"(?:^|\s)" + QUOTE_CLASS_PREFIX))
+
+# Bumped when the format of the cached quotes changes, older caches are emptied
+CACHE_VERSION = 3
+
+# Status codes worth trying again, the server is busy or has a temporary problem
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+QuoteLine = namedtuple("QuoteLine", ["character", "line", "directions"])
+QuoteLine.__doc__ = """One line of a quote.
+
+Attributes:
+    character (str): The character saying the line, None for a line that is only stage directions
+    line (str): What the character says, with the stage directions in brackets where they are in the quote
+    directions (tuple): The stage directions of the line, without the brackets
+"""
+
+
+def _quote_line(strings):
+    """Makes a QuoteLine from the stripped strings of one paragraph of a quote."""
+    if len(strings) == 1:
+        return QuoteLine(None, "", (strings[0].strip("[]"),))
+    directions, parts = [], []
+    for elem in strings[1:]:
+        elem = elem.lstrip(":").strip()
+        if not elem:
+            continue
+        if elem[0] == "[" and elem[-1] == "]":
+            directions.append(elem[1:-1])
+        parts.append(elem)
+    return QuoteLine(strings[0], " ".join(parts), tuple(directions))
+
+
+def parse_quote(html):
+    """Finds the first quote on a movie page. The page is parsed with a SoupStrainer, so
+    only the quote divs are built into a tree.
+
+    Args:
+        html (bytes): The movie page
+
+    Returns:
+        list: A QuoteLine for every paragraph in the quote, or None if the page has no quote
+    """
+    document = soup(html, "lxml", parse_only=_QUOTE_DIVS)
+    div = document.find("div")
+    if div is None:
+        return None
+    return [_quote_line(list(p.stripped_strings)) for p in div.find_all("p")]
+
+
+def format_quote_line(quote_line):
+    """Returns a QuoteLine as one line of text, like "Character: line [direction] line"."""
+    character, line, directions = quote_line
+    if character is None:
+        return " ".join(directions)
+    return f"{character}: {line}"
+
+
+def print_quote(movie_name, quote):
+    """Prints a quote made by parse_quote() like getMovieQuote() always has."""
+    if quote is None:
+        print(f"{movie_name} has no quote 🙁 ")
+        return
+
+    print(f"Quote from {movie_name}:")
+    underline = '='*(len(movie_name) + 12)
+    print(underline)
+    for quote_line in quote:
+        print(format_quote_line(quote_line))
+    print(underline)
+
+
+def _dump_quote(quote):
+    """Packs a quote as compact JSON, [[character, line, [direction, ...]], ...]."""
+    return json.dumps(quote, separators=(",", ":"), ensure_ascii=False)
+
+
+def _load_quote(text):
+    quote = json.loads(text)
+    if quote is None:
+        return None
+    return [QuoteLine(character, line, tuple(directions)) for character, line, directions in quote]
+
+
+class QuoteCache:
+    """Parsed quotes stored in an SQLite file, keyed by movie id, so a cached quote is
+    never parsed from HTML again. A movie without a quote is stored too, so it is not
+    fetched again. Entries older than ttl seconds count as missing.
+
+    Attributes:
+        filename (str): Name of the SQLite file, ":memory:" for a cache that is not kept
+        ttl (float): How many seconds an entry is valid
+    """
+
+    def __init__(self, filename="quotes.sqlite", ttl=7 * 24 * 3600):
+        self.filename = filename
+        self.ttl = ttl
+        self.db = sqlite3.connect(filename)
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+            self.db.execute("DROP TABLE IF EXISTS quotes")
+            self.db.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+        self.db.execute("CREATE TABLE IF NOT EXISTS quotes (movie_id TEXT PRIMARY KEY, fetched REAL, quote TEXT)")
+        self.evict()
+
+    def get(self, movie_id):
+        """Returns (True, quote) if the movie is in the cache, and (False, None) if not."""
+        row = self.db.execute("SELECT fetched, quote FROM quotes WHERE movie_id = ?", (movie_id,)).fetchone()
+        if row is None or row[0] < time.time() - self.ttl:
+            return False, None
+        return True, _load_quote(row[1])
+
+    def put(self, movie_id, quote):
+        """Stores a quote, or None for a movie without a quote. Call commit() to write it."""
+        self.db.execute("INSERT OR REPLACE INTO quotes VALUES (?, ?, ?)", (movie_id, time.time(), _dump_quote(quote)))
+
+    def commit(self):
+        self.db.commit()
+
+    def evict(self):
+        """Deletes every entry older than ttl."""
+        self.db.execute("DELETE FROM quotes WHERE fetched < ?", (time.time() - self.ttl,))
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+class QuoteFetcher:
+    """Fetches the quotes of many movies at the same time.
+
+    The pages are downloaded with one requests.Session, whose connection pool is as big
+    as the number of concurrent requests, in a pool of threads driven by asyncio. A
+    semaphore bounds how many requests are in flight, failed requests are tried again
+    with exponential backoff, and every answer is stored in the cache.
+
+    Attributes:
+        base_url (str): The movie id is appended to this to get the page, point it to a local server for testing
+        concurrency (int): How many requests can be in flight at the same time
+        retries (int): How many times a failed request is tried again
+        backoff (float): Seconds to wait before the first retry, doubled for every retry
+        rate (float): The most requests to start per second, or None for no limit
+        timeout (float): Seconds to wait for a page
+        cache (QuoteCache): Where the quotes are stored, or None
+    """
+
+    def __init__(self, base_url=IMDB_URL, concurrency=8, retries=3, backoff=0.5, rate=None, timeout=10, cache=None):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.rate = rate
+        self.timeout = timeout
+        self.cache = cache
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(concurrency)
+        self._next_start = 0.0
+
+    def close(self):
+        self.executor.shutdown()
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _get(self, movie_id):
+        """Downloads and parses one page, in a worker thread."""
+        result = self.session.get(self.base_url + movie_id, timeout=self.timeout)
+        if result.status_code == 404:
+            return False, None
+        if result.status_code in _RETRY_STATUS:
+            return True, None
+        result.raise_for_status()
+        return False, parse_quote(result.content)
+
+    async def _wait_for_rate(self):
+        if self.rate is None:
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start = max(now, self._next_start)
+        self._next_start = start + 1 / self.rate
+        await asyncio.sleep(start - now)
+
+    async def _download(self, movie_id, semaphore):
+        loop = asyncio.get_running_loop()
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            async with semaphore:
+                await self._wait_for_rate()
+                try:
+                    retry, quote = await loop.run_in_executor(self.executor, self._get, movie_id)
+                except (requests.ConnectionError, requests.Timeout):
+                    if attempt == self.retries:
+                        raise
+                    retry = True
+            if not retry:
+                return quote
+            if attempt < self.retries:
+                await asyncio.sleep(delay)
+                delay *= 2
+        raise requests.HTTPError(f"{self.base_url + movie_id} failed {self.retries + 1} times")
+
+    async def _fetch_all(self, movie_ids):
+        quotes = {}
+        missing = []
+        for movie_id in dict.fromkeys(movie_ids):
+            found, quote = self.cache.get(movie_id) if self.cache is not None else (False, None)
+            if found:
+                quotes[movie_id] = quote
+            else:
+                missing.append(movie_id)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._download(movie_id, semaphore) for movie_id in missing),
+                                       return_exceptions=True)
+        errors = {}
+        for movie_id, quote in zip(missing, results):
+            if isinstance(quote, Exception):
+                errors[movie_id] = quote
+                continue
+            quotes[movie_id] = quote
+            if self.cache is not None:
+                self.cache.put(movie_id, quote)
+        if self.cache is not None:
+            self.cache.commit()
+        return quotes, errors
+
+    async def fetch_many(self, movie_ids):
+        """Fetches the quotes of all the movies, at most concurrency at a time. Movies
+        in the cache are not downloaded again.
+
+        Args:
+            movie_ids (iterable): The imdb movie ids
+
+        Returns:
+            dict: A dictionary with "movie_id" as key and the quote made by parse_quote() as
+                value. Movies that still failed after all the retries are left out, and are
+                not cached, so they are tried again next time.
+        """
+        quotes, _ = await self._fetch_all(movie_ids)
+        return quotes
+
+    async def fetch(self, movie_id):
+        """Fetches the quote of one movie, see fetch_many(). Raises the error of the last
+        try if the movie could not be fetched.
+
+        Returns:
+            list: The quote made by parse_quote(), None if the movie has no quote
+        """
+        quotes, errors = await self._fetch_all([movie_id])
+        if movie_id in errors:
+            raise errors[movie_id]
+        return quotes[movie_id]
+
+
+def fetch_quotes(movie_ids, cache=None, **options):
+    """Fetches the quotes of many movies concurrently from ordinary code, see QuoteFetcher.
+
+    Args:
+        movie_ids (iterable): The imdb movie ids
+        cache (QuoteCache): Where the quotes are stored, or None
+        options: Passed on to QuoteFetcher, for example base_url or concurrency
+
+    Returns:
+        dict: A dictionary with "movie_id" as key and the quote as value, see QuoteFetcher.fetch_many()
+    """
+    with QuoteFetcher(cache=cache, **options) as fetcher:
+        return asyncio.run(fetcher.fetch_many(movie_ids))
+
+
+def path_quotes(G, path, edge_movie=None, cache=None, **options):
+    """Fetches the quote of every movie on a path at the same time.
+
+    Args:
+        G (CSRGraph): The graph
+        path (list): A list of actor ids
+        edge_movie (array): Which movie to use for every edge, G.edge_movie if not given
+        cache (QuoteCache): Where the quotes are stored, or None
+        options: Passed on to QuoteFetcher
+
+    Returns:
+        list: (movie_id, quote) for the movie linking path[i] and path[i+1], for every i
+    """
+    movie_ids = [G.movie_ids[m] for m in G.path_movies(path, edge_movie)]
+    quotes = fetch_quotes(movie_ids, cache, **options)
+    return [(movie_id, quotes.get(movie_id)) for movie_id in movie_ids]
+
+
+def print_path_quotes(G, path, edge_movie=None, cache=None, lines=1, **options):
+    """Prints a path like print_chillest_path(), with the first lines of the quote of
+    every movie on it. The quotes are fetched at the same time, see path_quotes().
+
+    Args:
+        G (CSRGraph): The graph
+        path (list): A list of actor ids
+        edge_movie (array): Which movie to use for every edge, G.edge_movie if not given
+        cache (QuoteCache): Where the quotes are stored, or None
+        lines (int): How many lines of every quote to print
+        options: Passed on to QuoteFetcher
+    """
+    movie_names = dict(zip(G.movie_ids, G.movie_names))
+    print(G.name(path[0]))
+    for (movie_id, quote), actor in zip(path_quotes(G, path, edge_movie, cache, **options), path[1:]):
+        print(f"===[ {movie_names[movie_id]} ] ===> {G.name(actor)}")
+        for quote_line in (quote or [])[:lines]:
+            print(f"        {format_quote_line(quote_line)}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fetches the quotes of many movies from imdb.com.")
+    parser.add_argument("movies", nargs="+", help="imdb movie ids, or a file with one movie id per line")
+    parser.add_argument("--cache", default="quotes.sqlite")
+    parser.add_argument("--ttl", type=float, default=7 * 24 * 3600, help="seconds a cached quote is valid")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=None, help="the most requests per second")
+    parser.add_argument("--base-url", default=IMDB_URL)
+    args = parser.parse_args()
+
+    movie_ids = []
+    for movie in args.movies:
+        if movie.startswith("tt"):
+            movie_ids.append(movie)
+        else:
+            with open(movie) as f:
+                movie_ids.extend(line.strip() for line in f if line.strip())
+
+    cache = QuoteCache(args.cache, args.ttl)
+    start = time.time()
+    quotes = fetch_quotes(movie_ids, cache, base_url=args.base_url, concurrency=args.concurrency, rate=args.rate)
+    for movie_id in movie_ids:
+        if movie_id in quotes:
+            print_quote(movie_id, quotes[movie_id])
+        else:
+            print(f"Could not fetch {movie_id}")
+    print(f"\n{len(quotes)}/{len(set(movie_ids))} movies in {time.time() - start:.1f}s")
+    cache.close()
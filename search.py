@@ -0,0 +1,325 @@
+from array import array
+from functools import lru_cache
+from heapq import heappush, heappop
+import random
+
+import instrument
+
+
+class EdgeArrayCost:
+    """Edge costs read from a packed array aligned with G.targets, like G.weights or
+    the women weights. Every path flavour with its own array costs 4 bytes per edge.
+
+    Attributes:
+        G (CSRGraph): The graph
+        weights (array): The cost of every edge in G.targets
+        edge_movie (array): The movie linking the two actors of every edge in G.targets, or None
+    """
+
+    __slots__ = ("G", "weights", "edge_movie")
+
+    def __init__(self, G, weights, edge_movie=None):
+        self.G = G
+        self.weights = weights
+        self.edge_movie = edge_movie
+
+    def __len__(self):
+        return len(self.G)
+
+    def start(self):
+        """Returns the state of a new search, see relax()."""
+        return None
+
+    def relax(self, state, v, cost, dist, parents, via, Q):
+        """Pushes every neighbour of v that gets a smaller distance through v."""
+        G, weights, edge_movie = self.G, self.weights, self.edge_movie
+        targets = G.targets
+        for i in range(G.offsets[v], G.offsets[v + 1]):
+            u = targets[i]
+            c = cost + weights[i]
+            if c < dist[u]:
+                dist[u] = c
+                parents[u] = v
+                if edge_movie is not None:
+                    via[u] = edge_movie[i]
+                heappush(Q, (c, u))
+
+    def steps(self, state, v):
+        """Returns (u, cost) for every neighbour u of v, see bidirectional_path()."""
+        G = self.G
+        lo, hi = G.offsets[v], G.offsets[v + 1]
+        return zip(G.targets[lo:hi], self.weights[lo:hi])
+
+    def link(self, v, u):
+        """Returns the cost of the step from v to its neighbour u, and the integer movie
+        linking them (-1 if not known)."""
+        i = self.G.edge_slot(v, u)
+        return self.weights[i], self.edge_movie[i] if self.edge_movie is not None else -1
+
+
+class MovieCost:
+    """Edge costs evaluated per movie on the fly over the actor-movie graph: going from
+    an actor through movie m to a co-star costs movie_cost[m]. Two actors who share
+    several movies are linked by the cheapest of them, without any per-edge array, so
+    a new path flavour only needs one number per movie.
+
+    Actors are settled in order of distance, so the first time a movie is reached it is
+    from its closest actor, and every movie is expanded at most once per search.
+
+    Attributes:
+        B (BipartiteGraph): The graph
+        movie_cost (array): The cost of every integer movie
+    """
+
+    __slots__ = ("B", "movie_cost")
+
+    def __init__(self, B, movie_cost):
+        self.B = B
+        self.movie_cost = movie_cost
+
+    def __len__(self):
+        return len(self.B)
+
+    def start(self):
+        return bytearray(len(self.B.movie_ids))
+
+    def relax(self, expanded, v, cost, dist, parents, via, Q):
+        B, movie_cost = self.B, self.movie_cost
+        casts, cast_offsets = B.casts, B.cast_offsets
+        for m in B.films[B.film_offsets[v]:B.film_offsets[v + 1]]:
+            if expanded[m]:
+                continue
+            expanded[m] = 1
+            c = cost + movie_cost[m]
+            for u in casts[cast_offsets[m]:cast_offsets[m + 1]]:
+                if c < dist[u]:
+                    dist[u] = c
+                    parents[u] = v
+                    via[u] = m
+                    heappush(Q, (c, u))
+
+    def steps(self, expanded, v):
+        B, movie_cost = self.B, self.movie_cost
+        casts, cast_offsets = B.casts, B.cast_offsets
+        for m in B.films[B.film_offsets[v]:B.film_offsets[v + 1]]:
+            if expanded[m]:
+                continue
+            expanded[m] = 1
+            c = movie_cost[m]
+            for u in casts[cast_offsets[m]:cast_offsets[m + 1]]:
+                yield u, c
+
+    def link(self, v, u):
+        B, movie_cost = self.B, self.movie_cost
+        shared = set(B.films[B.film_offsets[u]:B.film_offsets[u + 1]])
+        m = min((m for m in B.films[B.film_offsets[v]:B.film_offsets[v + 1]] if m in shared),
+                key=lambda m: (movie_cost[m], m))
+        return movie_cost[m], m
+
+
+def movie_cost(graph, cost_of_movie):
+    """Evaluates a cost for every movie, for MovieCost.
+
+    Args:
+        graph (CSRGraph or BipartiteGraph): The graph, for the movie tables
+        cost_of_movie (function): Takes an integer movie and returns its cost, which must not be negative
+
+    Returns:
+        array: The cost of every integer movie
+    """
+    return array("d", (cost_of_movie(m) for m in range(len(graph.movie_ids))))
+
+
+@lru_cache(maxsize=4)
+def tie_keys(n):
+    """Gives every integer node a random 40 bit key, used to break ties between paths of
+    the same weight. Every edge v - u adds keys[v] + keys[u] to the tie of a path, the
+    same in both directions and whichever movie links them, so two paths through
+    different actors almost never get the same tie, and every search comparing
+    (weight, tie) finds the same path. The float32 weights add up without rounding, so
+    paths of the same weight really are equal.
+
+    Args:
+        n (int): The number of nodes
+
+    Returns:
+        array: The key of every integer node
+    """
+    r = random.Random(2010)
+    return array("q", [r.getrandbits(40) + 1 for _ in range(n)])
+
+
+def lightest_tree(cost, root, end=-1):
+    """Dijkstra from root with the edge costs of a cost strategy. Stale heap entries are
+    skipped, and the search stops as soon as end is settled.
+
+    Args:
+        cost (EdgeArrayCost or MovieCost): How much every step costs
+        root (int): The integer node to start from
+        end (int): The integer node to stop at, -1 to search the whole graph
+
+    Returns:
+        parents (array): The integer parent of every node, -1 if not reached, root is its own parent
+        via (array): The integer movie linking every node to its parent, -1 if not known
+        dist (array): The total cost from root to every node
+    """
+    n = len(cost)
+    dist = array("d", [float('inf')]) * n
+    parents = array("i", [-1]) * n
+    via = array("i", [-1]) * n
+    dist[root] = 0
+    parents[root] = root
+
+    state = cost.start()
+    relax = cost.relax
+    Q = [(0, root)]
+    popped = stale = 0
+    while Q:
+        c, v = heappop(Q)
+        popped += 1
+        if c > dist[v]:
+            stale += 1
+            continue
+        if v == end:
+            break
+        relax(state, v, c, dist, parents, via, Q)
+
+    if instrument.ENABLED:
+        # Every entry ever pushed is either popped or still in the heap
+        pushes = popped + len(Q)
+        instrument.count(nodes_popped=popped, nodes_settled=popped - stale, heap_pushes=pushes,
+                         edges_relaxed=pushes - 1)
+    return parents, via, dist
+
+
+def tree_path(parents, via, v):
+    """Follows the parent array from v back to the root.
+
+    Returns:
+        path (list): The integer nodes from the root to v
+        movies (list): The integer movie linking path[i] and path[i+1], for every i
+    """
+    path, movies = [v], []
+    while parents[v] != v:
+        movies.append(via[v])
+        v = parents[v]
+        path.append(v)
+    path.reverse()
+    movies.reverse()
+    return path, movies
+
+
+@instrument.timed("query:lightest")
+def lightest_path(graph, cost, s, e):
+    """Finds the path between two actors with the smallest total cost.
+
+    Args:
+        graph (CSRGraph or BipartiteGraph): The graph the cost strategy belongs to
+        cost (EdgeArrayCost or MovieCost): How much every step costs
+        s (str): The actor id of the root
+        e (str): The actor id of the end
+
+    Returns:
+        path (list): The actor ids on the path, empty if there is no path
+        movies (list): The movie id linking path[i] and path[i+1], for every i (None if the strategy does not know)
+        weight (float): The total cost of the path
+    """
+    if s not in graph or e not in graph or not graph.connected(s, e):
+        return [], [], float('inf')
+    end = graph.index[e]
+    parents, via, dist = lightest_tree(cost, graph.index[s], end)
+    path, movies = tree_path(parents, via, end)
+    return ([graph.ids[v] for v in path], [graph.movie_ids[m] if m >= 0 else None for m in movies], dist[end])
+
+
+def bidirectional_path(graph, cost, s, e):
+    """Bidirectional Dijkstra between two actors with the edge costs of a cost strategy.
+    One search runs forwards from s and one backwards from e, and the search stops when
+    the two smallest keys in the heaps add up to at least the best path found so far.
+    Every step must cost the same both ways.
+
+    Paths of the same weight are compared by their tie, see tie_keys(). With an
+    EdgeArrayCost the path found is the same as the one from
+    contraction.ch_path_between(). MovieCost expands every movie once per side, so it
+    finds a path of the same weight, but not always the one with the smallest tie.
+
+    Args:
+        graph (CSRGraph or BipartiteGraph): The graph the cost strategy belongs to
+        cost (EdgeArrayCost or MovieCost): How much every step costs
+        s (str): The actor id of the root
+        e (str): The actor id of the end
+
+    Returns:
+        path (list): The actor ids on the path, empty if there is no path
+        movies (list): The movie id linking path[i] and path[i+1], for every i (None if the strategy does not know)
+        weight (float): The total cost of the path, added up from s
+    """
+    if s not in graph or e not in graph or not graph.connected(s, e):
+        return [], [], float('inf')
+    source, target = graph.index[s], graph.index[e]
+    if source == target:
+        return [s], [], 0
+
+    keys = tie_keys(len(cost))
+    inf = float('inf')
+    dist = ({source: 0}, {target: 0})
+    ties = ({source: 0}, {target: 0})
+    parents = ({source: source}, {target: target})
+    settled = (set(), set())
+    states = (cost.start(), cost.start())
+    steps = cost.steps
+    Q = ([(0, 0, source)], [(0, 0, target)])
+    best, meet = (inf, 0), None
+    pushes = 2
+
+    while Q[0] and Q[1] and (Q[0][0][0] + Q[1][0][0], Q[0][0][1] + Q[1][0][1]) < best:
+        side = 0 if Q[0][0] <= Q[1][0] else 1
+        c_v, tie, v = heappop(Q[side])
+        if v in settled[side]:
+            continue
+        settled[side].add(v)
+        D, T, P = dist[side], ties[side], parents[side]
+        other_D, other_T = dist[1 - side], ties[1 - side]
+        key = keys[v]
+        for u, w in steps(states[side], v):
+            c = c_v + w
+            d = D.get(u, inf)
+            if c > d:
+                continue
+            t = tie + key + keys[u]
+            if c == d and t >= T[u]:
+                continue
+            D[u] = c
+            T[u] = t
+            P[u] = v
+            heappush(Q[side], (c, t, u))
+            pushes += 1
+            if u in other_D and (c + other_D[u], t + other_T[u]) < best:
+                best, meet = (c + other_D[u], t + other_T[u]), u
+
+    if instrument.ENABLED:
+        instrument.count(nodes_popped=pushes - len(Q[0]) - len(Q[1]), nodes_settled=len(settled[0]) + len(settled[1]),
+                         heap_pushes=pushes, edges_relaxed=pushes - 2)
+
+    if meet is None:
+        return [], [], float('inf')
+
+    path = []
+    v = meet
+    while v != source:
+        path.append(v)
+        v = parents[0][v]
+    path.append(source)
+    path.reverse()
+    v = meet
+    while v != target:
+        v = parents[1][v]
+        path.append(v)
+
+    # Summing in path order makes every search that finds the same path report the same weight
+    weight, movies = 0, []
+    for v, u in zip(path, path[1:]):
+        w, m = cost.link(v, u)
+        weight += w
+        movies.append(graph.movie_ids[m] if m >= 0 else None)
+    return [graph.ids[v] for v in path], movies, weight
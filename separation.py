@@ -0,0 +1,242 @@
+import random
+import time
+from array import array
+
+from bipartite_graph import BipartiteGraph
+
+
+class Separation:
+    """Degrees of separation for a set of source actors, made by separation_stats().
+
+    Attributes:
+        sources (array): The integer node of every source
+        eccentricity (array): The largest number of hops from every source to an actor it can reach
+        average (array): The average number of hops from every source to the other actors it can reach
+        reached (array): How many other actors every source can reach
+        component (array): The component id of every source
+        histogram (list): How many (source, actor) pairs are histogram[d] hops apart, for every d >= 1
+        complete (bool): True if every actor was a source
+    """
+
+    __slots__ = ("sources", "eccentricity", "average", "reached", "component", "histogram", "complete")
+
+    def __init__(self, sources, eccentricity, average, reached, component, histogram, complete=False):
+        self.sources = sources
+        self.eccentricity = eccentricity
+        self.average = average
+        self.reached = reached
+        self.component = component
+        self.histogram = histogram
+        self.complete = complete
+
+    def __len__(self):
+        return len(self.sources)
+
+    def average_separation(self):
+        """Returns the average number of hops over all the (source, reachable actor) pairs."""
+        pairs = sum(self.histogram)
+        return sum(d * count for d, count in enumerate(self.histogram)) / pairs if pairs else 0.0
+
+    def diameter(self):
+        """Estimates the diameter of the components the sources are in.
+
+        The largest eccentricity is a lower bound, and every actor v has
+        diameter <= 2 * eccentricity(v) in its component, so twice the smallest
+        eccentricity in every component is an upper bound. With every actor as a
+        source the largest eccentricity is the exact diameter.
+
+        Returns:
+            lower (int): The largest eccentricity of a source
+            upper (int): The largest upper bound of a component
+        """
+        smallest = {}
+        for c, e in zip(self.component, self.eccentricity):
+            smallest[c] = min(e, smallest.get(c, e))
+        lower = max(self.eccentricity, default=0)
+        upper = max((2 * e for e in smallest.values()), default=0)
+        if self.complete:
+            return lower, lower
+        return lower, upper
+
+
+def _steps(graph):
+    """Returns the sparse matrix rows one hop is made of: actor -> actor for a CSRGraph,
+    actor -> movie -> actor for a BipartiteGraph."""
+    if isinstance(graph, BipartiteGraph):
+        return [(graph.film_offsets, graph.films), (graph.cast_offsets, graph.casts)]
+    return [(graph.offsets, graph.targets)]
+
+
+def _column_counts(words, width):
+    """Counts how many of the words have each bit set, with a bit-sliced counter.
+
+    Args:
+        words (iterable): Integers with one bit per source
+        width (int): How many bits (sources) there are
+
+    Returns:
+        list: The count for every bit position
+    """
+    slices = []
+    for carry in words:
+        for k in range(len(slices)):
+            slices[k], carry = slices[k] ^ carry, slices[k] & carry
+            if not carry:
+                break
+        else:
+            slices.append(carry)
+
+    counts = [0] * width
+    for k, word in enumerate(slices):
+        weight = 1 << k
+        while word:
+            low = word & -word
+            counts[low.bit_length() - 1] += weight
+            word ^= low
+    return counts
+
+
+def _batch(steps, n, batch, ecc, dist_sum, reached, histogram):
+    """Runs a BFS from every node in batch at the same time. Bit i of seen[v] and of the
+    frontier of v is set when the BFS from batch[i] has reached v, so a hop ORs the bits
+    of a node into all its neighbours and every source moves one level at once."""
+    seen = [0] * n
+    frontier = {}
+    for i, s in enumerate(batch):
+        seen[s] |= 1 << i
+        frontier[s] = frontier.get(s, 0) | 1 << i
+
+    level = 0
+    while frontier:
+        level += 1
+        for offsets, targets in steps:
+            nxt = {}
+            for v, bits in frontier.items():
+                for u in targets[offsets[v]:offsets[v + 1]]:
+                    nxt[u] = nxt.get(u, 0) | bits
+            frontier = nxt
+
+        new = {}
+        active = 0
+        for u, bits in frontier.items():
+            bits &= ~seen[u]
+            if bits:
+                seen[u] |= bits
+                new[u] = bits
+                active |= bits
+        frontier = new
+        if not new:
+            break
+
+        while active:
+            low = active & -active
+            ecc[low.bit_length() - 1] = level
+            active ^= low
+        counts = _column_counts(new.values(), len(batch))
+        if len(histogram) <= level:
+            histogram.append(0)
+        histogram[level] += sum(counts)
+        for i, count in enumerate(counts):
+            dist_sum[i] += level * count
+            reached[i] += count
+
+
+def separation_stats(graph, sources=None, width=4096, verbose=False):
+    """Runs a BFS from every source, width sources at a time, and collects the
+    eccentricity and average separation of every source and the hop histogram.
+
+    A whole batch shares one pass over the graph: every node holds a Python integer
+    with one bit per source, so a hop is one OR per edge for all the sources. On a
+    BipartiteGraph a hop goes through the movies, which costs two ORs per role instead
+    of one per pair of co-stars.
+
+    Args:
+        graph (CSRGraph or BipartiteGraph): The graph
+        sources (list): The integer nodes to start from, every actor if None
+        width (int): How many sources to run at the same time
+        verbose (bool): Print progress
+
+    Returns:
+        Separation: The statistics
+    """
+    n = len(graph)
+    if sources is None:
+        sources = range(n)
+    sources = array("i", sources)
+    steps = _steps(graph)
+
+    eccentricity = array("i", [0]) * len(sources)
+    average = array("d", [0.0]) * len(sources)
+    reached = array("i", [0]) * len(sources)
+    histogram = [0]
+    start = time.time()
+
+    for first in range(0, len(sources), width):
+        batch = sources[first:first + width]
+        ecc, dist_sum, count = [0] * len(batch), [0] * len(batch), [0] * len(batch)
+        _batch(steps, n, batch, ecc, dist_sum, count, histogram)
+        for i in range(len(batch)):
+            eccentricity[first + i] = ecc[i]
+            reached[first + i] = count[i]
+            average[first + i] = dist_sum[i] / count[i] if count[i] else 0.0
+        if verbose:
+            print(f"{first + len(batch)}/{len(sources)} sources in {time.time() - start:.1f}s")
+
+    component = array("i", (graph.component[s] for s in sources))
+    complete = len(set(sources)) == n
+    return Separation(sources, eccentricity, average, reached, component, histogram, complete)
+
+
+def print_separation(stats):
+    """Prints the hop histogram, the average separation and the diameter estimate."""
+    print(f"\nDegrees of separation from {len(stats)} actors\n")
+    pairs = sum(stats.histogram)
+    for d, count in enumerate(stats.histogram):
+        if d:
+            print(f"{d:3} hops: {count:14} pairs ({100 * count / pairs:5.2f}%)")
+    print(f"\nAverage separation: {stats.average_separation():.3f}")
+    lower, upper = stats.diameter()
+    if lower == upper:
+        print(f"Diameter: {lower}")
+    else:
+        print(f"Diameter: between {lower} and {upper}")
+
+
+def write_separation(graph, stats, outfile):
+    """Writes "actor_id eccentricity average_separation reached" for every source to a .tsv file."""
+    with open(outfile, "w") as f:
+        for s, e, a, r in zip(stats.sources, stats.eccentricity, stats.average, stats.reached):
+            f.write(f"{graph.ids[s]}\t{e}\t{a:.4f}\t{r}\n")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from tsv_loader import load_bipartite
+
+    parser = argparse.ArgumentParser(description="Bacon number statistics with a bit-parallel BFS.")
+    parser.add_argument("--movies", default="movies.tsv")
+    parser.add_argument("--actors", default="actors.tsv")
+    parser.add_argument("--snapshot", default=None, help="use the actor graph in this snapshot instead of the actor-movie graph")
+    parser.add_argument("--sample", type=int, default=0, help="only start from this many random actors, 0 for all")
+    parser.add_argument("--width", type=int, default=4096, help="how many sources to run at the same time")
+    parser.add_argument("--seed", type=int, default=2010)
+    parser.add_argument("--out", default=None, help="write the statistics of every source to this .tsv file")
+    args = parser.parse_args()
+
+    if args.snapshot:
+        from oblig2 import loadgraph
+        graph = loadgraph(args.movies, args.actors, args.snapshot)
+    else:
+        graph = load_bipartite(args.movies, args.actors)
+
+    sources = None
+    if args.sample:
+        sources = random.Random(args.seed).sample(range(len(graph)), min(args.sample, len(graph)))
+
+    start = time.time()
+    stats = separation_stats(graph, sources, args.width, verbose=True)
+    print(f"\nBFS from {len(stats)} actors in {time.time() - start:.1f}s")
+    print_separation(stats)
+    if args.out:
+        write_separation(graph, stats, args.out)
@@ -0,0 +1,322 @@
+import asyncio
+import json
+import traceback
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from oblig2 import _bidirectional_dijkstra, bfs_shortest_path_between
+
+# The weights are float32, answers round them so 6.8 is not sent as 6.800000190734863
+_DIGITS = 6
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error",
+            503: "Service Unavailable"}
+
+
+class QueryError(Exception):
+    """A query that cannot be answered, with the HTTP status code to answer with."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ResultCache:
+    """Least recently used cache of query answers.
+
+    Attributes:
+        size (int): How many answers to keep
+        hits (int): How many lookups found an answer
+        misses (int): How many lookups did not
+    """
+
+    def __init__(self, size=1024):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Returns the answer stored for key and marks it as recently used, or None."""
+        answer = self._entries.get(key)
+        if answer is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return answer
+
+    def put(self, key, answer):
+        """Stores an answer, and throws out the least recently used one if the cache is full."""
+        if self.size <= 0:
+            return
+        self._entries[key] = answer
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class QueryServer:
+    """Answers path queries over HTTP with JSON, with the graph loaded once and kept in memory.
+
+    Every connection is handled by its own asyncio task. Answers are first looked up in
+    the result cache, the searches run in a pool of threads so the event loop keeps
+    accepting and answering other requests, and concurrent requests for the same
+    answer share one search. The cache is emptied when G.version changes. With a
+    SearchTreeCache, the paths are walked from the cached search tree of the source
+    instead of running a bidirectional search for every pair.
+
+        GET /shortest?from=nm...&to=nm...     bidirectional BFS
+        GET /chillest?from=nm...&to=nm...     bidirectional Dijkstra on G.weights
+        GET /women?from=nm...&to=nm...        bidirectional Dijkstra on the women weights
+        GET /component?actor=nm...            the component of an actor and its size
+        GET /neighbours?actor=nm...&limit=n   the co-stars of an actor and the movies linking them
+        GET /stats                            the size of the graph and the cache counters
+
+    Attributes:
+        G (CSRGraph): The graph
+        w_w (array): The ratio weights made by oblig2.women_edge_weights(), or None to not answer /women
+        women_movie (array): The linking movies made by oblig2.women_edge_weights(), or None
+        cache (ResultCache): The cached answers
+        trees (SearchTreeCache): The cached search trees of the sources, or None
+    """
+
+    def __init__(self, G, w_w=None, women_movie=None, cache_size=1024, workers=None, trees=None):
+        self.G = G
+        self.w_w = w_w
+        self.women_movie = women_movie
+        self.cache = ResultCache(cache_size)
+        self.trees = trees
+        self.executor = ThreadPoolExecutor(workers)
+        self._pending = {}
+        self._version = G.version
+        self._sizes = None
+        self._routes = {
+            "/shortest": self.shortest,
+            "/chillest": self.chillest,
+            "/women": self.women,
+            "/component": self.component,
+            "/neighbours": self.neighbours,
+        }
+
+    def _actor(self, params, name):
+        actor = params.get(name, [None])[0]
+        if actor is None:
+            raise QueryError(400, f"missing parameter {name!r}")
+        if actor not in self.G:
+            raise QueryError(404, f"unknown actor {actor!r}")
+        return actor
+
+    def _path_answer(self, path, edge_movie=None, weight=None):
+        G = self.G
+        movies = G.path_movies(path, edge_movie)
+        answer = {
+            "path": path,
+            "names": [G.name(actor) for actor in path],
+            "movies": [G.movie_ids[m] for m in movies],
+            "movie_names": [G.movie_names[m] for m in movies],
+            "length": len(path) - 1 if path else None,
+        }
+        if weight is not None:
+            answer["weight"] = round(weight, _DIGITS) if path else None
+        return answer
+
+    def shortest(self, params):
+        s, e = self._actor(params, "from"), self._actor(params, "to")
+        if self.trees is not None:
+            path, _ = self.trees.path("shortest", s, e)
+        else:
+            path = bfs_shortest_path_between(self.G, s, e)
+        return self._path_answer(path)
+
+    def chillest(self, params):
+        s, e = self._actor(params, "from"), self._actor(params, "to")
+        if self.trees is not None:
+            path, weight = self.trees.path("chillest", s, e)
+        else:
+            path, weight = _bidirectional_dijkstra(self.G, self.G.weights, s, e)
+        return self._path_answer(path, weight=weight)
+
+    def women(self, params):
+        if self.w_w is None:
+            raise QueryError(503, "the server was started without the women weights")
+        s, e = self._actor(params, "from"), self._actor(params, "to")
+        if self.trees is not None:
+            path, weight = self.trees.path("women", s, e)
+        else:
+            path, weight = _bidirectional_dijkstra(self.G, self.w_w, s, e)
+        return self._path_answer(path, self.women_movie, weight)
+
+    def component(self, params):
+        G = self.G
+        actor = self._actor(params, "actor")
+        if self._sizes is None:
+            self._sizes = Counter(G.component)
+        c = G.component[G.index[actor]]
+        return {"actor": actor, "component": c, "size": self._sizes[c]}
+
+    def neighbours(self, params):
+        G = self.G
+        actor = self._actor(params, "actor")
+        try:
+            limit = int(params.get("limit", ["0"])[0])
+        except ValueError:
+            raise QueryError(400, "limit has to be an integer")
+        v = G.index[actor]
+        lo, hi = G.offsets[v], G.offsets[v + 1]
+        if limit > 0:
+            hi = min(hi, lo + limit)
+        return {
+            "actor": actor,
+            "degree": G.offsets[v + 1] - G.offsets[v],
+            "neighbours": [{"actor": G.ids[G.targets[i]],
+                            "name": G.names[G.targets[i]],
+                            "movie": G.movie_ids[G.edge_movie[i]],
+                            "weight": round(G.weights[i], _DIGITS)} for i in range(lo, hi)],
+        }
+
+    def stats(self):
+        G = self.G
+        stats = {"nodes": len(G), "edges": G.edges, "version": G.version, "cached": len(self.cache),
+                 "hits": self.cache.hits, "misses": self.cache.misses}
+        if self.trees is not None:
+            stats["trees"] = self.trees.stats()
+        return stats
+
+    async def answer(self, target):
+        """Answers one request target like "/shortest?from=nm...&to=nm...".
+
+        Returns:
+            status (int): The HTTP status code
+            answer (dict): The JSON answer, {"error": message} if the query failed
+        """
+        url = urlsplit(target)
+        if url.path == "/stats":
+            return 200, self.stats()
+        query = self._routes.get(url.path)
+        if query is None:
+            return 404, {"error": f"unknown query {url.path!r}"}
+
+        if self.G.version != self._version:
+            self.cache.clear()
+            self._sizes = None
+            self._version = self.G.version
+        params = parse_qs(url.query)
+        key = (url.path, tuple(sorted((k, tuple(v)) for k, v in params.items())))
+        answer = self.cache.get(key)
+        if answer is not None:
+            return 200, answer
+
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(self.executor, query, params)
+            self._pending[key] = future
+        try:
+            answer = await asyncio.shield(future)
+        except QueryError as error:
+            return error.status, {"error": str(error)}
+        finally:
+            self._pending.pop(key, None)
+        self.cache.put(key, answer)
+        return 200, answer
+
+    async def handle(self, reader, writer):
+        """Answers the requests on one connection, until the client closes it. A request
+        with a Content-Length that is not a number gets 400 and the connection is closed,
+        since the next request cannot be found, and a query that fails with anything but
+        a QueryError gets 500, with the traceback printed on stderr."""
+        try:
+            while True:
+                request = await reader.readline()
+                if not request:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length", "0"))
+                except ValueError:
+                    length = -1
+                if length > 0:
+                    await reader.readexactly(length)
+
+                fields = request.decode("latin-1").split()
+                if length < 0:
+                    status, answer = 400, {"error": "malformed Content-Length"}
+                elif len(fields) != 3:
+                    status, answer = 400, {"error": "malformed request line"}
+                elif fields[0] != "GET":
+                    status, answer = 405, {"error": "only GET is supported"}
+                else:
+                    try:
+                        status, answer = await self.answer(fields[1])
+                    except Exception as error:
+                        traceback.print_exc()
+                        status, answer = 500, {"error": f"internal error ({type(error).__name__})"}
+
+                keep_alive = (length >= 0 and len(fields) == 3 and fields[2] == "HTTP/1.1"
+                              and headers.get("connection", "").lower() != "close")
+                body = json.dumps(answer).encode()
+                writer.write(f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                             f"Content-Type: application/json\r\n"
+                             f"Content-Length: {len(body)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8010):
+        """Answers requests on host:port until the task is cancelled."""
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from oblig2 import loadgraph, women_edge_weights
+    from tree_cache import SearchTreeCache
+
+    parser = argparse.ArgumentParser(description="Answers path queries over HTTP with the graph kept in memory.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--movies", default="movies.tsv")
+    parser.add_argument("--actors", default="actors.tsv")
+    parser.add_argument("--snapshot", default="graph.snapshot")
+    parser.add_argument("--data", default=None, help="the actress data file, to also answer /women")
+    parser.add_argument("--cache-size", type=int, default=1024, help="how many answers to keep")
+    parser.add_argument("--workers", type=int, default=None, help="threads running the searches")
+    parser.add_argument("--tree-cache-mb", type=float, default=0,
+                        help="keep the search trees of the sources in this much memory, 0 to search every pair")
+    args = parser.parse_args()
+
+    G = loadgraph(args.movies, args.actors, args.snapshot)
+    w_w = women_movie = None
+    if args.data:
+        w_w, women_movie = women_edge_weights(G, args.movies, args.actors, args.data)
+
+    trees = None
+    if args.tree_cache_mb > 0:
+        trees = SearchTreeCache(G, {"women": w_w} if w_w is not None else None, args.tree_cache_mb)
+    server = QueryServer(G, w_w, women_movie, args.cache_size, args.workers, trees)
+    print(f"\nListening on http://{args.host}:{args.port}/")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
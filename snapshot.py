@@ -0,0 +1,216 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from csr_graph import CSRGraph
+
+MAGIC = b"IMDBCSR\0"
+VERSION = 3
+
+# magic, version, length of the JSON table of contents
+_HEADER = struct.Struct("<8sII")
+_ALIGN = 8
+
+# Name and typecode of every array section, "s" marks a newline separated string table.
+_SECTIONS = [
+    ("ids", "s"),
+    ("names", "s"),
+    ("offsets", "q"),
+    ("targets", "i"),
+    ("weights", "f"),
+    ("edge_movie", "i"),
+    ("movie_ids", "s"),
+    ("movie_names", "s"),
+    ("ratings", "d"),
+    ("component", "i"),
+]
+
+
+def source_fingerprint(filenames):
+    """Describes the source files a graph was built from, so a snapshot can tell
+    when they have changed.
+
+    Args:
+        filenames (list): The .tsv files the graph is built from
+
+    Returns:
+        list: [filename, size, modification time in ns] for every file
+    """
+    fingerprint = []
+    for filename in filenames:
+        stat = os.stat(filename)
+        fingerprint.append([os.path.basename(filename), stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+def weights_digest(G, weights):
+    """Hashes the rows of a graph and one set of its edge weights. A rating that changes,
+    a graph that is updated or another set of weights all give another digest.
+
+    Args:
+        G (CSRGraph): The graph
+        weights (array): The weight of every edge in G.targets
+
+    Returns:
+        str: The digest as hex
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for values in (G.offsets, G.targets, weights):
+        digest.update(memoryview(values).cast("B"))
+    return digest.hexdigest()
+
+
+def weights_stamp(G, weights, kind, sources=()):
+    """Describes the graph and the weights a file computed from them was made for, like
+    the landmarks or a contraction hierarchy, for the table of contents of that file.
+
+    Args:
+        G (CSRGraph): The graph
+        weights (array): The weight of every edge in G.targets
+        kind (str): Which weights they are, "chill" or "women"
+        sources (list): The .tsv files the graph was built from
+
+    Returns:
+        dict: The number of nodes and edges, kind, the digest of the weights and the fingerprint of the sources
+    """
+    return {"nodes": len(G), "edges": G.edges, "weights": kind, "digest": weights_digest(G, weights),
+            "sources": source_fingerprint(sources)}
+
+
+def stamp_matches(toc, G, weights, kind, sources=None):
+    """Returns True if a table of contents with a weights_stamp() was made for G and these
+    weights. The sources are only compared if they are given, like in load_graph()."""
+    if toc.get("nodes") != len(G) or toc.get("edges") != G.edges or toc.get("weights") != kind:
+        return False
+    if sources is not None and toc.get("sources") != source_fingerprint(sources):
+        return False
+    return toc.get("digest") == weights_digest(G, weights)
+
+
+def _section_bytes(value, typecode):
+    if typecode == "s":
+        return "\n".join(value).encode()
+    if not isinstance(value, array) or value.typecode != typecode:
+        value = array(typecode, value)
+    return value.tobytes()
+
+
+def write_sections(filename, magic, version, meta, sections):
+    """Writes a binary file with a small header, a JSON table of contents and the raw
+    bytes of every section, each aligned to 8 bytes so read_sections() can map them
+    straight into memory.
+
+    Args:
+        filename (str): Name of the file
+        magic (bytes): 8 bytes identifying the kind of file
+        version (int): The version of the file format
+        meta (dict): Extra values stored in the table of contents
+        sections (list): (name, typecode, value) for every section, typecode "s" for a list of strings
+    """
+    blobs = [_section_bytes(value, typecode) for _, typecode, value in sections]
+
+    toc = dict(meta, byteorder=sys.byteorder, sections=[])
+    # The offsets depend on the size of the table of contents, so lay it out until it is stable.
+    toc_size = 0
+    while True:
+        position = _HEADER.size + toc_size
+        position += -position % _ALIGN
+        toc["sections"] = []
+        for (name, typecode, _), blob in zip(sections, blobs):
+            toc["sections"].append([name, typecode, position, len(blob)])
+            position += len(blob)
+            position += -position % _ALIGN
+        encoded = json.dumps(toc).encode()
+        if len(encoded) == toc_size:
+            break
+        toc_size = len(encoded)
+
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "wb") as f:
+        f.write(_HEADER.pack(magic, version, len(encoded)))
+        f.write(encoded)
+        for (_, _, offset, _), blob in zip(toc["sections"], blobs):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(blob)
+    os.replace(tmp_filename, filename)
+
+
+def read_sections(filename, magic, version):
+    """Maps a file written by write_sections() into memory. The numeric sections are
+    memoryviews straight into the file, so nothing is copied or parsed.
+
+    Args:
+        filename (str): Name of the file
+        magic (bytes): The 8 bytes the file should start with
+        version (int): The version of the file format
+
+    Returns:
+        dict: The table of contents, with the extra values given to write_sections()
+        dict: The value of every section by name
+        Both are None if the file is missing, of another kind or version, or from a machine with another byte order.
+    """
+    try:
+        f = open(filename, "rb")
+    except FileNotFoundError:
+        return None, None
+
+    with f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return None, None
+        file_magic, file_version, toc_size = _HEADER.unpack(header)
+        if file_magic != magic or file_version != version:
+            return None, None
+        toc = json.loads(f.read(toc_size))
+        if toc["byteorder"] != sys.byteorder:
+            return None, None
+        buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    values = {}
+    for name, typecode, offset, size in toc["sections"]:
+        section = buffer[offset:offset + size]
+        if typecode == "s":
+            values[name] = str(section, "utf-8").split("\n") if size else []
+        else:
+            values[name] = section.cast(typecode)
+    return toc, values
+
+
+def save_graph(G, filename, sources=()):
+    """Writes the graph, the id tables, the names, the movie metadata and G.version to a
+    binary snapshot, see write_sections().
+
+    Args:
+        G (CSRGraph): The graph
+        filename (str): Name of the snapshot file
+        sources (list): The .tsv files the graph was built from, used to invalidate the snapshot
+    """
+    meta = {"edges": G.edges, "version": G.version, "sources": source_fingerprint(sources)}
+    sections = [(name, typecode, getattr(G, name)) for name, typecode in _SECTIONS]
+    write_sections(filename, MAGIC, VERSION, meta, sections)
+
+
+def load_graph(filename, sources=None):
+    """Loads a snapshot written by save_graph(). The numeric arrays are memoryviews
+    straight into the memory-mapped file, so nothing is copied or parsed.
+
+    Args:
+        filename (str): Name of the snapshot file
+        sources (list): The .tsv files the graph should be built from. If given, and they
+            have changed since the snapshot was written, the snapshot is ignored.
+
+    Returns:
+        CSRGraph: The graph, or None if the snapshot is missing, of another version or out of date
+    """
+    toc, values = read_sections(filename, MAGIC, VERSION)
+    if toc is None:
+        return None
+    if sources is not None and toc["sources"] != source_fingerprint(sources):
+        return None
+    G = CSRGraph(edges=toc["edges"], **values)
+    G.version = toc.get("version", 0)
+    return G
@@ -0,0 +1,149 @@
+import os
+import random
+import time
+from array import array
+from itertools import accumulate
+
+FIRST_NAMES = {
+    "actress": ["Anna", "Maria", "Emma", "Ingrid", "Grace", "Sofia", "Nora", "Liv", "Julia", "Ella",
+                "Audrey", "Meryl", "Greta", "Ida", "Hedda", "Marion", "Cate", "Frances", "Vivien", "Lupita"],
+    "actor": ["James", "John", "Lars", "Henrik", "Paul", "Omar", "Kai", "Anders", "Peter", "Jack",
+              "Denzel", "Marlon", "Toshiro", "Max", "Ole", "Sidney", "Gene", "Humphrey", "Cary", "Atle"],
+}
+LAST_NAMES = ["Hansen", "Johansen", "Olsen", "Smith", "Jones", "Brown", "Garcia", "Kim", "Nakamura", "Dubois",
+              "Rossi", "Novak", "Silva", "Khan", "Berg", "Dahl", "Lund", "Moreau", "Keller", "Okafor"]
+TITLE_WORDS = ["The", "Last", "Night", "Return", "of", "Dark", "Love", "City", "Red", "Winter", "Secret",
+               "House", "King", "River", "Lost", "Blue", "Summer", "Man", "Woman", "Road", "Star", "Fire"]
+OTHER_PROFESSIONS = ["director", "writer", "producer", "composer", "cinematographer", "editor"]
+
+
+def _rating(r):
+    """Draws a rating between 1.0 and 10.0, skewed towards 6-7 like the ratings on imdb.com."""
+    return round(1 + 9 * r.betavariate(5, 2.6), 1)
+
+
+def _title(r):
+    return " ".join(r.choice(TITLE_WORDS) for _ in range(r.randint(1, 4)))
+
+
+def _popularity(r, movies, actors, films_exponent, cast_exponent, max_cast):
+    """Draws the popularity of every movie from a power law, so the number of actors
+    choosing a movie, its cast size, follows a power law too. The popularity is capped
+    so the expected cast is at most max_cast, which keeps the number of edges in check.
+
+    Returns:
+        array: The popularity of every movie
+    """
+    popularity = array("d", (r.paretovariate(cast_exponent) for _ in range(movies)))
+    mean = sum(popularity) / movies
+    credits_per_movie = actors * films_exponent / (films_exponent - 1) / movies
+    cap = max_cast * mean / credits_per_movie
+    for m in range(movies):
+        if popularity[m] > cap:
+            popularity[m] = cap
+    return popularity
+
+
+def generate(directory, actors=100_000, movies=None, seed=2010, films_exponent=1.6, cast_exponent=1.8,
+             max_films=300, max_cast=250, other_people=0.5, unknown_movies=0.05, verbose=False):
+    """Writes an IMDb-shaped dataset in the layouts readfile() and create_actress_dict()
+    read: movies.tsv, actors.tsv and data.tsv. The same arguments always write the same files.
+
+    Every actor draws the length of the filmography from a power law, and the movies from
+    the movie popularities (see _popularity()), so both the filmographies and the cast
+    sizes have heavy tails. The actors are written one line at a time, so only the
+    movie tables are kept in memory and the files can be made as big as the disk allows.
+
+        movies.tsv  movie_id  movie_name  rating  votes
+        actors.tsv  actor_id  actor_name  movie_id  movie_id ...
+        data.tsv    person_id  name  birth_year  death_year  professions  movie_id  movie_id ...
+
+    Args:
+        directory (str): Where to write the files
+        actors (int): How many actors
+        movies (int): How many movies, half as many as actors if None
+        seed (int): The seed of the random numbers
+        films_exponent (float): The power law exponent of the filmography lengths
+        cast_exponent (float): The power law exponent of the movie popularities
+        max_films (int): The longest filmography
+        max_cast (int): The largest expected cast
+        other_people (float): How many directors, writers and so on there are in data.tsv for every actor
+        unknown_movies (float): The share of the credits that are movies not in movies.tsv, which readfile() skips
+        verbose (bool): Print progress
+
+    Returns:
+        int: How many bytes were written
+    """
+    r = random.Random(seed)
+    movies = movies or max(1, actors // 2)
+    os.makedirs(directory, exist_ok=True)
+    start = time.time()
+    written = 0
+
+    popularity = _popularity(r, movies, actors, films_exponent, cast_exponent, max_cast)
+    with open(os.path.join(directory, "movies.tsv"), "w") as f:
+        lines = []
+        for m in range(movies):
+            votes = int(popularity[m] * r.randint(5, 2000))
+            lines.append(f"tt{m:07d}\t{_title(r)}\t{_rating(r)}\t{votes}\n")
+            if len(lines) == 10000:
+                written += f.write("".join(lines))
+                lines = []
+        written += f.write("".join(lines))
+
+    cumulative = array("d", accumulate(popularity))
+    movie_ids = range(movies)
+    people = actors + int(actors * other_people)
+    with open(os.path.join(directory, "actors.tsv"), "w") as actors_file, \
+            open(os.path.join(directory, "data.tsv"), "w") as data_file:
+        actor_lines, data_lines = [], []
+        for v in range(people):
+            k = min(int(r.paretovariate(films_exponent)), max_films)
+            films = [f"tt{m:07d}" for m in dict.fromkeys(r.choices(movie_ids, cum_weights=cumulative, k=k))]
+            for i in range(len(films)):
+                if r.random() < unknown_movies:
+                    films[i] = f"tt{movies + r.randrange(movies):07d}"
+
+            if v < actors:
+                profession = "actress" if r.random() < 0.4 else "actor"
+                if r.random() < 0.1:
+                    profession += "," + r.choice(["soundtrack", "producer", "writer"])
+                first = r.choice(FIRST_NAMES[profession.split(",")[0]])
+            else:
+                profession = r.choice(OTHER_PROFESSIONS)
+                first = r.choice(FIRST_NAMES[r.choice(["actor", "actress"])])
+            name = f"{first} {r.choice(LAST_NAMES)}"
+            birth = r.randint(1890, 2010)
+            death = birth + r.randint(40, 100) if birth < 1940 and r.random() < 0.8 else "\\N"
+
+            if v < actors:
+                actor_lines.append("\t".join([f"nm{v:07d}", name] + films) + "\n")
+            data_lines.append("\t".join([f"nm{v:07d}", name, str(birth), str(death), profession] + films) + "\n")
+
+            if len(data_lines) == 10000:
+                written += actors_file.write("".join(actor_lines)) + data_file.write("".join(data_lines))
+                actor_lines, data_lines = [], []
+                if verbose and (v + 1) % 1_000_000 == 0:
+                    print(f"{v + 1}/{people} people, {written / 2**20:.0f} MB in {time.time() - start:.0f}s")
+        written += actors_file.write("".join(actor_lines)) + data_file.write("".join(data_lines))
+
+    return written
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Writes a synthetic IMDb-shaped dataset.")
+    parser.add_argument("directory", help="where to write movies.tsv, actors.tsv and data.tsv")
+    parser.add_argument("--actors", type=int, default=100_000)
+    parser.add_argument("--movies", type=int, default=None, help="half as many as actors if not given")
+    parser.add_argument("--seed", type=int, default=2010)
+    parser.add_argument("--films-exponent", type=float, default=1.6, help="power law exponent of the filmographies")
+    parser.add_argument("--cast-exponent", type=float, default=1.8, help="power law exponent of the cast sizes")
+    parser.add_argument("--max-cast", type=int, default=250, help="the largest expected cast")
+    args = parser.parse_args()
+
+    start = time.time()
+    written = generate(args.directory, args.actors, args.movies, args.seed, args.films_exponent,
+                       args.cast_exponent, max_cast=args.max_cast, verbose=True)
+    print(f"Wrote {written / 2**20:.0f} MB to {args.directory} in {time.time() - start:.1f}s")
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+# The modules are flat files in the root of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic  # noqa: E402
+from oblig2 import women_edge_weights  # noqa: E402
+from tsv_loader import load_csr  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def dataset(tmp_path_factory):
+    """A small synthetic dataset, as (movies.tsv, actors.tsv, data.tsv)."""
+    directory = tmp_path_factory.mktemp("synthetic")
+    synthetic.generate(str(directory), actors=600, seed=14)
+    return tuple(str(directory / name) for name in ("movies.tsv", "actors.tsv", "data.tsv"))
+
+
+@pytest.fixture
+def G(dataset):
+    """The graph of the dataset, a new one for every test since some of them change it."""
+    return load_csr(*dataset[:2])
+
+
+@pytest.fixture
+def women(G, dataset):
+    """The women weights and linking movies of G, see oblig2.women_edge_weights()."""
+    return women_edge_weights(G, *dataset)
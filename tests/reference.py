@@ -0,0 +1,113 @@
+"""Plain dictionary versions of the graph and the searches, written the simplest way
+possible, to check the packed graphs and the faster searches against."""
+import csv
+from array import array
+from collections import Counter, deque
+from heapq import heappush, heappop
+
+
+def float32(x):
+    """Rounds x to float32, like the weights stored in a CSRGraph."""
+    return array("f", [x])[0]
+
+
+def read_tsv(filename):
+    with open(filename, newline="") as f:
+        return list(csv.reader(f, delimiter="\t"))
+
+
+def read_dataset(movies_filename, actors_filename):
+    """Reads the files like readfile() always has.
+
+    Returns:
+        ratings (dict): The rating of every movie id
+        films (dict): The movie ids of every actor id that are in movies.tsv, in file order
+    """
+    ratings = {fields[0]: float(fields[-2]) for fields in read_tsv(movies_filename)}
+    films = {fields[0]: [movie for movie in fields[1:] if movie in ratings] for fields in read_tsv(actors_filename)}
+    return ratings, films
+
+
+def costar_graph(movies_filename, actors_filename, movie_weight=None):
+    """Expands every cast into edges between all its actors, and keeps the smallest weight.
+
+    Args:
+        movie_weight (dict): The weight of every movie id, 10 - rating if None
+
+    Returns:
+        dict: {"actor_id": {"actor_id": weight}} for every actor
+    """
+    ratings, films = read_dataset(movies_filename, actors_filename)
+    if movie_weight is None:
+        movie_weight = {movie: 10 - rating for movie, rating in ratings.items()}
+    casts = {}
+    for actor, movies in films.items():
+        for movie in movies:
+            casts.setdefault(movie, []).append(actor)
+    graph = {actor: {} for actor in films}
+    for movie, cast in casts.items():
+        weight = float32(movie_weight[movie])
+        for a in cast:
+            for b in cast:
+                if a != b and weight < graph[a].get(b, float('inf')):
+                    graph[a][b] = weight
+    return graph
+
+
+def hops(graph, s):
+    """BFS from s. Returns {"actor_id": number of hops} for every actor s can reach."""
+    dist = {s: 0}
+    queue = deque([s])
+    while queue:
+        v = queue.popleft()
+        for u in graph[v]:
+            if u not in dist:
+                dist[u] = dist[v] + 1
+                queue.append(u)
+    return dist
+
+
+def distances(graph, s):
+    """Dijkstra from s. Returns {"actor_id": total weight} for every actor s can reach."""
+    dist = {s: 0}
+    done = set()
+    Q = [(0, s)]
+    while Q:
+        d, v = heappop(Q)
+        if v in done:
+            continue
+        done.add(v)
+        for u, weight in graph[v].items():
+            if d + weight < dist.get(u, float('inf')):
+                dist[u] = d + weight
+                heappush(Q, (d + weight, u))
+    return dist
+
+
+def component_histogram(graph):
+    """Returns {size: number of components of that size}."""
+    seen = set()
+    sizes = Counter()
+    for v in graph:
+        if v not in seen:
+            component = hops(graph, v)
+            seen.update(component)
+            sizes[len(component)] += 1
+    return dict(sizes)
+
+
+def actress_counts(data_filename):
+    """Counts the actresses and all the people of every movie in data.tsv, like
+    create_actress_dict() always did with csv.reader.
+
+    Returns:
+        actresses (Counter): The number of people whose professions start with "actr", per movie id
+        totals (Counter): The number of people, per movie id
+    """
+    actresses, totals = Counter(), Counter()
+    for fields in read_tsv(data_filename):
+        movies = [field for field in fields if field[:2] == "tt"]
+        totals.update(movies)
+        if fields[4][:4] == "actr":
+            actresses.update(movies)
+    return actresses, totals
@@ -0,0 +1,79 @@
+import json
+import random
+
+import pytest
+
+from batch import batch_paths, parallel_batch_paths, read_pairs, write_jsonl, write_report
+from oblig2 import _dijkstra_tree, bfs_shortest_path_between
+from snapshot import save_graph
+
+
+def pairs(G, k=80, seed=8):
+    """Random pairs, with the sources drawn from a few actors so they repeat."""
+    r = random.Random(seed)
+    sources = [r.choice(G.ids) for _ in range(10)]
+    return [(r.choice(sources), r.choice(G.ids)) for _ in range(k)] + [(G.ids[0], "nm9999999")]
+
+
+def test_batch_paths_match_one_search_per_pair(G, women):
+    w_w, _ = women
+    batch = pairs(G)
+    for kind, weights in (("shortest", None), ("chillest", G.weights), ("women", w_w)):
+        results = sorted(batch_paths(G, batch, kind, w_w))
+        assert [i for i, *_ in results] == list(range(len(batch)))
+        for i, s, e, path, weight in results:
+            assert (s, e) == batch[i]
+            if kind == "shortest":
+                expected = bfs_shortest_path_between(G, s, e)
+                assert len(path) == len(expected)
+                assert weight == (len(path) - 1 if path else float('inf'))
+            elif e in G:
+                _, dist, _ = _dijkstra_tree(G, weights, G.index[s])
+                assert weight == pytest.approx(dist[G.index[e]])
+            if not path:
+                assert weight == float('inf')
+
+
+def test_read_pairs_skips_comments_and_short_lines(tmp_path, capsys):
+    filename = tmp_path / "pairs.txt"
+    filename.write_text("# header\nnm1 nm2\n\nnm3\nnm4\tnm5 extra\n")
+    assert read_pairs(str(filename)) == [("nm1", "nm2"), ("nm4", "nm5")]
+    assert "pairs.txt:4" in capsys.readouterr().err
+
+
+def test_reports_have_one_entry_per_pair_and_kind(G, tmp_path):
+    batch = pairs(G, 20)
+    report = tmp_path / "report.txt"
+    write_report(G, batch, str(report))
+    shortest, chillest = report.read_text().removeprefix("Oppgave 2\n\n").split("Oppgave 3\n\n")
+    for section in (shortest, chillest):
+        assert len(section.strip("\n").split("\n\n")) == len(batch)
+    assert chillest.count("Total weight:") + chillest.count("No path between") == len(batch)
+
+    jsonl = tmp_path / "report.jsonl"
+    write_jsonl(G, batch, str(jsonl))
+    records = [json.loads(line) for line in jsonl.read_text().splitlines()]
+    assert len(records) == 2 * len(batch)
+    for record in records:
+        assert len(record["movies"]) == max(len(record["path"]) - 1, 0)
+        assert (record["weight"] is None) == (not record["path"])
+
+
+def test_parallel_batch_paths_match_batch_paths(G, women, dataset, tmp_path):
+    w_w, _ = women
+    snapshot = str(tmp_path / "g.snap")
+    save_graph(G, snapshot, dataset[:2])
+    batch = pairs(G)
+    for kind in ("shortest", "chillest", "women"):
+        parallel = list(parallel_batch_paths(snapshot, batch, kind, w_w, 2, dataset[:2], G.version))
+        assert sorted(parallel) == sorted(batch_paths(G, batch, kind, w_w))
+    assert not list(tmp_path.glob("*.w_w"))
+
+
+def test_workers_refuse_another_version_of_the_graph(G, dataset, tmp_path):
+    snapshot = str(tmp_path / "g.snap")
+    save_graph(G, snapshot, dataset[:2])
+    with pytest.raises(ValueError, match="version"):
+        list(parallel_batch_paths(snapshot, pairs(G, 4), "shortest", processes=1, version=G.version + 1))
+    with pytest.raises(ValueError, match="missing"):
+        list(parallel_batch_paths(str(tmp_path / "missing.snap"), pairs(G, 4), "shortest", processes=1))
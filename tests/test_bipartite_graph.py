@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+import reference
+from bipartite_graph import bfs_shortest_path_between
+from search import MovieCost, bidirectional_path, lightest_path, movie_cost
+from tsv_loader import load_bipartite
+
+
+@pytest.fixture(scope="module")
+def B(dataset):
+    return load_bipartite(*dataset[:2])
+
+
+@pytest.fixture(scope="module")
+def costars(dataset):
+    return reference.costar_graph(*dataset[:2])
+
+
+def pairs(B, k=100, seed=10):
+    r = random.Random(seed)
+    return [(r.choice(B.ids), r.choice(B.ids)) for _ in range(k)]
+
+
+def assert_movies_link(B, path, movies):
+    """Checks that every movie on the path has both actors in its cast."""
+    assert len(movies) == max(len(path) - 1, 0)
+    for a, b, movie in zip(path, path[1:], movies):
+        m = B.movie_ids.index(movie)
+        cast = {B.ids[v] for v in B.casts[B.cast_offsets[m]:B.cast_offsets[m + 1]]}
+        assert a in cast and b in cast
+
+
+def test_bipartite_graph_keeps_every_role_once(B, dataset):
+    _, films = reference.read_dataset(*dataset[:2])
+    assert len(B.films) == len(B.casts) == sum(map(len, films.values()))
+    for v, actor in enumerate(B.ids):
+        assert [B.movie_ids[m] for m in B.films[B.film_offsets[v]:B.film_offsets[v + 1]]] == films[actor]
+
+
+def test_bipartite_searches_match_the_costar_graph(B, costars):
+    for s, e in pairs(B):
+        path, movies = bfs_shortest_path_between(B, s, e)
+        hops = reference.hops(costars, s)
+        assert len(path) == (hops[e] + 1 if e in hops else 0)
+        assert_movies_link(B, path, movies)
+
+        dist = reference.distances(costars, s)
+        cost = MovieCost(B, movie_cost(B, lambda m: 10 - B.ratings[m]))
+        for search in (lightest_path, bidirectional_path):
+            path, movies, weight = search(B, cost, s, e)
+            assert weight == pytest.approx(dist.get(e, float('inf')), abs=1e-4)
+            assert_movies_link(B, path, movies)
+            if path:
+                assert weight == pytest.approx(sum(10 - B.ratings[B.movie_ids.index(movie)] for movie in movies))
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from contraction import build_hierarchy, ch_path_between, load_hierarchy, save_hierarchy
+from csr_graph import GraphBuilder
+from oblig2 import _bidirectional_dijkstra, chillest_path_between
+from tsv_loader import load_csr
+
+
+def pairs(G, k=60, seed=12):
+    r = random.Random(seed)
+    return [(r.choice(G.ids), r.choice(G.ids)) for _ in range(k)]
+
+
+@pytest.mark.parametrize("kind", ["chill", "women"])
+def test_contraction_hierarchy_matches_bidirectional_dijkstra(G, women, kind):
+    weights, edge_movie = (G.weights, G.edge_movie) if kind == "chill" else women
+    H = build_hierarchy(G, weights, edge_movie)
+    for s, e in pairs(G):
+        assert ch_path_between(G, H, weights, s, e) == _bidirectional_dijkstra(G, weights, s, e)
+    assert ch_path_between(G, H, weights, G.ids[0], "nm9999999") == ([], float('inf'))
+
+
+def test_equally_rated_movies_link_both_directions_of_an_edge(tmp_path):
+    # Both movies link the two actors, and they list them in opposite orders.
+    movies, actors = tmp_path / "movies.tsv", tmp_path / "actors.tsv"
+    movies.write_text("tt1\tMovie One\t7.0\t100\ntt2\tMovie Two\t7.0\t100\n")
+    actors.write_text("nm1\tAlice\ttt1\ttt2\nnm2\tBob\ttt2\ttt1\n")
+    G = load_csr(str(movies), str(actors))
+    assert list(G.edge_movie) == [0, 0]
+    H = build_hierarchy(G, G.weights, G.edge_movie)
+    assert ch_path_between(G, H, G.weights, "nm1", "nm2") == chillest_path_between(G, "nm1", "nm2") == (["nm1", "nm2"], 3.0)
+
+
+def test_stale_hierarchy_is_rejected(G, women, dataset, tmp_path):
+    w_w, women_movie = women
+    filename = str(tmp_path / "g.snap.ch-women")
+    H = build_hierarchy(G, w_w, women_movie)
+    save_hierarchy(G, H, filename, w_w, "women", dataset[:2])
+    loaded = load_hierarchy(G, filename, w_w, "women", dataset[:2])
+    assert loaded is not None and loaded.core == H.core
+    for s, e in pairs(G, 10):
+        assert ch_path_between(G, loaded, w_w, s, e) == ch_path_between(G, H, w_w, s, e)
+
+    assert load_hierarchy(G, filename, G.weights, "women") is None
+    assert load_hierarchy(G, filename, w_w, "chill") is None
+    builder = GraphBuilder()
+    for movie, name, rating in zip(G.movie_ids, G.movie_names, G.ratings):
+        builder.add_movie(movie, name, rating)
+    for actor, name in zip(G.ids, G.names):
+        builder.add_actor(actor, name, [])
+    assert load_hierarchy(builder.build(), filename, w_w, "women") is None
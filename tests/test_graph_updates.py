@@ -0,0 +1,96 @@
+import random
+
+from csr_graph import GraphBuilder
+from graph_updates import apply_delta, updater_for
+
+ARRAYS = ("offsets", "targets", "weights", "edge_movie")
+
+
+def same_partition(a, b):
+    """Returns True if the component labels a and b group the nodes the same way."""
+    return len(set(zip(a, b))) == len(set(a)) == len(set(b))
+
+
+def rebuild(G, films):
+    """Builds the graph again from scratch with the movies of G and the given filmographies."""
+    builder = GraphBuilder()
+    for movie, name, rating in zip(G.movie_ids, G.movie_names, G.ratings):
+        builder.add_movie(movie, name, rating)
+    for actor, name, movies in zip(G.ids, G.names, films):
+        builder.add_actor(actor, name, [G.movie_ids[m] for m in movies])
+    return builder.build()
+
+
+def assert_rebuilt(G, updater):
+    H = rebuild(G, updater.films)
+    assert G.edges == H.edges
+    for name in ARRAYS:
+        assert list(getattr(G, name)) == list(getattr(H, name)), name
+    assert same_partition(G.component, H.component)
+
+
+def test_updates_match_a_rebuild(G, dataset):
+    updater = updater_for(G, *dataset[:2])
+    r = random.Random(14)
+    casts = [m for m, cast in enumerate(updater.casts) if len(cast) > 1]
+    version = G.version
+
+    updater.set_rating(G.movie_ids[casts[0]], 9.9)
+    updater.remove_movie(G.movie_ids[casts[1]])
+    updater.add_actor("nm9999999", "New Actor ")
+    updater.add_movie("tt9999999", "New Movie", 8.5, [G.ids[v] for v in r.sample(range(len(G)), 5)] + ["nm9999999"])
+    updater.add_credit(G.ids[0], G.movie_ids[casts[2]])
+    updater.commit()
+
+    assert G.version == version + 1
+    assert_rebuilt(G, updater)
+
+
+def test_delta_file_matches_a_rebuild(G, dataset, tmp_path):
+    updater = updater_for(G, *dataset[:2])
+    casts = [m for m, cast in enumerate(updater.casts) if len(cast) > 1]
+    delta = tmp_path / "delta.tsv"
+    delta.write_text("# a new movie with two old actors and a new one\n"
+                     "add_actor\tnm9999999\tNew Actor \n"
+                     "add_movie\ttt9999999\tNew Movie\t6.5\n"
+                     f"add_credit\t{G.ids[3]}\ttt9999999\n"
+                     f"add_credit\t{G.ids[4]}\ttt9999999\n"
+                     "add_credit\tnm9999999\ttt9999999\n"
+                     "\n"
+                     f"set_rating\t{G.movie_ids[casts[0]]}\t1.5\n"
+                     f"remove_movie\t{G.movie_ids[casts[1]]}\n")
+
+    assert apply_delta(updater, str(delta)) > 0
+    assert G.connected(G.ids[3], "nm9999999")
+    assert_rebuilt(G, updater)
+
+
+def test_removing_a_movie_can_split_a_component(G, dataset):
+    updater = updater_for(G, *dataset[:2])
+    a = G.ids[0]
+    b = next(actor for actor in G.ids if not G.connected(a, actor))
+
+    updater.add_movie("tt9999998", "Bridge", 5.0, [a, b])
+    updater.commit()
+    assert G.connected(a, b)
+    updater.remove_movie("tt9999998")
+    updater.commit()
+    assert not G.connected(a, b)
+    assert_rebuilt(G, updater)
+
+
+def test_equally_rated_movies_link_both_directions_like_a_rebuild(G, dataset):
+    updater = updater_for(G, *dataset[:2])
+    a, b = G.ids[0], G.ids[1]
+    # The two actors get the movies in opposite orders.
+    updater.add_movie("tt9999998", "New Movie", 7.0, [a])
+    updater.add_movie("tt9999999", "Other Movie", 7.0, [b])
+    updater.add_credit(a, "tt9999999")
+    updater.add_credit(b, "tt9999998")
+    updater.commit()
+
+    u, v = G.index[a], G.index[b]
+    row = list(G.targets[G.offsets[u]:G.offsets[u + 1]])
+    back = list(G.targets[G.offsets[v]:G.offsets[v + 1]])
+    assert G.edge_movie[G.offsets[u] + row.index(v)] == G.edge_movie[G.offsets[v] + back.index(u)]
+    assert_rebuilt(G, updater)
@@ -0,0 +1,67 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import instrument
+from oblig2 import _bfs_tree, _dijkstra_tree
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    """Turns instrumentation on for one test, with no records from before."""
+    monkeypatch.setattr(instrument, "ENABLED", True)
+    monkeypatch.setattr(instrument, "metrics", [])
+
+
+def test_nothing_is_recorded_when_disabled(G, monkeypatch):
+    monkeypatch.setattr(instrument, "ENABLED", False)
+    monkeypatch.setattr(instrument, "metrics", [])
+    with instrument.stage("query:test") as record:
+        _bfs_tree(G, 0)
+    assert record is None and instrument.metrics == []
+
+
+def test_stages_record_time_memory_and_search_counters(G, enabled, tmp_path):
+    with instrument.stage("query:bfs", source=0):
+        _, reached = _bfs_tree(G, 0)
+    with instrument.stage("query:dijkstra"):
+        parents, _, _ = _dijkstra_tree(G, G.weights, 0)
+
+    bfs, dijkstra = instrument.metrics
+    assert bfs["stage"] == "query:bfs" and bfs["source"] == 0 and bfs["seconds"] >= 0
+    assert bfs["memory_after_mb"] > 0
+    assert bfs["counters"]["nodes_popped"] == len(reached)
+    assert bfs["counters"]["edges_scanned"] == sum(G.offsets[v + 1] - G.offsets[v] for v in reached)
+    counters = dijkstra["counters"]
+    assert counters["nodes_settled"] == sum(1 for p in parents if p >= 0)
+    assert counters["heap_pushes"] == counters["nodes_popped"]
+
+    summary = instrument.summary()
+    assert summary["query:bfs"]["calls"] == 1
+    assert summary["query:dijkstra"]["counters"] == counters
+
+    filename = tmp_path / "metrics.jsonl"
+    instrument.export(str(filename))
+    assert [json.loads(line)["stage"] for line in filename.read_text().splitlines()] == ["query:bfs", "query:dijkstra"]
+
+
+def test_counters_go_to_the_innermost_stage(enabled):
+    with instrument.stage("outer"):
+        instrument.count(calls=1)
+        with instrument.stage("inner"):
+            instrument.count(calls=2)
+            instrument.count(calls=3)
+    inner, outer = instrument.metrics
+    assert inner["counters"] == {"calls": 5} and outer["counters"] == {"calls": 1}
+
+
+def test_one_query_can_be_profiled_from_the_command_line(G, dataset, tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, os.path.join(root, "instrument.py"), "chillest", G.ids[0], G.ids[1],
+                             "--movies", dataset[0], "--actors", dataset[1], "--snapshot", str(tmp_path / "g.snap")],
+                            capture_output=True, text=True, cwd=tmp_path, check=True)
+    assert "Profile of query:chillest" in result.stderr
+    assert "nodes_settled=" in result.stdout
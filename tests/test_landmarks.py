@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+from graph_updates import updater_for
+from landmarks import astar, compute_landmarks, load_landmarks, save_landmarks
+from oblig2 import _dijkstra_tree
+
+
+def pairs(G, k=60, seed=11):
+    r = random.Random(seed)
+    return [(r.choice(G.ids), r.choice(G.ids)) for _ in range(k)]
+
+
+def test_alt_matches_dijkstra_and_settles_fewer_nodes(G, women):
+    w_w, _ = women
+    for weights in (G.weights, w_w):
+        landmarks = compute_landmarks(G, weights, k=4)
+        settled = {"alt": 0, "plain": 0}
+        for s, e in pairs(G):
+            _, dist, _ = _dijkstra_tree(G, weights, G.index[s])
+            path, weight, n = astar(G, weights, landmarks, s, e)
+            assert weight == pytest.approx(dist[G.index[e]])
+            if path:
+                assert path[0] == s and path[-1] == e
+            settled["alt"] += n
+            settled["plain"] += astar(G, weights, None, s, e)[2]
+        assert settled["alt"] < settled["plain"]
+    assert astar(G, G.weights, None, G.ids[0], "nm9999999") == ([], float('inf'), 0)
+
+
+def test_landmarks_are_read_back(G, dataset, tmp_path):
+    filename = str(tmp_path / "g.snap.landmarks-chill")
+    landmarks = compute_landmarks(G, G.weights, k=3)
+    save_landmarks(G, landmarks, filename, G.weights, "chill", dataset[:2])
+    loaded = load_landmarks(G, filename, G.weights, "chill", dataset[:2])
+    assert list(loaded.nodes) == list(landmarks.nodes)
+    assert [list(d) for d in loaded.distances] == [list(d) for d in landmarks.distances]
+
+
+def test_stale_landmarks_are_rejected(G, women, dataset, tmp_path):
+    w_w, _ = women
+    filename = str(tmp_path / "g.snap.landmarks-chill")
+    save_landmarks(G, compute_landmarks(G, G.weights, k=2), filename, G.weights, "chill", dataset[:2])
+    assert load_landmarks(G, filename, G.weights, "chill", dataset[:2]) is not None
+
+    assert load_landmarks(G, filename, w_w, "chill") is None
+    assert load_landmarks(G, filename, G.weights, "women") is None
+    updater = updater_for(G, *dataset[:2])
+    updater.set_rating(G.movie_ids[G.edge_movie[0]], 1.0)
+    updater.commit()
+    assert load_landmarks(G, filename, G.weights, "chill") is None
@@ -0,0 +1,133 @@
+import random
+
+import pytest
+
+import reference
+from oblig2 import (_dijkstra_tree, bfs_shortest_path_between, bfs_shortest_paths_from, chillest_path_between, components,
+                    create_actress_dict, dijkstra, least_sexistic_path)
+from union_find import cast_components, row_components
+
+
+@pytest.fixture(scope="module")
+def costars(dataset):
+    return reference.costar_graph(*dataset[:2])
+
+
+def sources(G, k=20, seed=1):
+    r = random.Random(seed)
+    return [r.choice(G.ids) for _ in range(k)]
+
+
+def pairs(G, k=100, seed=2):
+    r = random.Random(seed)
+    return [(r.choice(G.ids), r.choice(G.ids)) for _ in range(k)]
+
+
+def assert_walk(costars, path, s, e):
+    """Checks that path goes from s to e between co-stars."""
+    assert path[0] == s and path[-1] == e
+    for a, b in zip(path, path[1:]):
+        assert b in costars[a]
+
+
+def test_rows_hold_every_costar_once_with_the_smallest_weight(G, costars):
+    assert G.edges == sum(len(row) for row in costars.values()) // 2
+    for v, actor in enumerate(G.ids):
+        row = {G.ids[G.targets[i]]: G.weights[i] for i in range(G.offsets[v], G.offsets[v + 1])}
+        assert row == costars[actor]
+
+
+def test_bfs_tree_reaches_the_component_one_hop_at_a_time(G, costars):
+    for s in sources(G):
+        parents = bfs_shortest_paths_from(G, s)
+        dist = reference.hops(costars, s)
+        assert parents.keys() == dist.keys()
+        assert parents[s] is None
+        for actor, parent in parents.items():
+            if parent is not None:
+                assert dist[parent] == dist[actor] - 1 and parent in costars[actor]
+
+
+def test_dijkstra_matches_a_dictionary_dijkstra(G, costars):
+    for s in sources(G):
+        parents, D = dijkstra(G, s)
+        dist = reference.distances(costars, s)
+        assert dict(D) == pytest.approx(dist)
+        for actor, parent in parents.items():
+            if parent is not None:
+                assert D[actor] == pytest.approx(D[parent] + costars[parent][actor])
+
+
+def test_bidirectional_bfs_matches_a_full_bfs(G, costars):
+    for s, e in pairs(G):
+        path = bfs_shortest_path_between(G, s, e)
+        dist = reference.hops(costars, s)
+        if e not in dist:
+            assert path == []
+            continue
+        assert len(path) == dist[e] + 1
+        assert_walk(costars, path, s, e)
+    assert bfs_shortest_path_between(G, G.ids[0], G.ids[0]) == [G.ids[0]]
+    assert bfs_shortest_path_between(G, G.ids[0], "nm9999999") == []
+
+
+def path_weight(G, weights, path):
+    return sum(weights[G.edge_slot(G.index[a], G.index[b])] for a, b in zip(path, path[1:]))
+
+
+def test_dijkstra_stopping_at_the_end_matches_a_full_dijkstra(G):
+    for s, e in pairs(G, 30):
+        _, D = dijkstra(G, s)
+        parents, D_e = dijkstra(G, s, e)
+        assert D_e[e] == D[e]
+        if e in parents:
+            assert parents.keys() <= D.keys()
+
+
+def test_bidirectional_dijkstra_matches_a_full_dijkstra(G, costars, women):
+    w_w, _ = women
+    for s, e in pairs(G):
+        path, weight = chillest_path_between(G, s, e)
+        dist = reference.distances(costars, s)
+        if e not in dist:
+            assert (path, weight) == ([], float('inf'))
+            continue
+        assert weight == pytest.approx(dist[e])
+        assert path_weight(G, G.weights, path) == pytest.approx(weight)
+        assert_walk(costars, path, s, e)
+
+        path = least_sexistic_path(G, w_w, s, e)
+        _, full, _ = _dijkstra_tree(G, w_w, G.index[s])
+        assert path_weight(G, w_w, path) == pytest.approx(full[G.index[e]])
+        assert_walk(costars, path, s, e)
+
+
+def test_components_match_a_bfs_from_every_actor(G, costars):
+    sizes = components(G)
+    assert dict(sizes) == reference.component_histogram(costars)
+    assert list(sizes) == sorted(sizes, reverse=True)
+    for s in sources(G):
+        assert {G.ids[v] for v in range(len(G)) if G.component[v] == G.component[G.index[s]]} \
+            == reference.hops(costars, s).keys()
+
+
+def test_cast_and_row_components_agree(G):
+    assert list(row_components(G.offsets, G.targets)) == list(G.component)
+    assert list(cast_components(7, [[0, 1], [2, 3, 4], [1, 5], [6], []])) == [0, 0, 1, 1, 1, 0, 2]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 50, 4096, 1 << 22])
+def test_chunked_actress_counts_match_csv_reader(dataset, chunk_size):
+    assert create_actress_dict(dataset[2], chunk_size) == reference.actress_counts(dataset[2])
+
+
+def test_actress_counts_across_line_ends(tmp_path):
+    data = tmp_path / "data.tsv"
+    data.write_text("nm1\tAda\t1900\t\\N\tactress,producer\ttt1\ttt2\n"
+                    "nm2\tBo\t1950\t\\N\tactor\ttt1\n"
+                    "nm3\tCy\t1960\t\\N\tdirector\ttt2\n"
+                    "nm4\tDi\t1970\t\\N\tactress\ttt2")
+    for chunk_size in (1, 10, 1000):
+        actresses, totals = create_actress_dict(str(data), chunk_size)
+        assert actresses == {"tt1": 1, "tt2": 2}
+        assert totals == {"tt1": 2, "tt2": 3}
@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+import reference
+from oblig2 import _dijkstra_tree
+from oppgave1 import Graph
+
+
+@pytest.fixture(scope="module")
+def graph(dataset):
+    return Graph(*dataset)
+
+
+@pytest.fixture(scope="module")
+def costars(dataset):
+    return reference.costar_graph(*dataset[:2])
+
+
+def pairs(graph, k=100, seed=25):
+    r = random.Random(seed)
+    ids = graph.bipartite.ids
+    return [(r.choice(ids), r.choice(ids)) for _ in range(k)]
+
+
+def test_graph_has_the_actors_and_their_costars(graph, costars):
+    assert graph.nodes == len(graph) == len(costars)
+    assert graph.edges == sum(len(row) for row in costars.values()) // 2
+    for actor in list(costars)[:50]:
+        assert actor in graph
+        assert set(graph.neighbours(actor)) == costars[actor].keys()
+    assert "nm9999999" not in graph
+
+
+def test_paths_match_the_costar_graph(graph, costars, G, women):
+    w_w, _ = women
+    for s, e in pairs(graph):
+        hops = reference.hops(costars, s)
+        path = graph.shortest_path(s, e)
+        assert len(path) == (hops[e] + 1 if e in hops else 0)
+        assert graph.connected(s, e) == (e in hops)
+
+        path, weight = graph.chillest_path(s, e)
+        assert weight == pytest.approx(reference.distances(costars, s).get(e, float('inf')), abs=1e-4)
+        if path:
+            assert sum(10 - rating for _, _, rating in graph.path_movies(path)) == pytest.approx(weight)
+
+        path, weight = graph.women_path(s, e)
+        _, dist, _ = _dijkstra_tree(G, w_w, G.index[s])
+        assert weight == pytest.approx(dist[G.index[e]], abs=1e-4)
+        assert len(graph.path_movies(path, women=True)) == max(len(path) - 1, 0)
+
+
+def test_women_path_needs_the_data_file(dataset):
+    graph = Graph(*dataset[:2])
+    with pytest.raises(ValueError):
+        graph.women_path(*graph.bipartite.ids[:2])
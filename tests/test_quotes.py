@@ -0,0 +1,167 @@
+import asyncio
+import os
+import sqlite3
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import quotes
+from oblig2 import getMovieQuote
+from quotes import QuoteCache, QuoteFetcher, QuoteLine, fetch_quotes, parse_quote, print_quote
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+class StubIMDb(BaseHTTPRequestHandler):
+    """Serves the fixture pages under /title/, like imdb.com does.
+
+    tt0468569 has a quote, tt0058150 has none, tt0000404 does not exist, tt0000503 always
+    answers 503, and tt0000429 answers 429 twice before it answers with the quote.
+    """
+
+    def do_GET(self):
+        movie_id = self.path.rsplit("/", 1)[-1]
+        self.server.requests[movie_id] += 1
+        if movie_id == "tt0468569":
+            self.answer(200, fixture("quote.html"))
+        elif movie_id == "tt0058150":
+            self.answer(200, fixture("no_quote.html"))
+        elif movie_id == "tt0000503":
+            self.answer(503, b"busy")
+        elif movie_id == "tt0000429" and self.server.requests[movie_id] <= 2:
+            self.answer(429, b"slow down")
+        elif movie_id == "tt0000429":
+            self.answer(200, fixture("quote.html"))
+        else:
+            self.answer(404, b"not found")
+
+    def answer(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    """A local stub of imdb.com in a thread, with the number of requests for every movie."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubIMDb)
+    server.requests = Counter()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_port}/title/"
+    server.shutdown()
+    server.server_close()
+
+
+THE_DARK_KNIGHT = [
+    QuoteLine("Joker", "[laughs] Why so serious?", ("laughs",)),
+    QuoteLine("Harvey Dent", "You either die a hero, or you live long enough to see yourself become the villain. "
+                             "[pauses]", ("pauses",)),
+    QuoteLine(None, "", ("Joker slams a pencil into the table",)),
+]
+
+
+def test_parse_quote_reads_the_first_quote():
+    assert parse_quote(fixture("quote.html")) == THE_DARK_KNIGHT
+    assert parse_quote(fixture("no_quote.html")) is None
+
+
+def test_print_quote_keeps_the_stage_directions_in_place(capsys):
+    print_quote("The Dark Knight", THE_DARK_KNIGHT)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == "Quote from The Dark Knight:"
+    assert lines[2] == "Joker: [laughs] Why so serious?"
+    assert lines[3].endswith("become the villain. [pauses]")
+    assert lines[4] == "Joker slams a pencil into the table"
+
+
+def test_fetch_many_parses_pages_and_caches_every_answer(stub):
+    server, base_url = stub
+    cache = QuoteCache(":memory:")
+    movie_ids = ["tt0468569", "tt0058150", "tt0000404", "tt0468569"]
+
+    quotes_by_id = fetch_quotes(movie_ids, cache, base_url=base_url, backoff=0)
+    assert quotes_by_id == {"tt0468569": THE_DARK_KNIGHT, "tt0058150": None, "tt0000404": None}
+    assert server.requests == Counter({"tt0468569": 1, "tt0058150": 1, "tt0000404": 1})
+
+    # Everything is answered from the cache the second time, also the movies without a quote
+    assert fetch_quotes(movie_ids, cache, base_url=base_url, backoff=0) == quotes_by_id
+    assert sum(server.requests.values()) == 3
+
+
+def test_busy_server_is_tried_again(stub):
+    server, base_url = stub
+    with QuoteFetcher(base_url=base_url, retries=3, backoff=0) as fetcher:
+        assert asyncio.run(fetcher.fetch("tt0000429")) == THE_DARK_KNIGHT
+    assert server.requests["tt0000429"] == 3
+
+
+def test_failed_movies_are_not_cached(stub):
+    server, base_url = stub
+    cache = QuoteCache(":memory:")
+    with QuoteFetcher(base_url=base_url, retries=2, backoff=0, cache=cache) as fetcher:
+        with pytest.raises(requests.HTTPError):
+            asyncio.run(fetcher.fetch("tt0000503"))
+        assert asyncio.run(fetcher.fetch_many(["tt0000503", "tt0058150"])) == {"tt0058150": None}
+    assert server.requests["tt0000503"] == 6
+    assert cache.get("tt0000503") == (False, None)
+    assert cache.get("tt0058150") == (True, None)
+
+
+def test_cache_entries_expire_after_ttl(stub, monkeypatch):
+    server, base_url = stub
+    now = [1_000_000.0]
+    monkeypatch.setattr(quotes.time, "time", lambda: now[0])
+    cache = QuoteCache(":memory:", ttl=60)
+
+    fetch_quotes(["tt0468569"], cache, base_url=base_url)
+    now[0] += 59
+    assert cache.get("tt0468569") == (True, THE_DARK_KNIGHT)
+    fetch_quotes(["tt0468569"], cache, base_url=base_url)
+    assert server.requests["tt0468569"] == 1
+
+    now[0] += 2
+    assert cache.get("tt0468569") == (False, None)
+    fetch_quotes(["tt0468569"], cache, base_url=base_url)
+    assert server.requests["tt0468569"] == 2
+
+    now[0] += 61
+    cache.evict()
+    assert cache.db.execute("SELECT COUNT(*) FROM quotes").fetchone()[0] == 0
+
+
+def test_cache_of_another_version_is_emptied(tmp_path):
+    filename = str(tmp_path / "quotes.sqlite")
+    db = sqlite3.connect(filename)
+    db.execute("CREATE TABLE quotes (movie_id TEXT PRIMARY KEY, fetched REAL, quote TEXT)")
+    db.execute("INSERT INTO quotes VALUES ('tt0468569', 1e12, '[[\"Joker\", \"Why so serious?\", []]]')")
+    db.execute(f"PRAGMA user_version = {quotes.CACHE_VERSION - 1}")
+    db.commit()
+    db.close()
+
+    assert QuoteCache(filename).get("tt0468569") == (False, None)
+
+
+def test_getMovieQuote_prints_a_cached_quote(capsys):
+    cache = QuoteCache(":memory:")
+    cache.put("tt0468569", parse_quote(fixture("quote.html")))
+    cache.put("tt0058150", None)
+
+    getMovieQuote("tt0468569", "The Dark Knight", cache)
+    getMovieQuote("tt0058150", "Goldfinger", cache)
+    out = capsys.readouterr().out
+    assert "Joker: [laughs] Why so serious?" in out
+    assert "Goldfinger has no quote" in out
@@ -0,0 +1,42 @@
+import random
+from collections import Counter
+
+import pytest
+
+import reference
+from separation import _column_counts, separation_stats
+from tsv_loader import load_bipartite
+
+
+@pytest.mark.parametrize("width", [1, 64, 4096])
+def test_column_counts_count_every_bit(width):
+    r = random.Random(width)
+    words = [r.getrandbits(width) for _ in range(300)]
+    assert _column_counts(words, width) == [sum(word >> i & 1 for word in words) for i in range(width)]
+
+
+def test_separation_matches_a_bfs_from_every_source(G, dataset):
+    costars = reference.costar_graph(*dataset[:2])
+    sources = random.Random(13).sample(range(len(G)), 150)
+    hops = [reference.hops(costars, G.ids[s]) for s in sources]
+    histogram = Counter(d for dist in hops for d in dist.values() if d)
+
+    for graph in (G, load_bipartite(*dataset[:2])):
+        stats = separation_stats(graph, sources, width=64)
+        assert list(stats.sources) == sources
+        for i, dist in enumerate(hops):
+            others = [d for d in dist.values() if d]
+            assert stats.reached[i] == len(others)
+            assert stats.eccentricity[i] == max(others, default=0)
+            assert stats.average[i] == pytest.approx(sum(others) / len(others) if others else 0.0)
+        assert stats.histogram == [0] + [histogram[d] for d in range(1, len(stats.histogram))]
+        lower, upper = stats.diameter()
+        assert lower == max(stats.eccentricity) <= upper
+
+
+def test_every_actor_as_source_gives_the_exact_diameter(G, dataset):
+    costars = reference.costar_graph(*dataset[:2])
+    stats = separation_stats(G)
+    assert stats.complete
+    diameter = max(max(reference.hops(costars, actor).values()) for actor in G.ids)
+    assert stats.diameter() == (diameter, diameter)
@@ -0,0 +1,119 @@
+import asyncio
+import json
+
+import pytest
+
+from oblig2 import _bidirectional_dijkstra, women_edge_weights
+from server import QueryServer
+from tsv_loader import load_csr
+
+
+@pytest.fixture(scope="module")
+def graph(dataset):
+    G = load_csr(*dataset[:2])
+    return G, women_edge_weights(G, *dataset)
+
+
+def exchange(server, *requests):
+    """Sends the raw requests on one connection to server.handle(), and reads the answers
+    until the server closes it.
+
+    Returns:
+        list: (status, headers, answer) for every answer
+    """
+    async def run():
+        listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        async with listener:
+            reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+            writer.write(b"".join(requests))
+            await writer.drain()
+            data = await reader.read()
+            writer.close()
+        return data
+
+    data = asyncio.run(run())
+    answers = []
+    while data:
+        head, _, data = data.partition(b"\r\n\r\n")
+        status_line, *lines = head.decode("latin-1").split("\r\n")
+        headers = {name.lower(): value.strip() for name, _, value in (line.partition(":") for line in lines)}
+        length = int(headers["content-length"])
+        answers.append((int(status_line.split()[1]), headers, json.loads(data[:length])))
+        data = data[length:]
+    return answers
+
+
+def get(server, target):
+    [answer] = exchange(server, f"GET {target} HTTP/1.1\r\nConnection: close\r\n\r\n".encode())
+    return answer
+
+
+def test_paths_are_answered_as_json(graph):
+    G, (w_w, women_movie) = graph
+    server = QueryServer(G, w_w, women_movie)
+    s, e = G.ids[0], G.ids[G.targets[G.offsets[0]]]
+
+    status, headers, answer = get(server, f"/chillest?from={s}&to={e}")
+    path, weight = _bidirectional_dijkstra(G, G.weights, s, e)
+    assert status == 200 and headers["content-type"] == "application/json"
+    assert answer["path"] == path and answer["weight"] == pytest.approx(weight)
+    assert get(server, "/stats")[2]["hits"] == 0
+    get(server, f"/chillest?from={s}&to={e}")
+    assert get(server, "/stats")[2]["hits"] == 1
+
+
+def test_keep_alive_answers_every_request_on_the_connection(graph):
+    G, _ = graph
+    answers = exchange(QueryServer(G), b"GET /stats HTTP/1.1\r\n\r\n",
+                       f"GET /component?actor={G.ids[0]} HTTP/1.1\r\nConnection: close\r\n\r\n".encode())
+    assert [status for status, _, _ in answers] == [200, 200]
+    assert answers[0][1]["connection"] == "keep-alive" and answers[1][1]["connection"] == "close"
+
+
+@pytest.mark.parametrize("target, status", [
+    ("/nowhere", 404),
+    ("/shortest?from=nm0000000", 400),
+    ("/shortest?from=nm0000000&to=nm9999999", 404),
+    ("/neighbours?actor=nm0000000&limit=many", 400),
+    ("/women?from=nm0000000&to=nm0000001", 503),
+])
+def test_bad_queries_get_an_error(graph, target, status):
+    G, _ = graph
+    answer_status, _, answer = get(QueryServer(G), target)
+    assert answer_status == status
+    assert "error" in answer
+
+
+def test_malformed_requests_get_400_and_405(graph):
+    G, _ = graph
+    server = QueryServer(G)
+    [(status, _, _)] = exchange(server, b"GET /stats\r\n\r\n")
+    assert status == 400
+    [(status, _, _)] = exchange(server, b"POST /stats HTTP/1.1\r\nConnection: close\r\n\r\n")
+    assert status == 405
+
+
+def test_bad_content_length_gets_400_and_closes_the_connection(graph):
+    G, _ = graph
+    # The second request is never read, since the end of the first one cannot be found
+    answers = exchange(QueryServer(G), b"GET /stats HTTP/1.1\r\nContent-Length: lots\r\n\r\n",
+                       b"GET /stats HTTP/1.1\r\n\r\n")
+    assert len(answers) == 1
+    status, headers, answer = answers[0]
+    assert status == 400 and headers["connection"] == "close"
+    assert answer == {"error": "malformed Content-Length"}
+
+
+def test_failing_query_gets_500(graph, capsys):
+    G, _ = graph
+    server = QueryServer(G)
+
+    def fail(params):
+        raise KeyError("broken")
+
+    server._routes["/chillest"] = fail
+    answers = exchange(server, b"GET /chillest?from=a&to=b HTTP/1.1\r\n\r\n",
+                       b"GET /stats HTTP/1.1\r\nConnection: close\r\n\r\n")
+    assert [(status, answer) for status, _, answer in answers] == [
+        (500, {"error": "internal error (KeyError)"}), (200, server.stats())]
+    assert "KeyError" in capsys.readouterr().err
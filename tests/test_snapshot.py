@@ -0,0 +1,54 @@
+import os
+import shutil
+
+from oblig2 import loadgraph
+from snapshot import load_graph, save_graph
+
+FIELDS = ("ids", "names", "offsets", "targets", "weights", "edge_movie", "movie_ids", "movie_names", "ratings",
+          "component")
+
+
+def assert_same_graph(G, H):
+    assert len(G) == len(H) and G.edges == H.edges and G.version == H.version
+    for name in FIELDS:
+        assert list(getattr(G, name)) == list(getattr(H, name)), name
+    assert G.index == H.index
+
+
+def test_snapshot_gives_back_the_same_graph(G, dataset, tmp_path):
+    filename = str(tmp_path / "g.snap")
+    G.version = 3
+    save_graph(G, filename, dataset[:2])
+    H = load_graph(filename, dataset[:2])
+    assert isinstance(H.targets, memoryview)
+    assert_same_graph(G, H)
+
+
+def test_stale_snapshot_is_rejected(G, dataset, tmp_path):
+    sources = [str(tmp_path / "movies.tsv"), str(tmp_path / "actors.tsv")]
+    for source, copy in zip(dataset, sources):
+        shutil.copy(source, copy)
+    filename = str(tmp_path / "g.snap")
+    save_graph(G, filename, sources)
+    assert load_graph(filename, sources) is not None
+
+    stat = os.stat(sources[0])
+    os.utime(sources[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert load_graph(filename, sources) is None
+    # Without the sources the snapshot is not checked against them
+    assert load_graph(filename) is not None
+    assert load_graph(str(tmp_path / "missing.snap")) is None
+
+    with open(filename, "r+b") as f:
+        f.write(b"NOTASNAP")
+    assert load_graph(filename) is None
+
+
+def test_loadgraph_writes_a_snapshot_and_uses_it(G, dataset, tmp_path, capsys):
+    filename = str(tmp_path / "g.snap")
+    assert_same_graph(G, loadgraph(*dataset[:2], filename))
+    assert os.path.exists(filename)
+    H = loadgraph(*dataset[:2], filename)
+    assert isinstance(H.targets, memoryview)
+    assert_same_graph(G, H)
+    assert f"Edges: {G.edges}" in capsys.readouterr().out
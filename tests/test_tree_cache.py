@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from graph_updates import updater_for
+from oblig2 import _dijkstra_tree, bfs_shortest_path_between
+from tree_cache import SearchTreeCache
+
+
+def test_cached_paths_match_the_searches(G, women):
+    w_w, _ = women
+    trees = SearchTreeCache(G, {"women": w_w})
+    r = random.Random(21)
+    sources = [r.choice(G.ids) for _ in range(5)]
+    for s in sources * 3:
+        # A pair in different components is answered without a tree
+        e = r.choice([actor for actor in G.ids if G.connected(s, actor)])
+        path, hops = trees.path("shortest", s, e)
+        assert len(path) == len(bfs_shortest_path_between(G, s, e))
+        assert hops == (len(path) - 1 if path else float('inf'))
+        for kind, weights in (("chillest", G.weights), ("women", w_w)):
+            _, dist, _ = _dijkstra_tree(G, weights, G.index[s])
+            assert trees.path(kind, s, e)[1] == pytest.approx(dist[G.index[e]])
+    assert trees.misses == 3 * len(set(sources))
+    assert trees.hits + trees.misses == 3 * 3 * len(sources)
+
+
+def test_least_recently_used_tree_is_evicted(G):
+    # A BFS tree is one int32 per node, so two of them fit
+    trees = SearchTreeCache(G, max_mb=2.5 * 4 * len(G) / 2**20)
+    a, b, c = 0, 1, 2
+    trees.tree("shortest", a)
+    trees.tree("shortest", b)
+    trees.tree("shortest", a)
+    trees.tree("shortest", c)
+    assert trees.evictions == 1 and len(trees) == 2
+    assert trees.stats()["mb"] * 2**20 == 2 * 4 * len(G)
+
+    hits = trees.hits
+    trees.tree("shortest", a)
+    trees.tree("shortest", c)
+    assert trees.hits == hits + 2
+    trees.tree("shortest", b)
+    assert trees.misses == 4
+
+
+def test_changed_graph_empties_the_cache(G, dataset):
+    trees = SearchTreeCache(G)
+    trees.tree("chillest", 0)
+    assert len(trees) == 1
+
+    updater = updater_for(G, *dataset[:2])
+    updater.set_rating(G.movie_ids[G.edge_movie[G.offsets[0]]], 0.5)
+    updater.commit()
+    _, dist = trees.tree("chillest", 0)
+    assert trees.misses == 2 and len(trees) == 1
+    assert list(dist) == list(_dijkstra_tree(G, G.weights, 0)[1])
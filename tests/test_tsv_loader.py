@@ -0,0 +1,76 @@
+import reference
+from csr_graph import GraphBuilder
+from oblig2 import buildgraph, readfile
+import tsv_loader
+from tsv_loader import load_csr, read_actors, read_movies
+
+
+def test_readers_split_names_and_movie_ids(tmp_path):
+    movies = tmp_path / "movies.tsv"
+    actors = tmp_path / "actors.tsv"
+    movies.write_text("tt0000001\tThe Movie\t7.5\t100\ntt0000002\tTwo\tParts\t6.0\t20\n")
+    actors.write_text("nm0000001\tAda\ttt0000001\ttt0000002\nnm0000002\tBo\tJo\tNes\ttt0000002\nnm0000003\tCy\n")
+
+    assert list(read_movies(str(movies))) == [("tt0000001", "The Movie", 7.5), ("tt0000002", "Two Parts", 6.0)]
+    assert list(read_actors(str(actors))) == [("nm0000001", "Ada ", ["tt0000001", "tt0000002"]),
+                                              ("nm0000002", "Bo Jo Nes ", ["tt0000002"]),
+                                              ("nm0000003", "Cy ", [])]
+
+
+def test_readfile_matches_the_files(dataset):
+    nodes, actors_in_movie, actor_names, movies_and_rating, actor_and_movies = readfile(*dataset[:2])
+    ratings, films = reference.read_dataset(*dataset[:2])
+    assert nodes == len(films) == len(actor_names)
+    assert actor_and_movies == films
+    assert {movie: rating for movie, (_, rating) in movies_and_rating.items()} == ratings
+    for movie, cast in actors_in_movie.items():
+        assert all(movie in films[actor] for actor in cast)
+    assert sum(map(len, actors_in_movie.values())) == sum(map(len, films.values()))
+
+
+def test_streamed_graph_matches_readfile_and_buildgraph(dataset):
+    _, actors_in_movie, actor_names, movies_and_rating, actor_and_movies = readfile(*dataset[:2])
+    H = buildgraph(actors_in_movie, movies_and_rating, actor_and_movies, actor_names)
+    G = load_csr(*dataset[:2])
+    for name in ("ids", "names", "offsets", "targets", "weights", "edge_movie", "movie_ids", "ratings", "component"):
+        assert list(getattr(G, name)) == list(getattr(H, name)), name
+    assert G.edges == H.edges
+
+
+def test_quotes_and_crlf_are_parsed_like_csv_reader(tmp_path):
+    movies = tmp_path / "movies.tsv"
+    actors = tmp_path / "actors.tsv"
+    movies.write_bytes(b'tt0000001\t"The" Movie\t7.5\t100\r\ntt0000002\tTwo\tParts\t6.0\t20\r\n')
+    actors.write_bytes(b'nm0000001\t"Ada"\ttt0000001\ttt0000002\r\nnm0000002\tBo\r\n')
+
+    assert list(read_movies(str(movies))) == [("tt0000001", "The Movie", 7.5), ("tt0000002", "Two Parts", 6.0)]
+    assert list(read_actors(str(actors))) == [("nm0000001", "Ada ", ["tt0000001", "tt0000002"]),
+                                              ("nm0000002", "Bo ", [])]
+
+
+def test_bulk_builder_matches_one_record_at_a_time(dataset, tmp_path):
+    # An actor with a movie that is not in movies.tsv, which is skipped
+    actors = tmp_path / "actors.tsv"
+    actors.write_text(open(dataset[1]).read() + "nm9999999\tNo Body\ttt9999999\t" + reference.read_tsv(dataset[0])[0][0] + "\n")
+    G = load_csr(dataset[0], str(actors))
+
+    builder = GraphBuilder()
+    for movie in read_movies(dataset[0]):
+        builder.add_movie(*movie)
+    for actor in read_actors(str(actors)):
+        builder.add_actor(*actor)
+    H = builder.build()
+    for name in ("ids", "names", "offsets", "targets", "weights", "edge_movie", "component"):
+        assert list(getattr(G, name)) == list(getattr(H, name)), name
+    assert G.ids[-1] == "nm9999999" and G.names[-1] == "No Body "
+
+
+def test_small_blocks_give_the_same_graph(dataset, monkeypatch):
+    movies, actors = list(read_movies(dataset[0])), list(read_actors(dataset[1]))
+    G = load_csr(*dataset[:2])
+    monkeypatch.setattr(tsv_loader, "BLOCK_SIZE", 100)
+    assert list(read_movies(dataset[0])) == movies
+    assert list(read_actors(dataset[1])) == actors
+    H = load_csr(*dataset[:2])
+    for name in ("ids", "names", "offsets", "targets", "weights", "edge_movie", "component"):
+        assert list(getattr(G, name)) == list(getattr(H, name)), name
@@ -0,0 +1,119 @@
+import threading
+from collections import OrderedDict
+
+from oblig2 import _bfs_tree, _tree_path
+from search import EdgeArrayCost, lightest_tree
+
+
+class SearchTreeCache:
+    """Memory-bounded LRU cache of single-source search trees, keyed by (kind, source actor).
+
+    A tree is the integer parent array of a full BFS or Dijkstra from one actor, and the
+    distance array for Dijkstra. Once a source is cached, the path to any target is a walk
+    up the parent chain, without searching again. The least recently used trees are
+    thrown out when the trees take more than max_mb, and the cache empties itself when
+    G.version changes, so it never answers from an old graph.
+
+    Attributes:
+        G (CSRGraph): The graph
+        weights (dict): The weights of the other kinds of paths, for example {"women": w_w}.
+            "shortest" (BFS) and "chillest" (Dijkstra on G.weights) are always known.
+        max_bytes (int): The most memory the trees can take
+        bytes (int): The memory the cached trees take
+        hits (int): How many lookups found a cached tree
+        misses (int): How many lookups had to search
+        evictions (int): How many trees were thrown out to make room
+    """
+
+    def __init__(self, G, weights=None, max_mb=256):
+        self.G = G
+        self.weights = dict(weights or {})
+        self.max_bytes = int(max_mb * 2**20)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._trees = OrderedDict()
+        self._version = G.version
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._trees)
+
+    def clear(self):
+        with self._lock:
+            self._trees.clear()
+            self.bytes = 0
+            self._version = self.G.version
+
+    def _search(self, kind, root):
+        G = self.G
+        if kind == "shortest":
+            parents, _ = _bfs_tree(G, root)
+            return parents, None
+        weights = G.weights if kind == "chillest" else self.weights[kind]
+        parents, _, dist = lightest_tree(EdgeArrayCost(G, weights), root)
+        return parents, dist
+
+    def tree(self, kind, root):
+        """Returns the search tree of kind from the integer node root, from the cache if it is there.
+
+        Args:
+            kind (str): "shortest", "chillest" or a key of weights
+            root (int): The integer node to search from
+
+        Returns:
+            parents (array): The integer parent of every node, -1 if not reached, root is its own parent
+            dist (array): The total weight from root to every node, None for "shortest"
+        """
+        version = self.G.version
+        if version != self._version:
+            self.clear()
+        key = (kind, root)
+        with self._lock:
+            tree = self._trees.get(key)
+            if tree is not None:
+                self.hits += 1
+                self._trees.move_to_end(key)
+                return tree
+            self.misses += 1
+
+        tree = self._search(kind, root)
+        size = sum(len(a) * a.itemsize for a in tree if a is not None)
+        if size > self.max_bytes or version != self.G.version:
+            return tree
+        with self._lock:
+            if key not in self._trees:
+                self._trees[key] = tree
+                self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, old = self._trees.popitem(last=False)
+                self.bytes -= sum(len(a) * a.itemsize for a in old if a is not None)
+                self.evictions += 1
+        return tree
+
+    def path(self, kind, s, e):
+        """Finds the path between two actors by walking the parent chain of the tree from s.
+
+        Args:
+            kind (str): "shortest", "chillest" or a key of weights
+            s (str): The actor id of the root
+            e (str): The actor id of the end
+
+        Returns:
+            path (list): The actor ids on the path, empty if there is no path
+            weight (float): The number of hops for "shortest", or the total weight of the path.
+                inf if there is no path.
+        """
+        G = self.G
+        if s not in G or e not in G or not G.connected(s, e):
+            return [], float('inf')
+        parents, dist = self.tree(kind, G.index[s])
+        v = G.index[e]
+        path = _tree_path(G, parents, v)
+        return path, (len(path) - 1 if dist is None else dist[v])
+
+    def stats(self):
+        """Returns the counters of the cache as a dictionary."""
+        return {"trees": len(self), "mb": self.bytes / 2**20, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions}